@@ -0,0 +1,379 @@
+"""
+API HTTP local sobre as funções de consulta de data.py, em JSON ou Arrow.
+
+Cada função de FUNCOES é um endpoint GET com os argumentos na query string
+(sem o df): /calcular_kpis_uf?uf=SP&ano=2021. Os valores são lidos como JSON
+quando possível (números, true/false, null, listas) e como texto nos demais
+casos; chaves repetidas viram lista (/kpis_municipios?municipios=3550308&municipios=3304557&...).
+GET / lista as funções e seus parâmetros e GET /estatisticas retorna os
+contadores dos caches.
+
+A base é a mesma de data.load_data (carregada uma vez por processo, com o
+índice e os caches de consulta) e é conferida a cada requisição: uma nova
+versão gravada por ingestao.py passa a ser servida sem reiniciar o servidor.
+As respostas já codificadas ficam em um cache LRU com chave na função, nos
+argumentos, no formato e na versão da base. Cada resposta tem um ETag (hash
+do corpo); uma requisição com If-None-Match igual recebe 304 sem corpo.
+
+Tabelas (DataFrame/Series) podem ser pedidas em Arrow (IPC stream) com
+?formato=arrow ou Accept: application/vnd.apache.arrow.stream.
+
+Uso:
+    python api.py
+    python api.py --dados pib_municipios/ --porta 8000
+    curl "http://127.0.0.1:8000/ranking_ufs?ano=2021&regiao=Sudeste"
+"""
+import argparse
+import hashlib
+import inspect
+import json
+import logging
+import math
+import os
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import MappingProxyType
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+import data
+from cache import CacheConsultas, estatisticas_cache
+
+
+# Endereço e porta padrão do servidor
+HOST_PADRAO = os.environ.get("PIB_API_HOST", "127.0.0.1")
+PORTA_PADRAO = int(os.environ.get("PIB_API_PORTA", "8000"))
+
+# Limite do cache de respostas (número de entradas; 0 desativa)
+TAMANHO_RESPOSTAS = int(os.environ.get("PIB_API_CACHE_TAMANHO", "1024"))
+
+# Funções de data.py expostas como endpoints
+FUNCOES = [
+    "filtrar_dados", "dados_uf_ano", "dados_regiao_ano", "dados_municipio_ano",
+    "resolver_municipio", "obter_uf_municipio", "totais_agregados", "cubo_agregado", "somar_cubo",
+    "catalogo_geografico", "obter_lista_municipios", "obter_lista_ufs",
+    "calcular_kpis_municipio", "calcular_kpis_uf", "calcular_kpis_agregado", "kpis_municipios",
+    "painel_anual", "crescimento_entre_anos", "crescimento_anual", "crescimento_composto",
+    "calcular_crescimento_periodo", "dados_evolucao_pib", "dados_evolucao_valor_adicionado",
+    "posicao_ranking", "posicoes_ranking", "pagina_ranking",
+    "ranking_municipios_pib", "ranking_municipios_per_capita", "ranking_ufs", "ranking_ufs_per_capita",
+    "municipios_populacao_proxima", "composicao_setorial_municipio", "composicao_setorial_uf",
+    "composicao_setorial_agregado", "composicao_setorial", "tabela_setorial",
+    "scatter_pib_vs_per_capita", "scatter_ufs_pib_vs_per_capita",
+    "tabela_municipios_completa", "tabela_ufs_completa"
+]
+
+# Parâmetros que são sempre listas (um valor só também vira lista)
+PARAMETROS_LISTA = {"municipios", "entidades", "colunas"}
+
+TIPO_JSON = "application/json; charset=utf-8"
+TIPO_ARROW = "application/vnd.apache.arrow.stream"
+
+
+class ErroRequisicao(Exception):
+    """Requisição inválida: função inexistente, argumentos errados ou formato não suportado."""
+
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+
+# ===============================
+# CONVERSÃO DE ARGUMENTOS E RESULTADOS
+# ===============================
+
+def _valor_parametro(texto):
+    """Lê um valor da query string como JSON (números, listas, true/null) ou, se não for JSON, como texto."""
+    try:
+        return json.loads(texto)
+    except ValueError:
+        return texto
+
+
+def argumentos_consulta(funcao, query):
+    """
+    Converte a query string nos argumentos de uma função de data.py.
+
+    Args:
+        funcao: Nome da função (em FUNCOES)
+        query: Query string da URL (sem o "?")
+
+    Returns:
+        Dict de argumentos nomeados, sem o df
+
+    Raises:
+        ErroRequisicao: Função desconhecida ou argumentos que não batem com a assinatura
+    """
+    if funcao not in FUNCOES:
+        raise ErroRequisicao(HTTPStatus.NOT_FOUND, f"Função desconhecida: {funcao!r}")
+
+    argumentos = {}
+    for nome, textos in parse_qs(query, keep_blank_values=True).items():
+        if nome == "formato":
+            continue
+        valores = [_valor_parametro(texto) for texto in textos]
+        if nome in PARAMETROS_LISTA:
+            valores = [item for valor in valores for item in (valor if isinstance(valor, list) else [valor])]
+            argumentos[nome] = valores
+        else:
+            argumentos[nome] = valores[0] if len(valores) == 1 else valores
+
+    try:
+        inspect.signature(getattr(data, funcao)).bind(None, **argumentos)
+    except TypeError as erro:
+        raise ErroRequisicao(HTTPStatus.BAD_REQUEST, f"{funcao}: {erro}") from None
+    return argumentos
+
+
+def _para_json(valor):
+    """Converte o resultado em tipos serializáveis em JSON (NaN vira null, objetos viram dicts de atributos)."""
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        return json.loads(_tabela_json(valor))
+    if isinstance(valor, (dict, MappingProxyType)):
+        return {
+            "/".join(map(str, chave)) if isinstance(chave, tuple) else str(chave): _para_json(item)
+            for chave, item in valor.items()
+        }
+    if isinstance(valor, (list, tuple, np.ndarray)):
+        return [_para_json(item) for item in valor]
+    if isinstance(valor, np.generic):
+        valor = valor.item()
+    if isinstance(valor, float) and not math.isfinite(valor):
+        return None
+    if valor is pd.NA:
+        return None
+    if hasattr(valor, "__dict__") and not callable(valor):
+        return {chave: _para_json(item) for chave, item in vars(valor).items()}
+    return valor
+
+
+def _tabela_json(tabela):
+    """Tabela em JSON no formato split (colunas, índice e dados), com até 15 casas decimais."""
+    return tabela.to_json(orient="split", double_precision=15, force_ascii=False)
+
+
+def codificar_json(funcao, versao, resultado):
+    """
+    Monta o corpo JSON de uma resposta.
+
+    Returns:
+        Bytes de {"funcao", "versao", "resultado"}
+    """
+    if isinstance(resultado, (pd.DataFrame, pd.Series)):
+        corpo = _tabela_json(resultado)
+    else:
+        corpo = json.dumps(_para_json(resultado), ensure_ascii=False)
+    cabecalho = json.dumps({"funcao": funcao, "versao": versao}, ensure_ascii=False)
+    return f'{cabecalho[:-1]}, "resultado": {corpo}}}'.encode()
+
+
+def codificar_arrow(funcao, versao, resultado):
+    """
+    Monta o corpo Arrow (IPC stream) de uma resposta tabular.
+
+    A função e a versão da base vão nos metadados do esquema.
+
+    Raises:
+        ErroRequisicao: O resultado não é uma tabela
+    """
+    if isinstance(resultado, pd.Series):
+        resultado = resultado.to_frame(name=resultado.name if resultado.name is not None else "valor")
+    if not isinstance(resultado, pd.DataFrame):
+        raise ErroRequisicao(HTTPStatus.NOT_ACCEPTABLE, f"{funcao} não retorna tabela; use formato=json")
+
+    tabela = pa.Table.from_pandas(resultado.rename(columns=str))
+    metadados = {**(tabela.schema.metadata or {}), b"pib_funcao": funcao.encode(), b"pib_versao": versao.encode()}
+    tabela = tabela.replace_schema_metadata(metadados)
+
+    saida = pa.BufferOutputStream()
+    with pa.ipc.new_stream(saida, tabela.schema) as escritor:
+        escritor.write_table(tabela)
+    return saida.getvalue().to_pybytes()
+
+
+# ===============================
+# SERVIÇO
+# ===============================
+
+class ServicoConsultas:
+    """
+    Executa as consultas sobre a base de data.load_data e guarda as respostas codificadas.
+
+    As respostas ficam em um CacheConsultas próprio (LRU, com os contadores por
+    função em estatisticas()), com chave (função, versão da base, formato,
+    argumentos); o valor é (corpo, ETag, tipo de conteúdo).
+    """
+
+    def __init__(self, arquivo=data.ARQUIVO_DADOS, tamanho_cache=TAMANHO_RESPOSTAS):
+        self.arquivo = arquivo
+        self.respostas = CacheConsultas(tamanho_maximo=tamanho_cache, ttl=None)
+
+    def base(self):
+        """Base atual (recarregada por data.load_data quando a versão do arquivo muda)."""
+        return data.load_data(arquivo=self.arquivo)
+
+    def consultar(self, funcao, argumentos, formato="json"):
+        """
+        Retorna a resposta de uma consulta, do cache ou calculada.
+
+        Args:
+            funcao: Nome da função (em FUNCOES)
+            argumentos: Argumentos nomeados, sem o df
+            formato: 'json' ou 'arrow'
+
+        Returns:
+            Tupla (corpo em bytes, ETag, tipo de conteúdo, versão da base)
+        """
+        df = self.base()
+        versao = str(df.attrs.get("versao_base"))
+        chave = (funcao, versao, formato, json.dumps(_para_json(argumentos), sort_keys=True))
+
+        encontrado, resposta = self.respostas.obter(chave)
+        if not encontrado:
+            try:
+                resultado = getattr(data, funcao)(df, **argumentos)
+            except (KeyError, ValueError, TypeError) as erro:
+                raise ErroRequisicao(HTTPStatus.BAD_REQUEST, f"{funcao}: {erro}") from None
+
+            if formato == "arrow":
+                corpo, tipo = codificar_arrow(funcao, versao, resultado), TIPO_ARROW
+            else:
+                corpo, tipo = codificar_json(funcao, versao, resultado), TIPO_JSON
+            resposta = (corpo, f'"{hashlib.sha1(corpo).hexdigest()}"', tipo)
+            if self.respostas.tamanho_maximo:
+                self.respostas.guardar(chave, resposta)
+        return (*resposta, versao)
+
+    def descrever(self):
+        """Funções expostas, com os parâmetros e valores padrão, e a versão da base."""
+        funcoes = {}
+        for nome in FUNCOES:
+            parametros = list(inspect.signature(getattr(data, nome)).parameters.values())[1:]
+            funcoes[nome] = {
+                parametro.name: (None if parametro.default is inspect.Parameter.empty else parametro.default)
+                for parametro in parametros
+            }
+        return {"versao": str(self.base().attrs.get("versao_base")), "backend": data.BACKEND, "funcoes": funcoes}
+
+    def estatisticas(self):
+        """Contadores do cache de respostas e do cache de consultas de data.py."""
+        return {"respostas": self.respostas.estatisticas(), "consultas": estatisticas_cache()}
+
+
+def _etag_coincide(cabecalho, etag):
+    """Confere If-None-Match (lista de ETags, fracos ou fortes, ou "*")."""
+    candidatos = [item.strip() for item in cabecalho.split(",")]
+    return "*" in candidatos or any(item.removeprefix("W/") == etag for item in candidatos)
+
+
+class ManipuladorConsultas(BaseHTTPRequestHandler):
+    """Atende GET /, /estatisticas e /<função> (HTTP/1.1 com conexões persistentes)."""
+
+    protocol_version = "HTTP/1.1"
+    # Cabeçalhos e corpo saem em uma escrita só (sem a espera do ACK atrasado entre os dois)
+    wbufsize = -1
+    disable_nagle_algorithm = True
+    servico = None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        caminho = unquote(url.path).strip("/")
+        try:
+            if caminho == "":
+                self._responder_json(self.servico.descrever())
+            elif caminho == "estatisticas":
+                self._responder_json(self.servico.estatisticas())
+            else:
+                self._consultar(caminho, url.query)
+        except ErroRequisicao as erro:
+            self._responder_json({"erro": str(erro)}, erro.status)
+        except Exception as erro:  # noqa: BLE001 - o erro vira resposta 500 sem derrubar a conexão
+            logging.exception("Erro em %s", self.path)
+            self._responder_json({"erro": f"{type(erro).__name__}: {erro}"}, HTTPStatus.INTERNAL_SERVER_ERROR)
+
+    def _consultar(self, funcao, query):
+        argumentos = argumentos_consulta(funcao, query)
+        formato = parse_qs(query).get("formato", [""])[0]
+        if not formato:
+            formato = "arrow" if TIPO_ARROW in self.headers.get("Accept", "") else "json"
+        if formato not in ("json", "arrow"):
+            raise ErroRequisicao(HTTPStatus.BAD_REQUEST, f"Formato inválido: {formato!r} (use json ou arrow)")
+
+        corpo, etag, tipo, versao = self.servico.consultar(funcao, argumentos, formato)
+        cabecalhos = {"ETag": etag, "Cache-Control": "no-cache", "X-Versao-Base": versao}
+        if _etag_coincide(self.headers.get("If-None-Match", ""), etag):
+            self._responder(HTTPStatus.NOT_MODIFIED, cabecalhos)
+        else:
+            self._responder(HTTPStatus.OK, {**cabecalhos, "Content-Type": tipo}, corpo)
+
+    def _responder_json(self, conteudo, status=HTTPStatus.OK):
+        corpo = json.dumps(_para_json(conteudo), ensure_ascii=False).encode()
+        self._responder(status, {"Content-Type": TIPO_JSON, "Cache-Control": "no-store"}, corpo)
+
+    def _responder(self, status, cabecalhos, corpo=b""):
+        self.send_response(status)
+        for nome, valor in cabecalhos.items():
+            self.send_header(nome, valor)
+        if status != HTTPStatus.NOT_MODIFIED:
+            self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        if corpo:
+            self.wfile.write(corpo)
+
+    def log_message(self, formato, *args):
+        logging.getLogger("api").debug(formato, *args)
+
+
+def criar_servidor(host=HOST_PADRAO, porta=PORTA_PADRAO, arquivo=data.ARQUIVO_DADOS, tamanho_cache=TAMANHO_RESPOSTAS):
+    """
+    Cria o servidor HTTP (uma thread por conexão) e carrega a base e o índice.
+
+    Args:
+        host, porta: Endereço de escuta (porta 0 escolhe uma livre)
+        arquivo: Parquet ou diretório particionado da base
+        tamanho_cache: Entradas do cache de respostas (0 desativa)
+
+    Returns:
+        ThreadingHTTPServer pronto para serve_forever()
+    """
+    servico = ServicoConsultas(arquivo, tamanho_cache)
+    df = servico.base()
+    if isinstance(df, pd.DataFrame):
+        data.indexar(df)
+
+    manipulador = type("Manipulador", (ManipuladorConsultas,), {"servico": servico})
+    servidor = ThreadingHTTPServer((host, porta), manipulador)
+    servidor.daemon_threads = True
+    servidor.servico = servico
+    return servidor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API HTTP local das consultas de data.py")
+    parser.add_argument("--dados", default=data.ARQUIVO_DADOS, help="Parquet ou diretório particionado da base")
+    parser.add_argument("--host", default=HOST_PADRAO)
+    parser.add_argument("--porta", type=int, default=PORTA_PADRAO)
+    parser.add_argument("--cache", type=int, default=TAMANHO_RESPOSTAS, help="Entradas do cache de respostas (0 desativa)")
+    args = parser.parse_args()
+
+    # Fora do `streamlit run`, o cache do Streamlit avisa a cada chamada que não há runtime
+    for nome in list(logging.root.manager.loggerDict):
+        if nome.startswith("streamlit"):
+            logging.getLogger(nome).setLevel(logging.ERROR)
+
+    servidor = criar_servidor(args.host, args.porta, args.dados, args.cache)
+    host, porta = servidor.server_address[:2]
+    print(f"API em http://{host}:{porta}/ (base {servidor.servico.base().attrs.get('versao_base')})", flush=True)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
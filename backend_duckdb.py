@@ -0,0 +1,676 @@
+"""
+Backend SQL (DuckDB) das consultas de data.py sobre o parquet da base.
+
+Com PIB_BACKEND=duckdb, load_data() retorna uma BaseDuckDB no lugar do
+DataFrame e as funções de acesso aos dados de data.py (filtros, linhas de
+UF/região/município, cubo de agregados, painéis entidade × ano, rankings e
+vizinhos por população) são trocadas pelas versões deste módulo, que
+consultam o parquet a cada chamada, com varreduras e agregações em várias
+threads. As funções de KPIs, rankings, composições e tabelas de data.py não
+mudam: passam a ser montadas sobre essas consultas e devolvem os mesmos
+resultados do backend pandas (conferido por benchmarks/paridade.py).
+
+O processo guarda apenas a conexão, o catálogo geográfico e a posição de
+cada (município, ano) na base ordenada, para que as linhas retornadas tenham
+o mesmo índice que teriam no DataFrame.
+"""
+import os
+from functools import cached_property
+
+import duckdb
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from cache import memorizar, registrar_base
+from data import (
+    ARQUIVO_DADOS, COLUNAS_BASE, COLUNAS_CUBO, COLUNAS_PAINEL, COLUNAS_VAB, METRICAS_RANKING, NIVEIS_PAINEL,
+    NOMES_SETORES, ORDEM_BASE, VERSOES_EM_MEMORIA, CatalogoGeografico, _com_razoes, _tabela_setorial_linhas,
+    _versao_arquivo, compactar_base
+)
+from instrumentacao import instrumentar_modulo
+
+
+# Threads do DuckDB (padrão: uma por núcleo)
+THREADS = int(os.environ.get("PIB_DUCKDB_THREADS", "0")) or None
+
+# Funções de data.py substituídas por instalar()
+FUNCOES = [
+    "load_data", "catalogo_geografico", "resolver_municipio", "obter_uf_municipio", "dados_municipio_ano",
+    "dados_uf_ano", "dados_regiao_ano", "filtrar_dados", "totais_agregados", "cubo_agregado",
+    "painel_anual", "crescimento_entre_anos", "crescimento_anual", "crescimento_composto",
+    "_crescimento_entidade", "kpis_municipios", "posicao_ranking", "pagina_ranking", "_topo_ranking",
+    "municipios_populacao_proxima", "tabela_setorial"
+]
+
+# População (habitantes) de cada linha, como no backend pandas: (PIB / PIB per capita) * 1000
+POPULACAO_SQL = "pib_total / pib_per_capita * 1000"
+
+# Expressões de entidade e região de cada nível agregado
+NIVEIS_SQL = {
+    "uf": ("sigla_uf", "nome_grande_regiao"),
+    "regiao": ("nome_grande_regiao", "nome_grande_regiao"),
+    "brasil": ("'Brasil'", "'Brasil'")
+}
+
+
+class BaseDuckDB:
+    """
+    Conexão DuckDB com a base em parquet (arquivo único ou diretório particionado).
+
+    Ocupa o lugar do DataFrame base nas funções de data.py: tem
+    attrs["versao_base"] e len(), usados pelo cache de consultas, mas as
+    linhas ficam no parquet e cada consulta é um SELECT sobre a visão `base`.
+    A visão `base_linhas` acrescenta a coluna `linha`, posição da linha na
+    base ordenada por ORDEM_BASE.
+
+    Cada consulta usa um cursor próprio, de modo que sessões em threads
+    diferentes consultam a mesma conexão ao mesmo tempo.
+    """
+
+    def __init__(self, arquivo=ARQUIVO_DADOS, threads=THREADS):
+        self.arquivo = str(arquivo)
+        self.attrs = {"versao_base": _versao_arquivo(arquivo) + "-duckdb"}
+        self._conexao = duckdb.connect(config={"threads": threads} if threads else {})
+
+        caminho = self.arquivo.replace("'", "''")
+        if os.path.isdir(arquivo):
+            origem = (f"read_parquet('{caminho}/**/*.parquet', hive_partitioning = true, "
+                      "hive_types = {'ano': SMALLINT, 'sigla_uf': VARCHAR})")
+        else:
+            origem = f"read_parquet('{caminho}')"
+        self._conexao.execute(f"CREATE VIEW base AS SELECT {', '.join(COLUNAS_BASE)} FROM {origem}")
+        self._conexao.execute(f"""
+            CREATE TABLE posicoes AS
+            SELECT cod_municipio, ano, row_number() OVER (ORDER BY {', '.join(ORDEM_BASE)}) - 1 AS linha
+            FROM base
+        """)
+        self._conexao.execute("""
+            CREATE VIEW base_linhas AS
+            SELECT p.linha, b.* FROM base b JOIN posicoes p ON b.cod_municipio = p.cod_municipio AND b.ano = p.ano
+        """)
+
+        self.n_linhas = self.consultar_linha("SELECT count(*) FROM posicoes")[0]
+        anos = self.consultar("SELECT DISTINCT ano FROM posicoes ORDER BY ano")["ano"].tolist()
+        # Anos consecutivos do primeiro ao último, como as colunas dos painéis do backend pandas
+        self.anos_painel = list(range(anos[0], anos[-1] + 1)) if anos else []
+
+    def __len__(self):
+        return self.n_linhas
+
+    def __getitem__(self, coluna):
+        """Coluna da base como Series, na ordem da base (para código que lê colunas diretamente)."""
+        _validar_colunas([coluna])
+        return compactar_base(self.consultar(f"SELECT {coluna} FROM base_linhas ORDER BY linha"))[coluna]
+
+    def consultar(self, sql, parametros=()):
+        """Executa uma consulta e retorna o resultado em um DataFrame."""
+        with self._conexao.cursor() as cursor:
+            return cursor.execute(sql, list(parametros)).df()
+
+    def consultar_linha(self, sql, parametros=()):
+        """Executa uma consulta e retorna a primeira linha (tupla) ou None."""
+        with self._conexao.cursor() as cursor:
+            return cursor.execute(sql, list(parametros)).fetchone()
+
+    def para_pandas(self):
+        """Base inteira em um DataFrame no esquema compacto (ferramentas de benchmark e paridade)."""
+        return compactar_base(self.consultar(f"SELECT {', '.join(COLUNAS_BASE)} FROM base_linhas ORDER BY linha"))
+
+    def memoria_bytes(self):
+        """Memória ocupada pelo DuckDB (tabela de posições e buffers)."""
+        return int(self.consultar_linha("SELECT sum(memory_usage_bytes) FROM duckdb_memory()")[0] or 0)
+
+    @cached_property
+    def catalogo(self):
+        municipios = self.consultar("""
+            SELECT cod_grande_regiao, nome_grande_regiao, sigla_uf, cod_municipio, nome_municipio
+            FROM base_linhas QUALIFY row_number() OVER (PARTITION BY cod_municipio ORDER BY linha) = 1
+            ORDER BY linha
+        """)
+        return CatalogoGeografico(municipios)
+
+    @cached_property
+    def codigos_por_nome(self):
+        codigos_por_nome = {}
+        for cod, nome in sorted(self.catalogo.nome_por_codigo.items()):
+            codigos_por_nome.setdefault(nome, []).append(cod)
+        return codigos_por_nome
+
+    @cached_property
+    def regiao_por_uf(self):
+        return {
+            uf: regiao for regiao in self.catalogo.regioes for uf in self.catalogo.ufs_por_regiao[regiao]
+        }
+
+
+def instalar(namespace):
+    """
+    Troca as funções de acesso aos dados de data.py pelas versões em SQL.
+
+    Chamado ao final de data.py com globals() quando PIB_BACKEND=duckdb: as
+    demais funções de data.py buscam essas funções no módulo a cada chamada
+    e passam a consultar o DuckDB.
+
+    Args:
+        namespace: Dicionário global de data.py
+    """
+    for nome in FUNCOES:
+        namespace[nome] = globals()[nome]
+
+
+def load_data(float32=None, arquivo=ARQUIVO_DADOS):
+    """
+    Abre a base em parquet no DuckDB (uma conexão por versão da base, compartilhada pelas sessões).
+
+    Args:
+        float32: Ignorado (o DuckDB lê as colunas monetárias como estão no parquet)
+        arquivo: Caminho do arquivo parquet ou do diretório particionado
+                 (padrão: ARQUIVO_DADOS)
+
+    Returns:
+        BaseDuckDB
+    """
+    return _abrir_base(arquivo, _versao_arquivo(arquivo))
+
+
+@st.cache_resource(max_entries=VERSOES_EM_MEMORIA)
+def _abrir_base(arquivo, versao):
+    return registrar_base(BaseDuckDB(arquivo))
+
+
+# ===============================
+# AUXILIARES SQL
+# ===============================
+
+def _em(coluna, valores, parametros):
+    """Condição `coluna IN (...)` com os valores como parâmetros (FALSE para lista vazia)."""
+    valores = list(valores)
+    if not valores:
+        return "FALSE"
+    parametros.extend(valores)
+    return f"{coluna} IN ({', '.join('?' * len(valores))})"
+
+
+def _validar_colunas(colunas):
+    """Colunas são interpoladas no SQL: só nomes da base são aceitos."""
+    desconhecidas = [col for col in colunas if col not in COLUNAS_BASE]
+    if desconhecidas:
+        raise KeyError(f"Colunas fora da base: {desconhecidas}")
+
+
+def _linhas(base, condicao, parametros=(), colunas=None):
+    """Linhas da base que atendem à condição, na ordem e com o índice da base."""
+    colunas = COLUNAS_BASE if colunas is None else list(colunas)
+    _validar_colunas(colunas)
+    resultado = base.consultar(
+        f"SELECT linha, {', '.join(colunas)} FROM base_linhas WHERE {condicao} ORDER BY linha", parametros
+    )
+    return compactar_base(resultado.set_index("linha").rename_axis(None))
+
+
+def _linhas_por_posicao(base, posicoes, colunas=None):
+    """Linhas da base nas posições dadas, na ordem dada."""
+    parametros = []
+    return _linhas(base, _em("linha", posicoes, parametros), parametros, colunas).loc[posicoes]
+
+
+def _valor_metrica(metrica):
+    """Expressão SQL de uma métrica de ranking."""
+    if metrica not in METRICAS_RANKING:
+        raise ValueError(f"Métrica sem ranking: {metrica!r} (use uma de {METRICAS_RANKING})")
+    return POPULACAO_SQL if metrica == "populacao" else metrica
+
+
+# ===============================
+# CATÁLOGO E LINHAS DA BASE
+# ===============================
+
+def catalogo_geografico(base):
+    """Retorna o catálogo região → UF → município da base (ver CatalogoGeografico)."""
+    return base.catalogo
+
+
+def resolver_municipio(base, municipio, uf=None):
+    """Versão SQL de data.resolver_municipio (consulta o catálogo da conexão)."""
+    if municipio is None:
+        return None
+    uf_por_codigo = base.catalogo.uf_por_codigo
+    if not isinstance(municipio, str):
+        return int(municipio) if int(municipio) in uf_por_codigo else None
+
+    codigos = base.codigos_por_nome.get(municipio, [])
+    if uf and uf != "Todas":
+        codigos = [cod for cod in codigos if uf_por_codigo[cod] == uf]
+    return codigos[0] if codigos else None
+
+
+def obter_uf_municipio(base, municipio):
+    """Retorna a sigla da UF de um município (código ou nome)."""
+    return base.catalogo.uf_por_codigo.get(resolver_municipio(base, municipio))
+
+
+def dados_municipio_ano(base, municipio, ano, uf=None):
+    """Versão SQL de data.dados_municipio_ano."""
+    cod = resolver_municipio(base, municipio, uf)
+    if cod is None:
+        return None
+    linhas = _linhas(base, "cod_municipio = ? AND ano = ?", [cod, ano])
+    return linhas.iloc[0] if len(linhas) else None
+
+
+def dados_uf_ano(base, uf, ano):
+    """Retorna as linhas dos municípios de uma UF em um ano."""
+    return _linhas(base, "sigla_uf = ? AND ano = ?", [uf, ano])
+
+
+def dados_regiao_ano(base, regiao, ano):
+    """Retorna as linhas dos municípios de uma região (ou do Brasil) em um ano."""
+    if regiao == "Brasil":
+        return _linhas(base, "ano = ?", [ano])
+    return _linhas(base, "nome_grande_regiao = ? AND ano = ?", [regiao, ano])
+
+
+def filtrar_dados(base, regiao=None, uf=None, municipios=None, ano_ini=None, ano_fim=None, colunas=None):
+    """Versão SQL de data.filtrar_dados (mesmos filtros, linhas na ordem e com o índice da base)."""
+    parametros = []
+    condicoes = []
+    if ano_ini and ano_fim:
+        condicoes.append("ano BETWEEN ? AND ?")
+        parametros += [ano_ini, ano_fim]
+
+    if regiao == "Brasil":
+        regiao = None
+    if uf == "Todas":
+        uf = None
+
+    if municipios:
+        # Nomes incluem todos os municípios homônimos; UF e região restringem a seleção
+        codigos = []
+        for municipio in municipios:
+            if isinstance(municipio, str):
+                codigos.extend(base.codigos_por_nome.get(municipio, []))
+            else:
+                codigos.append(int(municipio))
+        uf_por_codigo = base.catalogo.uf_por_codigo
+        codigos = [
+            cod for cod in sorted(set(codigos))
+            if (not uf or uf_por_codigo.get(cod) == uf)
+            and (not regiao or base.regiao_por_uf.get(uf_por_codigo.get(cod)) == regiao)
+        ]
+        condicoes.append(_em("cod_municipio", codigos, parametros))
+    elif uf:
+        if regiao and base.regiao_por_uf.get(uf) != regiao:
+            condicoes.append("FALSE")
+        else:
+            condicoes.append("sigla_uf = ?")
+            parametros.append(uf)
+    elif regiao:
+        condicoes.append("nome_grande_regiao = ?")
+        parametros.append(regiao)
+
+    return _linhas(base, " AND ".join(condicoes) or "TRUE", parametros, colunas)
+
+
+def municipios_populacao_proxima(base, municipio, ano, k=10, uf=None, nacional=False):
+    """Versão SQL de data.municipios_populacao_proxima (k vizinhos por diferença de população)."""
+    cod = resolver_municipio(base, municipio, uf)
+    referencia = _linhas(base, "cod_municipio = ? AND ano = ?", [cod, ano]) if cod is not None else None
+    if referencia is None or referencia.empty or (uf and uf != "Todas" and base.catalogo.uf_por_codigo[cod] != uf):
+        return _linhas(base, "FALSE")
+
+    populacao = (referencia["pib_total"].iloc[0] / referencia["pib_per_capita"].iloc[0]) * 1000
+    if np.isnan(populacao):
+        return referencia
+
+    # Menor diferença primeiro; empates pela ordem da base
+    parametros = [ano, cod]
+    condicao = f"ano = ? AND cod_municipio <> ? AND NOT isnan({POPULACAO_SQL})"
+    if not nacional:
+        condicao += " AND sigla_uf = ?"
+        parametros.append(base.catalogo.uf_por_codigo[cod])
+    vizinhos = base.consultar(f"""
+        SELECT linha FROM base_linhas WHERE {condicao}
+        ORDER BY abs({POPULACAO_SQL} - ?), linha LIMIT ?
+    """, [*parametros, float(populacao), int(k)])["linha"].tolist()
+
+    if not vizinhos:
+        return referencia
+    return pd.concat([referencia, _linhas_por_posicao(base, vizinhos)])
+
+
+# ===============================
+# CUBO DE AGREGADOS
+# ===============================
+
+def _cubo(base, nivel, condicao, parametros):
+    """
+    Totais de COLUNAS_CUBO e setor dominante por (entidade, ano) de um nível,
+    somados em SQL sobre as linhas que atendem à condição.
+    """
+    entidade, regiao = NIVEIS_SQL[nivel]
+    somas = ", ".join(
+        f"COALESCE(fsum({col}), 0) AS {col}" for col in ["pib_total", "populacao", *COLUNAS_VAB, "vab_total"]
+    )
+    cubo = base.consultar(f"""
+        WITH linhas AS (
+            SELECT {entidade} AS entidade, {regiao} AS nome_grande_regiao, ano, sigla_uf, pib_total,
+                   {POPULACAO_SQL} AS populacao, {', '.join(COLUNAS_VAB)}, vab_total, atividade_maior_vab
+            FROM base WHERE {condicao}
+        ),
+        setores AS (
+            SELECT entidade, ano, atividade_maior_vab, fsum(pib_total) AS pib
+            FROM linhas WHERE atividade_maior_vab IS NOT NULL GROUP BY ALL
+        ),
+        dominantes AS (
+            SELECT entidade, ano, first(atividade_maior_vab ORDER BY pib DESC, atividade_maior_vab) AS setor_dominante
+            FROM setores GROUP BY ALL
+        ),
+        totais AS (
+            SELECT entidade, nome_grande_regiao, ano, {somas},
+                   count(*) AS num_municipios, count(DISTINCT sigla_uf) AS num_ufs
+            FROM linhas GROUP BY ALL
+        )
+        SELECT totais.*, dominantes.setor_dominante
+        FROM totais LEFT JOIN dominantes ON totais.entidade = dominantes.entidade AND totais.ano = dominantes.ano
+    """, parametros)
+    cubo = cubo.astype({"ano": "int16"}).sort_values(["entidade", "ano"], ignore_index=True)
+    # Sem atividade informada (anos sem VAB), o setor dominante fica NaN, como no cubo do backend pandas
+    cubo["setor_dominante"] = cubo["setor_dominante"].where(cubo["setor_dominante"].notna(), np.nan)
+    return _com_razoes(cubo)
+
+
+def totais_agregados(base, nivel, entidade, ano):
+    """Versão SQL de data.totais_agregados (dict com COLUNAS_CUBO ou None)."""
+    somas = ", ".join(
+        f"COALESCE(fsum({expressao}), 0)"
+        for expressao in ["pib_total", POPULACAO_SQL, *COLUNAS_VAB, "vab_total"]
+    )
+    linha = base.consultar_linha(f"""
+        SELECT {somas}, count(*), count(DISTINCT sigla_uf)
+        FROM base WHERE ano = ? AND {NIVEIS_SQL[nivel][0]} = ?
+    """, [ano, entidade])
+    if linha[-2] == 0:
+        return None
+    return dict(zip(COLUNAS_CUBO, linha))
+
+
+def cubo_agregado(base, nivel, entidades=None, ano_ini=None, ano_fim=None, regiao=None):
+    """Versão SQL de data.cubo_agregado (mesmas colunas, filtros e ordem)."""
+    parametros = []
+    condicoes = []
+    if entidades is not None:
+        if nivel == "brasil":
+            condicoes.append("TRUE" if "Brasil" in list(entidades) else "FALSE")
+        else:
+            condicoes.append(_em(NIVEIS_SQL[nivel][0], [str(entidade) for entidade in entidades], parametros))
+    if regiao and regiao != "Brasil":
+        # O nível Brasil não pertence a nenhuma região
+        condicoes.append("FALSE" if nivel == "brasil" else "nome_grande_regiao = ?")
+        parametros += [] if nivel == "brasil" else [regiao]
+    if ano_ini is not None:
+        condicoes.append("ano BETWEEN ? AND ?")
+        parametros += [ano_ini, ano_ini if ano_fim is None else ano_fim]
+    return _cubo(base, nivel, " AND ".join(condicoes) or "TRUE", parametros)
+
+
+# ===============================
+# PAINÉIS ENTIDADE × ANO
+# ===============================
+
+def _entidades_nivel(base, nivel):
+    """Todas as entidades de um nível, ordenadas como nos painéis do backend pandas."""
+    catalogo = base.catalogo
+    if nivel == "municipio":
+        return sorted(catalogo.uf_por_codigo)
+    if nivel == "uf":
+        return list(catalogo.ufs_por_regiao.get("Brasil", ()))
+    if nivel == "regiao":
+        return sorted(catalogo.regioes)
+    return ["Brasil"]
+
+
+def _matriz(base, nivel, coluna, entidades, anos):
+    """
+    Rótulos e matriz entidade × ano de uma coluna (NaN onde não há dado), só
+    com as entidades (padrão: todas do nível) e anos pedidos.
+    """
+    if nivel not in NIVEIS_PAINEL:
+        raise ValueError(f"Nível inválido: {nivel!r} (use um de {NIVEIS_PAINEL})")
+    if coluna not in COLUNAS_PAINEL:
+        raise ValueError(f"Coluna sem painel: {coluna!r} (use uma de {COLUNAS_PAINEL})")
+
+    rotulos = _entidades_nivel(base, nivel) if entidades is None else list(entidades)
+    parametros = []
+    condicoes = [_em("ano", anos, parametros)]
+    expressao = POPULACAO_SQL if coluna == "populacao" else coluna
+
+    if nivel == "municipio":
+        entidade, valor, agrupar = "cod_municipio", expressao, ""
+        if entidades is not None:
+            codigos = [int(cod) for cod in rotulos if isinstance(cod, (int, np.integer))]
+            condicoes.append(_em("cod_municipio", codigos, parametros))
+    else:
+        entidade, agrupar = NIVEIS_SQL[nivel][0], "GROUP BY ALL"
+        if coluna == "pib_per_capita":
+            valor = f"fsum(pib_total) / (fsum({POPULACAO_SQL}) / 1000)"
+        else:
+            # Somas de valores ausentes (VAB após 2021) valem 0, como no cubo do backend pandas
+            valor = f"COALESCE(fsum({expressao}), 0)"
+        if entidades is not None:
+            if nivel == "brasil":
+                condicoes.append("TRUE" if "Brasil" in rotulos else "FALSE")
+            else:
+                condicoes.append(_em(entidade, [str(rotulo) for rotulo in rotulos], parametros))
+
+    longo = base.consultar(
+        f"SELECT {entidade} AS entidade, ano, {valor} AS valor FROM base WHERE {' AND '.join(condicoes)} {agrupar}",
+        parametros
+    )
+    largo = longo.pivot(index="entidade", columns="ano", values="valor")
+    return rotulos, largo.reindex(index=rotulos, columns=list(anos)).to_numpy(dtype="float64")
+
+
+def _crescimento_entidade(base, nivel, entidade, ano_ini, ano_fim, coluna="pib_total"):
+    """Crescimento (%) de uma entidade entre dois anos (None quando falta um dos anos)."""
+    _, matriz = _matriz(base, nivel, coluna, [entidade], [ano_ini, ano_fim])
+    inicio, fim = matriz[0]
+    if np.isnan(inicio) or np.isnan(fim) or inicio == 0:
+        return None
+    return float(((fim - inicio) / inicio) * 100)
+
+
+def _anos_entre(base, ano_ini, ano_fim):
+    return [
+        ano for ano in base.anos_painel
+        if (ano_ini is None or ano >= ano_ini) and (ano_fim is None or ano <= ano_fim)
+    ]
+
+
+def tabela_setorial(base, nivel, entidades=None, ano_ini=None, ano_fim=None):
+    """Versão SQL de data.tabela_setorial (a partir das linhas dos municípios ou do cubo)."""
+    if nivel not in NIVEIS_PAINEL:
+        raise ValueError(f"Nível inválido: {nivel!r} (use um de {NIVEIS_PAINEL})")
+    anos = _anos_entre(base, ano_ini, ano_fim)
+    if nivel == "municipio" and entidades is not None:
+        # Entidades do nível município são códigos IBGE
+        entidades = [entidade for entidade in entidades if not isinstance(entidade, str)]
+    if not anos or (entidades is not None and not list(entidades)):
+        linhas = pd.DataFrame(columns=["entidade", "ano", *COLUNAS_VAB])
+    elif nivel == "municipio":
+        municipios = None if entidades is None else [int(cod) for cod in entidades]
+        linhas = filtrar_dados(
+            base, municipios=municipios, ano_ini=anos[0], ano_fim=anos[-1], colunas=["cod_municipio", "ano", *COLUNAS_VAB]
+        ).rename(columns={"cod_municipio": "entidade"})
+    else:
+        linhas = cubo_agregado(base, nivel, entidades, anos[0], anos[-1])
+    return _tabela_setorial_linhas(linhas, entidades)
+
+
+def painel_anual(base, nivel, coluna="pib_total", entidades=None, ano_ini=None, ano_fim=None):
+    """Versão SQL de data.painel_anual."""
+    anos = _anos_entre(base, ano_ini, ano_fim)
+    rotulos, matriz = _matriz(base, nivel, coluna, entidades, anos)
+    return pd.DataFrame(matriz, index=pd.Index(rotulos, name="entidade"), columns=anos)
+
+
+def crescimento_entre_anos(base, nivel, ano_ini, ano_fim, coluna="pib_total", entidades=None):
+    """Versão SQL de data.crescimento_entre_anos."""
+    rotulos, matriz = _matriz(base, nivel, coluna, entidades, [ano_ini, ano_fim])
+    inicio, fim = matriz[:, 0], matriz[:, 1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        crescimento = np.where(inicio != 0, ((fim - inicio) / inicio) * 100, np.nan)
+    return pd.Series(crescimento, index=pd.Index(rotulos, name="entidade"), name=coluna)
+
+
+def crescimento_anual(base, nivel, coluna="pib_total", entidades=None, ano_ini=None, ano_fim=None):
+    """Versão SQL de data.crescimento_anual."""
+    rotulos, selecao = _matriz(base, nivel, coluna, entidades, base.anos_painel)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        anterior = selecao[:, :-1]
+        crescimento = np.full(selecao.shape, np.nan)
+        crescimento[:, 1:] = np.where(anterior != 0, ((selecao[:, 1:] - anterior) / anterior) * 100, np.nan)
+    anos = np.array(base.anos_painel)
+    colunas = np.isin(anos, _anos_entre(base, ano_ini, ano_fim))
+    return pd.DataFrame(crescimento[:, colunas], index=pd.Index(rotulos, name="entidade"), columns=anos[colunas].tolist())
+
+
+def crescimento_composto(base, nivel, ano_ini, ano_fim, coluna="pib_total", entidades=None):
+    """Versão SQL de data.crescimento_composto."""
+    rotulos, matriz = _matriz(base, nivel, coluna, entidades, [ano_ini, ano_fim])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        razao = matriz[:, 1] / matriz[:, 0]
+        if ano_fim > ano_ini:
+            taxa = np.where(razao > 0, (np.power(razao, 1 / (ano_fim - ano_ini)) - 1) * 100, np.nan)
+        else:
+            taxa = np.full(len(razao), np.nan)
+    return pd.Series(taxa, index=pd.Index(rotulos, name="entidade"), name=coluna)
+
+
+# ===============================
+# KPIs DE VÁRIOS MUNICÍPIOS
+# ===============================
+
+@memorizar
+def kpis_municipios(base, municipios, ano_ref, ano_ini, ano_fim):
+    """Versão SQL de data.kpis_municipios (uma consulta para as linhas dos municípios)."""
+    codigos = list(dict.fromkeys(int(cod) for cod in municipios))
+    ano_vab = min(ano_ref, 2021)
+    parametros = [ano_ref, ano_vab]
+    linhas = _linhas(base, f"ano IN (?, ?) AND {_em('cod_municipio', codigos, parametros)}", parametros)
+
+    referencia = linhas[linhas["ano"] == ano_ref].set_index("cod_municipio")
+    codigos = [cod for cod in codigos if cod in referencia.index]
+    referencia = referencia.loc[codigos].reset_index()
+    vab = linhas[linhas["ano"] == ano_vab].set_index("cod_municipio").reindex(codigos)
+
+    # Colunas montadas em um dict e convertidas em DataFrame uma única vez
+    tabela = {
+        coluna: referencia[coluna]
+        for coluna in ["cod_municipio", "nome_municipio", "sigla_uf", "pib_total", "pib_per_capita"]
+    }
+    pib = tabela["pib_total"].to_numpy(dtype=float)
+    ppc = tabela["pib_per_capita"].to_numpy(dtype=float)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tabela["populacao"] = np.where(ppc > 0, pib / ppc * 1000, 0).astype(np.int64)
+
+        # Participações setoriais no ano de VAB (0 quando não há VAB)
+        vab_total = vab["vab_total"].to_numpy(dtype=float)
+        for coluna, setor in zip(COLUNAS_VAB, NOMES_SETORES):
+            tabela[f"{setor} (%)"] = np.where(vab_total > 0, vab[coluna].to_numpy(dtype=float) / vab_total * 100, 0)
+        tabela["dependencia_publica"] = tabela["Administração Pública (%)"]
+        com_vab = vab["ano"].notna().to_numpy()
+        setor_dominante = np.full(len(codigos), None, dtype=object)
+        setor_dominante[com_vab] = vab["atividade_maior_vab"].to_numpy(dtype=object)[com_vab]
+        tabela["setor_dominante"] = setor_dominante
+
+    tabela["crescimento_ano_anterior"] = crescimento_entre_anos(
+        base, "municipio", ano_ref - 1, ano_ref, entidades=codigos
+    ).to_numpy()
+    tabela["cresc_ppc_ano_anterior"] = crescimento_entre_anos(
+        base, "municipio", ano_ref - 1, ano_ref, "pib_per_capita", entidades=codigos
+    ).to_numpy()
+    tabela["crescimento_periodo"] = crescimento_entre_anos(base, "municipio", ano_ini, ano_fim, entidades=codigos).to_numpy()
+
+    return pd.DataFrame(tabela)
+
+
+# ===============================
+# RANKINGS
+# ===============================
+
+def _escopo_ranking(metrica, ano, uf):
+    """Consulta dos valores válidos (não nulos) de uma métrica em um ano, na UF ou no Brasil."""
+    parametros = [ano]
+    condicao = f"ano = ? AND NOT isnan({_valor_metrica(metrica)})"
+    if uf:
+        condicao += " AND sigla_uf = ?"
+        parametros.append(uf)
+    return condicao, parametros
+
+
+def posicao_ranking(base, municipio, ano, metrica="pib_total", nacional=False, uf=None):
+    """Versão SQL de data.posicao_ranking (empates na ordem da base)."""
+    valor = _valor_metrica(metrica)
+    cod = resolver_municipio(base, municipio, uf)
+    if cod is None:
+        return None
+
+    condicao, parametros = _escopo_ranking(metrica, ano, None if nacional else base.catalogo.uf_por_codigo[cod])
+    posicao, total = base.consultar_linha(f"""
+        WITH escopo AS (SELECT cod_municipio, {valor} AS valor FROM base WHERE {condicao}),
+        referencia AS (SELECT valor FROM escopo WHERE cod_municipio = ?)
+        SELECT 1 + count(*) FILTER (
+                   WHERE escopo.valor > referencia.valor
+                   OR (escopo.valor = referencia.valor AND escopo.cod_municipio < ?)
+               ),
+               count(*)
+        FROM escopo, referencia
+    """, [*parametros, cod, cod])
+    if total == 0:
+        return None
+    return {"posicao": int(posicao), "total": int(total)}
+
+
+def pagina_ranking(base, ano, metrica="pib_total", uf=None, posicao_ini=1, posicao_fim=10):
+    """Versão SQL de data.pagina_ranking."""
+    valor = _valor_metrica(metrica)
+    condicao, parametros = _escopo_ranking(metrica, ano, uf if uf and uf != "Todas" else None)
+    total = base.consultar_linha(f"SELECT count(*) FROM base WHERE {condicao}", parametros)[0]
+
+    # Posições de 1 a total (negativas contadas a partir do fim)
+    ini = posicao_ini + total + 1 if posicao_ini < 0 else posicao_ini
+    fim = posicao_fim + total + 1 if posicao_fim < 0 else posicao_fim
+    ini, fim = max(ini, 1), min(fim, total)
+    trecho = base.consultar(f"""
+        SELECT cod_municipio, nome_municipio, sigla_uf, {valor} AS valor FROM base WHERE {condicao}
+        ORDER BY valor DESC, cod_municipio LIMIT ? OFFSET ?
+    """, [*parametros, max(fim - ini + 1, 0), ini - 1])
+
+    return pd.DataFrame({
+        "Posição": np.arange(ini, ini + len(trecho)),
+        "cod_municipio": trecho["cod_municipio"].to_numpy(dtype="int32"),
+        "Município": trecho["nome_municipio"].to_numpy(dtype=object),
+        "UF": trecho["sigla_uf"].to_numpy(dtype=object),
+        metrica: trecho["valor"].to_numpy(dtype="float64")
+    })
+
+
+def _topo_ranking(base, uf, ano, metrica, top_n):
+    """Nome e métrica dos top_n municípios da UF, com o índice da base."""
+    condicao, parametros = _escopo_ranking(metrica, ano, uf)
+    linhas = base.consultar(f"""
+        SELECT linha FROM base_linhas WHERE {condicao}
+        ORDER BY {_valor_metrica(metrica)} DESC, cod_municipio LIMIT ?
+    """, [*parametros, int(top_n)])["linha"].tolist()
+    topo = _linhas_por_posicao(base, linhas, ["nome_municipio", metrica])
+    return {coluna: topo[coluna] for coluna in ["nome_municipio", metrica]}
+
+
+# ===============================
+# INSTRUMENTAÇÃO
+# ===============================
+
+# As funções entram em data.py já cronometradas, com os mesmos nomes do backend pandas
+instrumentar_modulo(globals())
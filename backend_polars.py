@@ -0,0 +1,650 @@
+"""
+Backend Polars das consultas de data.py sobre o parquet da base.
+
+Com PIB_BACKEND=polars, load_data() retorna uma BasePolars no lugar do
+DataFrame e as funções de acesso aos dados de data.py (as mesmas trocadas
+pelo backend DuckDB, ver backend_duckdb.FUNCOES) passam a ser consultas
+preguiçosas (LazyFrame) sobre o parquet: filtros e colunas são empurrados
+para a leitura do arquivo (só as partições, grupos de linhas e colunas
+necessários são lidos) e a execução usa todos os núcleos. O resultado volta
+em pandas, no esquema compacto, de modo que as funções de KPIs, rankings,
+composições e tabelas de data.py e o app não mudam (conferido por
+benchmarks/paridade.py --backend polars).
+
+O processo guarda apenas o catálogo geográfico e a posição de cada
+(município, ano) na base ordenada, para que as linhas retornadas tenham o
+mesmo índice que teriam no DataFrame. O número de threads segue
+POLARS_MAX_THREADS (padrão: uma por núcleo).
+"""
+import os
+from functools import cached_property, reduce
+
+import numpy as np
+import pandas as pd
+import polars as pl
+import streamlit as st
+
+from cache import memorizar, registrar_base
+from data import (
+    ARQUIVO_DADOS, COLUNAS_BASE, COLUNAS_CUBO, COLUNAS_PAINEL, COLUNAS_VAB, METRICAS_RANKING, NIVEIS_PAINEL,
+    NOMES_SETORES, ORDEM_BASE, VERSOES_EM_MEMORIA, CatalogoGeografico, _com_razoes, _tabela_setorial_linhas,
+    _versao_arquivo, compactar_base
+)
+from instrumentacao import instrumentar_modulo
+
+
+# Funções de data.py substituídas por instalar() (as mesmas do backend DuckDB)
+FUNCOES = [
+    "load_data", "catalogo_geografico", "resolver_municipio", "obter_uf_municipio", "dados_municipio_ano",
+    "dados_uf_ano", "dados_regiao_ano", "filtrar_dados", "totais_agregados", "cubo_agregado",
+    "painel_anual", "crescimento_entre_anos", "crescimento_anual", "crescimento_composto",
+    "_crescimento_entidade", "kpis_municipios", "posicao_ranking", "pagina_ranking", "_topo_ranking",
+    "municipios_populacao_proxima", "tabela_setorial"
+]
+
+# População (habitantes) de cada linha, como no backend pandas: (PIB / PIB per capita) * 1000
+POPULACAO = (pl.col("pib_total") / pl.col("pib_per_capita")) * 1000
+
+# Totais aditivos somados por UF e, a partir deles, por região e Brasil (como no cubo do backend pandas)
+COLUNAS_SOMA = ["pib_total", "populacao", *COLUNAS_VAB, "vab_total"]
+
+# Expressões de entidade e região de cada nível agregado
+NIVEIS_POLARS = {
+    "uf": (pl.col("sigla_uf"), pl.col("nome_grande_regiao")),
+    "regiao": (pl.col("nome_grande_regiao"), pl.col("nome_grande_regiao")),
+    "brasil": (pl.lit("Brasil"), pl.lit("Brasil"))
+}
+
+
+class BasePolars:
+    """
+    Base em parquet (arquivo único ou diretório particionado) lida sob demanda pelo Polars.
+
+    Ocupa o lugar do DataFrame base nas funções de data.py: tem
+    attrs["versao_base"] e len(), usados pelo cache de consultas, mas as
+    linhas ficam no parquet e cada consulta parte do LazyFrame `linhas`,
+    que acrescenta a coluna `linha`, posição da linha na base ordenada por
+    ORDEM_BASE. Consultas de sessões em threads diferentes rodam em paralelo.
+    """
+
+    def __init__(self, arquivo=ARQUIVO_DADOS):
+        self.arquivo = str(arquivo)
+        self.attrs = {"versao_base": _versao_arquivo(arquivo) + "-polars"}
+
+        if os.path.isdir(arquivo):
+            origem = pl.scan_parquet(
+                os.path.join(self.arquivo, "**", "*.parquet"),
+                hive_partitioning=True, hive_schema={"ano": pl.Int16, "sigla_uf": pl.String}
+            )
+        else:
+            origem = pl.scan_parquet(self.arquivo)
+        self.origem = origem.select(COLUNAS_BASE)
+
+        self.posicoes = (
+            self.origem.select(ORDEM_BASE).sort(ORDEM_BASE)
+            .with_row_index("linha").select(pl.col("linha").cast(pl.Int64), "cod_municipio", "ano")
+            .collect()
+        )
+        self.linhas = self.origem.join(self.posicoes.lazy(), on=["cod_municipio", "ano"], how="inner")
+
+        anos = self.posicoes["ano"].unique().sort().to_list()
+        # Anos consecutivos do primeiro ao último, como as colunas dos painéis do backend pandas
+        self.anos_painel = list(range(anos[0], anos[-1] + 1)) if anos else []
+
+    def __len__(self):
+        return self.posicoes.height
+
+    def __getitem__(self, coluna):
+        """Coluna da base como Series, na ordem da base (para código que lê colunas diretamente)."""
+        _validar_colunas([coluna])
+        return compactar_base(self.consultar(self.linhas.sort("linha").select(coluna)))[coluna]
+
+    def consultar(self, consulta):
+        """Executa um LazyFrame e retorna o resultado em um DataFrame pandas."""
+        return consulta.collect().to_pandas()
+
+    def para_pandas(self):
+        """Base inteira em um DataFrame no esquema compacto (ferramentas de benchmark e paridade)."""
+        return compactar_base(self.consultar(self.linhas.sort("linha").select(COLUNAS_BASE)))
+
+    def memoria_bytes(self):
+        """Memória ocupada pelas posições das linhas (a base fica no parquet)."""
+        return int(self.posicoes.estimated_size())
+
+    @cached_property
+    def catalogo(self):
+        municipios = self.consultar(
+            self.linhas.sort("linha").unique("cod_municipio", keep="first", maintain_order=True)
+            .select("cod_grande_regiao", "nome_grande_regiao", "sigla_uf", "cod_municipio", "nome_municipio")
+        )
+        return CatalogoGeografico(municipios)
+
+    @cached_property
+    def codigos_por_nome(self):
+        codigos_por_nome = {}
+        for cod, nome in sorted(self.catalogo.nome_por_codigo.items()):
+            codigos_por_nome.setdefault(nome, []).append(cod)
+        return codigos_por_nome
+
+    @cached_property
+    def regiao_por_uf(self):
+        return {
+            uf: regiao for regiao in self.catalogo.regioes for uf in self.catalogo.ufs_por_regiao[regiao]
+        }
+
+
+def instalar(namespace):
+    """
+    Troca as funções de acesso aos dados de data.py pelas versões em Polars.
+
+    Chamado ao final de data.py com globals() quando PIB_BACKEND=polars: as
+    demais funções de data.py buscam essas funções no módulo a cada chamada
+    e passam a consultar o Polars.
+
+    Args:
+        namespace: Dicionário global de data.py
+    """
+    for nome in FUNCOES:
+        namespace[nome] = globals()[nome]
+
+
+def load_data(float32=None, arquivo=ARQUIVO_DADOS):
+    """
+    Prepara a leitura preguiçosa da base em parquet (uma por versão da base, compartilhada pelas sessões).
+
+    Args:
+        float32: Ignorado (o Polars lê as colunas monetárias como estão no parquet)
+        arquivo: Caminho do arquivo parquet ou do diretório particionado
+                 (padrão: ARQUIVO_DADOS)
+
+    Returns:
+        BasePolars
+    """
+    return _abrir_base(arquivo, _versao_arquivo(arquivo))
+
+
+@st.cache_resource(max_entries=VERSOES_EM_MEMORIA)
+def _abrir_base(arquivo, versao):
+    return registrar_base(BasePolars(arquivo))
+
+
+# ===============================
+# AUXILIARES
+# ===============================
+
+def _em(coluna, valores):
+    """Condição `coluna in valores` para um nome ou expressão de coluna (falsa para lista vazia)."""
+    valores = list(valores)
+    if not valores:
+        return pl.lit(False)
+    return (pl.col(coluna) if isinstance(coluna, str) else coluna).is_in(valores)
+
+
+def _e(condicoes):
+    """Conjunção das condições (verdadeira se não houver nenhuma)."""
+    return reduce(lambda a, b: a & b, condicoes) if condicoes else pl.lit(True)
+
+
+def _validos(expressao):
+    """Valores presentes (nem nulos nem NaN), como notna() no backend pandas."""
+    return expressao.is_not_null() & expressao.is_not_nan()
+
+
+def _validar_colunas(colunas):
+    """Só nomes de colunas da base são aceitos (KeyError, como no DataFrame)."""
+    desconhecidas = [col for col in colunas if col not in COLUNAS_BASE]
+    if desconhecidas:
+        raise KeyError(f"Colunas fora da base: {desconhecidas}")
+
+
+def _linhas(base, condicao, colunas=None):
+    """Linhas da base que atendem à condição, na ordem e com o índice da base."""
+    colunas = COLUNAS_BASE if colunas is None else list(colunas)
+    _validar_colunas(colunas)
+    resultado = base.consultar(base.linhas.filter(condicao).sort("linha").select("linha", *colunas))
+    return compactar_base(resultado.set_index("linha").rename_axis(None))
+
+
+def _linhas_por_posicao(base, posicoes, colunas=None):
+    """Linhas da base nas posições dadas, na ordem dada."""
+    return _linhas(base, _em("linha", posicoes), colunas).loc[posicoes]
+
+
+def _valor_metrica(metrica):
+    """Expressão de uma métrica de ranking."""
+    if metrica not in METRICAS_RANKING:
+        raise ValueError(f"Métrica sem ranking: {metrica!r} (use uma de {METRICAS_RANKING})")
+    return POPULACAO if metrica == "populacao" else pl.col(metrica)
+
+
+# ===============================
+# CATÁLOGO E LINHAS DA BASE
+# ===============================
+
+def catalogo_geografico(base):
+    """Retorna o catálogo região → UF → município da base (ver CatalogoGeografico)."""
+    return base.catalogo
+
+
+def resolver_municipio(base, municipio, uf=None):
+    """Versão Polars de data.resolver_municipio (consulta o catálogo da base)."""
+    if municipio is None:
+        return None
+    uf_por_codigo = base.catalogo.uf_por_codigo
+    if not isinstance(municipio, str):
+        return int(municipio) if int(municipio) in uf_por_codigo else None
+
+    codigos = base.codigos_por_nome.get(municipio, [])
+    if uf and uf != "Todas":
+        codigos = [cod for cod in codigos if uf_por_codigo[cod] == uf]
+    return codigos[0] if codigos else None
+
+
+def obter_uf_municipio(base, municipio):
+    """Retorna a sigla da UF de um município (código ou nome)."""
+    return base.catalogo.uf_por_codigo.get(resolver_municipio(base, municipio))
+
+
+def dados_municipio_ano(base, municipio, ano, uf=None):
+    """Versão Polars de data.dados_municipio_ano."""
+    cod = resolver_municipio(base, municipio, uf)
+    if cod is None:
+        return None
+    linhas = _linhas(base, (pl.col("cod_municipio") == cod) & (pl.col("ano") == ano))
+    return linhas.iloc[0] if len(linhas) else None
+
+
+def dados_uf_ano(base, uf, ano):
+    """Retorna as linhas dos municípios de uma UF em um ano."""
+    return _linhas(base, (pl.col("sigla_uf") == uf) & (pl.col("ano") == ano))
+
+
+def dados_regiao_ano(base, regiao, ano):
+    """Retorna as linhas dos municípios de uma região (ou do Brasil) em um ano."""
+    if regiao == "Brasil":
+        return _linhas(base, pl.col("ano") == ano)
+    return _linhas(base, (pl.col("nome_grande_regiao") == regiao) & (pl.col("ano") == ano))
+
+
+def filtrar_dados(base, regiao=None, uf=None, municipios=None, ano_ini=None, ano_fim=None, colunas=None):
+    """Versão Polars de data.filtrar_dados (mesmos filtros, linhas na ordem e com o índice da base)."""
+    condicoes = []
+    if ano_ini and ano_fim:
+        condicoes.append(pl.col("ano").is_between(ano_ini, ano_fim))
+
+    if regiao == "Brasil":
+        regiao = None
+    if uf == "Todas":
+        uf = None
+
+    if municipios:
+        # Nomes incluem todos os municípios homônimos; UF e região restringem a seleção
+        codigos = []
+        for municipio in municipios:
+            if isinstance(municipio, str):
+                codigos.extend(base.codigos_por_nome.get(municipio, []))
+            else:
+                codigos.append(int(municipio))
+        uf_por_codigo = base.catalogo.uf_por_codigo
+        codigos = [
+            cod for cod in sorted(set(codigos))
+            if (not uf or uf_por_codigo.get(cod) == uf)
+            and (not regiao or base.regiao_por_uf.get(uf_por_codigo.get(cod)) == regiao)
+        ]
+        condicoes.append(_em("cod_municipio", codigos))
+    elif uf:
+        if regiao and base.regiao_por_uf.get(uf) != regiao:
+            condicoes.append(pl.lit(False))
+        else:
+            condicoes.append(pl.col("sigla_uf") == uf)
+    elif regiao:
+        condicoes.append(pl.col("nome_grande_regiao") == regiao)
+
+    return _linhas(base, _e(condicoes), colunas)
+
+
+def municipios_populacao_proxima(base, municipio, ano, k=10, uf=None, nacional=False):
+    """Versão Polars de data.municipios_populacao_proxima (k vizinhos por diferença de população)."""
+    cod = resolver_municipio(base, municipio, uf)
+    referencia = (
+        _linhas(base, (pl.col("cod_municipio") == cod) & (pl.col("ano") == ano)) if cod is not None else None
+    )
+    if referencia is None or referencia.empty or (uf and uf != "Todas" and base.catalogo.uf_por_codigo[cod] != uf):
+        return _linhas(base, pl.lit(False))
+
+    populacao = (referencia["pib_total"].iloc[0] / referencia["pib_per_capita"].iloc[0]) * 1000
+    if np.isnan(populacao):
+        return referencia
+
+    # Menor diferença primeiro; empates pela ordem da base
+    condicoes = [pl.col("ano") == ano, pl.col("cod_municipio") != cod, _validos(POPULACAO)]
+    if not nacional:
+        condicoes.append(pl.col("sigla_uf") == base.catalogo.uf_por_codigo[cod])
+    vizinhos = (
+        base.linhas.filter(_e(condicoes))
+        .select("linha", diferenca=(POPULACAO - float(populacao)).abs())
+        .sort(["diferenca", "linha"]).head(int(k))
+        .collect()["linha"].to_list()
+    )
+
+    if not vizinhos:
+        return referencia
+    return pd.concat([referencia, _linhas_por_posicao(base, vizinhos)])
+
+
+# ===============================
+# CUBO DE AGREGADOS
+# ===============================
+
+def _somas(base, nivel, condicao):
+    """
+    LazyFrame com os totais de COLUNAS_CUBO por (entidade, ano) de um nível:
+    somas por UF e, a partir delas, pelo nível pedido.
+    """
+    entidade, regiao = NIVEIS_POLARS[nivel]
+    por_uf = (
+        base.origem.filter(condicao)
+        .group_by("nome_grande_regiao", "sigla_uf", "ano")
+        .agg(*[pl.col(col).sum() for col in ["pib_total", *COLUNAS_VAB, "vab_total"]],
+             POPULACAO.sum().alias("populacao"), pl.len().alias("num_municipios"))
+    )
+    return (
+        por_uf.group_by(entidade.alias("entidade"), regiao.alias("nome_grande_regiao"), "ano")
+        .agg(*[pl.col(col).sum() for col in COLUNAS_SOMA],
+             pl.col("num_municipios").sum().cast(pl.Int64), pl.len().cast(pl.Int64).alias("num_ufs"))
+        .select("entidade", "nome_grande_regiao", "ano", *COLUNAS_CUBO)
+    )
+
+
+def _cubo(base, nivel, condicao):
+    """Totais de COLUNAS_CUBO e setor dominante por (entidade, ano) de um nível."""
+    entidade, _ = NIVEIS_POLARS[nivel]
+    # Setor dominante: atividade cujos municípios somam o maior PIB (empate: ordem alfabética)
+    dominantes = (
+        base.origem.filter(condicao & pl.col("atividade_maior_vab").is_not_null())
+        .group_by(entidade.alias("entidade"), "ano", "atividade_maior_vab")
+        .agg(pl.col("pib_total").sum())
+        .group_by("entidade", "ano")
+        .agg(pl.col("atividade_maior_vab").sort_by(["pib_total", "atividade_maior_vab"], descending=[True, False])
+             .first().alias("setor_dominante"))
+    )
+    cubo = base.consultar(_somas(base, nivel, condicao).join(dominantes, on=["entidade", "ano"], how="left"))
+    cubo = cubo.astype({"ano": "int16"}).sort_values(["entidade", "ano"], ignore_index=True)
+    # Sem atividade informada (anos sem VAB), o setor dominante fica NaN, como no cubo do backend pandas
+    cubo["setor_dominante"] = cubo["setor_dominante"].where(cubo["setor_dominante"].notna(), np.nan)
+    return _com_razoes(cubo)
+
+
+def totais_agregados(base, nivel, entidade, ano):
+    """Versão Polars de data.totais_agregados (dict com COLUNAS_CUBO ou None)."""
+    condicao = (pl.col("ano") == ano) & (NIVEIS_POLARS[nivel][0] == entidade)
+    totais = _somas(base, nivel, condicao).collect()
+    if totais.is_empty():
+        return None
+    return {col: totais[col][0] for col in COLUNAS_CUBO}
+
+
+def cubo_agregado(base, nivel, entidades=None, ano_ini=None, ano_fim=None, regiao=None):
+    """Versão Polars de data.cubo_agregado (mesmas colunas, filtros e ordem)."""
+    condicoes = []
+    if entidades is not None:
+        if nivel == "brasil":
+            condicoes.append(pl.lit("Brasil" in list(entidades)))
+        else:
+            condicoes.append(_em(NIVEIS_POLARS[nivel][0], [str(entidade) for entidade in entidades]))
+    if regiao and regiao != "Brasil":
+        # O nível Brasil não pertence a nenhuma região
+        condicoes.append(pl.lit(False) if nivel == "brasil" else pl.col("nome_grande_regiao") == regiao)
+    if ano_ini is not None:
+        condicoes.append(pl.col("ano").is_between(ano_ini, ano_ini if ano_fim is None else ano_fim))
+    return _cubo(base, nivel, _e(condicoes))
+
+
+# ===============================
+# PAINÉIS ENTIDADE × ANO
+# ===============================
+
+def _entidades_nivel(base, nivel):
+    """Todas as entidades de um nível, ordenadas como nos painéis do backend pandas."""
+    catalogo = base.catalogo
+    if nivel == "municipio":
+        return sorted(catalogo.uf_por_codigo)
+    if nivel == "uf":
+        return list(catalogo.ufs_por_regiao.get("Brasil", ()))
+    if nivel == "regiao":
+        return sorted(catalogo.regioes)
+    return ["Brasil"]
+
+
+def _matriz(base, nivel, coluna, entidades, anos):
+    """
+    Rótulos e matriz entidade × ano de uma coluna (NaN onde não há dado), só
+    com as entidades (padrão: todas do nível) e anos pedidos.
+    """
+    if nivel not in NIVEIS_PAINEL:
+        raise ValueError(f"Nível inválido: {nivel!r} (use um de {NIVEIS_PAINEL})")
+    if coluna not in COLUNAS_PAINEL:
+        raise ValueError(f"Coluna sem painel: {coluna!r} (use uma de {COLUNAS_PAINEL})")
+
+    rotulos = _entidades_nivel(base, nivel) if entidades is None else list(entidades)
+    condicoes = [_em("ano", anos)]
+
+    if nivel == "municipio":
+        if entidades is not None:
+            condicoes.append(_em("cod_municipio", [int(cod) for cod in rotulos if isinstance(cod, (int, np.integer))]))
+        valor = POPULACAO if coluna == "populacao" else pl.col(coluna)
+        longo = base.origem.filter(_e(condicoes)).select(entidade=pl.col("cod_municipio"), ano=pl.col("ano"), valor=valor)
+    else:
+        if entidades is not None:
+            if nivel == "brasil":
+                condicoes.append(pl.lit("Brasil" in rotulos))
+            else:
+                condicoes.append(_em(NIVEIS_POLARS[nivel][0], [str(rotulo) for rotulo in rotulos]))
+        if coluna == "pib_per_capita":
+            valor = pl.col("pib_total") / (pl.col("populacao") / 1000)
+        else:
+            valor = pl.col(coluna)
+        longo = _somas(base, nivel, _e(condicoes)).select("entidade", "ano", valor=valor)
+
+    largo = base.consultar(longo).pivot(index="entidade", columns="ano", values="valor")
+    return rotulos, largo.reindex(index=rotulos, columns=list(anos)).to_numpy(dtype="float64")
+
+
+def _crescimento_entidade(base, nivel, entidade, ano_ini, ano_fim, coluna="pib_total"):
+    """Crescimento (%) de uma entidade entre dois anos (None quando falta um dos anos)."""
+    _, matriz = _matriz(base, nivel, coluna, [entidade], [ano_ini, ano_fim])
+    inicio, fim = matriz[0]
+    if np.isnan(inicio) or np.isnan(fim) or inicio == 0:
+        return None
+    return float(((fim - inicio) / inicio) * 100)
+
+
+def _anos_entre(base, ano_ini, ano_fim):
+    return [
+        ano for ano in base.anos_painel
+        if (ano_ini is None or ano >= ano_ini) and (ano_fim is None or ano <= ano_fim)
+    ]
+
+
+def tabela_setorial(base, nivel, entidades=None, ano_ini=None, ano_fim=None):
+    """Versão Polars de data.tabela_setorial (a partir das linhas dos municípios ou do cubo)."""
+    if nivel not in NIVEIS_PAINEL:
+        raise ValueError(f"Nível inválido: {nivel!r} (use um de {NIVEIS_PAINEL})")
+    anos = _anos_entre(base, ano_ini, ano_fim)
+    if nivel == "municipio" and entidades is not None:
+        # Entidades do nível município são códigos IBGE
+        entidades = [entidade for entidade in entidades if not isinstance(entidade, str)]
+    if not anos or (entidades is not None and not list(entidades)):
+        linhas = pd.DataFrame(columns=["entidade", "ano", *COLUNAS_VAB])
+    elif nivel == "municipio":
+        municipios = None if entidades is None else [int(cod) for cod in entidades]
+        linhas = filtrar_dados(
+            base, municipios=municipios, ano_ini=anos[0], ano_fim=anos[-1], colunas=["cod_municipio", "ano", *COLUNAS_VAB]
+        ).rename(columns={"cod_municipio": "entidade"})
+    else:
+        linhas = cubo_agregado(base, nivel, entidades, anos[0], anos[-1])
+    return _tabela_setorial_linhas(linhas, entidades)
+
+
+def painel_anual(base, nivel, coluna="pib_total", entidades=None, ano_ini=None, ano_fim=None):
+    """Versão Polars de data.painel_anual."""
+    anos = _anos_entre(base, ano_ini, ano_fim)
+    rotulos, matriz = _matriz(base, nivel, coluna, entidades, anos)
+    return pd.DataFrame(matriz, index=pd.Index(rotulos, name="entidade"), columns=anos)
+
+
+def crescimento_entre_anos(base, nivel, ano_ini, ano_fim, coluna="pib_total", entidades=None):
+    """Versão Polars de data.crescimento_entre_anos."""
+    rotulos, matriz = _matriz(base, nivel, coluna, entidades, [ano_ini, ano_fim])
+    inicio, fim = matriz[:, 0], matriz[:, 1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        crescimento = np.where(inicio != 0, ((fim - inicio) / inicio) * 100, np.nan)
+    return pd.Series(crescimento, index=pd.Index(rotulos, name="entidade"), name=coluna)
+
+
+def crescimento_anual(base, nivel, coluna="pib_total", entidades=None, ano_ini=None, ano_fim=None):
+    """Versão Polars de data.crescimento_anual."""
+    rotulos, selecao = _matriz(base, nivel, coluna, entidades, base.anos_painel)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        anterior = selecao[:, :-1]
+        crescimento = np.full(selecao.shape, np.nan)
+        crescimento[:, 1:] = np.where(anterior != 0, ((selecao[:, 1:] - anterior) / anterior) * 100, np.nan)
+    anos = np.array(base.anos_painel)
+    colunas = np.isin(anos, _anos_entre(base, ano_ini, ano_fim))
+    return pd.DataFrame(crescimento[:, colunas], index=pd.Index(rotulos, name="entidade"), columns=anos[colunas].tolist())
+
+
+def crescimento_composto(base, nivel, ano_ini, ano_fim, coluna="pib_total", entidades=None):
+    """Versão Polars de data.crescimento_composto."""
+    rotulos, matriz = _matriz(base, nivel, coluna, entidades, [ano_ini, ano_fim])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        razao = matriz[:, 1] / matriz[:, 0]
+        if ano_fim > ano_ini:
+            taxa = np.where(razao > 0, (np.power(razao, 1 / (ano_fim - ano_ini)) - 1) * 100, np.nan)
+        else:
+            taxa = np.full(len(razao), np.nan)
+    return pd.Series(taxa, index=pd.Index(rotulos, name="entidade"), name=coluna)
+
+
+# ===============================
+# KPIs DE VÁRIOS MUNICÍPIOS
+# ===============================
+
+@memorizar
+def kpis_municipios(base, municipios, ano_ref, ano_ini, ano_fim):
+    """Versão Polars de data.kpis_municipios (uma consulta para as linhas dos municípios)."""
+    codigos = list(dict.fromkeys(int(cod) for cod in municipios))
+    ano_vab = min(ano_ref, 2021)
+    linhas = _linhas(base, _em("ano", {ano_ref, ano_vab}) & _em("cod_municipio", codigos))
+
+    referencia = linhas[linhas["ano"] == ano_ref].set_index("cod_municipio")
+    codigos = [cod for cod in codigos if cod in referencia.index]
+    referencia = referencia.loc[codigos].reset_index()
+    vab = linhas[linhas["ano"] == ano_vab].set_index("cod_municipio").reindex(codigos)
+
+    # Colunas montadas em um dict e convertidas em DataFrame uma única vez
+    tabela = {
+        coluna: referencia[coluna]
+        for coluna in ["cod_municipio", "nome_municipio", "sigla_uf", "pib_total", "pib_per_capita"]
+    }
+    pib = tabela["pib_total"].to_numpy(dtype=float)
+    ppc = tabela["pib_per_capita"].to_numpy(dtype=float)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tabela["populacao"] = np.where(ppc > 0, pib / ppc * 1000, 0).astype(np.int64)
+
+        # Participações setoriais no ano de VAB (0 quando não há VAB)
+        vab_total = vab["vab_total"].to_numpy(dtype=float)
+        for coluna, setor in zip(COLUNAS_VAB, NOMES_SETORES):
+            tabela[f"{setor} (%)"] = np.where(vab_total > 0, vab[coluna].to_numpy(dtype=float) / vab_total * 100, 0)
+        tabela["dependencia_publica"] = tabela["Administração Pública (%)"]
+        com_vab = vab["ano"].notna().to_numpy()
+        setor_dominante = np.full(len(codigos), None, dtype=object)
+        setor_dominante[com_vab] = vab["atividade_maior_vab"].to_numpy(dtype=object)[com_vab]
+        tabela["setor_dominante"] = setor_dominante
+
+    tabela["crescimento_ano_anterior"] = crescimento_entre_anos(
+        base, "municipio", ano_ref - 1, ano_ref, entidades=codigos
+    ).to_numpy()
+    tabela["cresc_ppc_ano_anterior"] = crescimento_entre_anos(
+        base, "municipio", ano_ref - 1, ano_ref, "pib_per_capita", entidades=codigos
+    ).to_numpy()
+    tabela["crescimento_periodo"] = crescimento_entre_anos(base, "municipio", ano_ini, ano_fim, entidades=codigos).to_numpy()
+
+    return pd.DataFrame(tabela)
+
+
+# ===============================
+# RANKINGS
+# ===============================
+
+def _escopo_ranking(base, metrica, ano, uf):
+    """LazyFrame com código, nome, UF e valor válido (não nulo) de uma métrica em um ano, na UF ou no Brasil."""
+    valor = _valor_metrica(metrica)
+    condicoes = [pl.col("ano") == ano, _validos(valor)]
+    if uf:
+        condicoes.append(pl.col("sigla_uf") == uf)
+    return base.linhas.filter(_e(condicoes)).select(
+        "linha", "cod_municipio", "nome_municipio", "sigla_uf", valor=valor
+    )
+
+
+def posicao_ranking(base, municipio, ano, metrica="pib_total", nacional=False, uf=None):
+    """Versão Polars de data.posicao_ranking (empates na ordem da base)."""
+    _valor_metrica(metrica)
+    cod = resolver_municipio(base, municipio, uf)
+    if cod is None:
+        return None
+
+    escopo = _escopo_ranking(base, metrica, ano, None if nacional else base.catalogo.uf_por_codigo[cod])
+    referencia = escopo.filter(pl.col("cod_municipio") == cod).select("valor")
+    contagem = escopo.join(referencia.rename({"valor": "referencia"}), how="cross").select(
+        posicao=1 + ((pl.col("valor") > pl.col("referencia"))
+                     | ((pl.col("valor") == pl.col("referencia")) & (pl.col("cod_municipio") < cod))).sum(),
+        total=pl.len()
+    ).collect()
+    if contagem["total"][0] == 0:
+        return None
+    return {"posicao": int(contagem["posicao"][0]), "total": int(contagem["total"][0])}
+
+
+def pagina_ranking(base, ano, metrica="pib_total", uf=None, posicao_ini=1, posicao_fim=10):
+    """Versão Polars de data.pagina_ranking."""
+    escopo = _escopo_ranking(base, metrica, ano, uf if uf and uf != "Todas" else None)
+    total = escopo.select(pl.len()).collect().item()
+
+    # Posições de 1 a total (negativas contadas a partir do fim)
+    ini = posicao_ini + total + 1 if posicao_ini < 0 else posicao_ini
+    fim = posicao_fim + total + 1 if posicao_fim < 0 else posicao_fim
+    ini, fim = max(ini, 1), min(fim, total)
+    trecho = (
+        escopo.sort(["valor", "cod_municipio"], descending=[True, False])
+        .slice(ini - 1, max(fim - ini + 1, 0)).collect()
+    )
+
+    return pd.DataFrame({
+        "Posição": np.arange(ini, ini + trecho.height),
+        "cod_municipio": trecho["cod_municipio"].to_numpy().astype("int32"),
+        "Município": trecho["nome_municipio"].to_numpy().astype(object),
+        "UF": trecho["sigla_uf"].to_numpy().astype(object),
+        metrica: trecho["valor"].to_numpy().astype("float64")
+    })
+
+
+def _topo_ranking(base, uf, ano, metrica, top_n):
+    """Nome e métrica dos top_n municípios da UF, com o índice da base."""
+    linhas = (
+        _escopo_ranking(base, metrica, ano, uf)
+        .sort(["valor", "cod_municipio"], descending=[True, False]).head(int(top_n))
+        .collect()["linha"].to_list()
+    )
+    topo = _linhas_por_posicao(base, linhas, ["nome_municipio", metrica])
+    return {coluna: topo[coluna] for coluna in ["nome_municipio", metrica]}
+
+
+# ===============================
+# INSTRUMENTAÇÃO
+# ===============================
+
+# As funções entram em data.py já cronometradas, com os mesmos nomes do backend pandas
+instrumentar_modulo(globals())
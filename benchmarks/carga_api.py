@@ -0,0 +1,226 @@
+"""
+Vazão da API HTTP (api.py) com vários clientes locais simultâneos.
+
+O servidor roda em um subprocesso; os clientes são threads deste processo,
+cada uma com uma conexão HTTP/1.1 persistente, percorrendo uma
+amostra dos casos de benchmarks/executar.py (a partir de pontos diferentes
+da lista) durante --duracao segundos, depois de uma passada de aquecimento
+(que também monta as tabelas preguiçosas do índice). Três cenários:
+
+    sem cache     servidor com os caches de respostas e de consultas desativados
+    cache         cache de respostas aquecido pela passada por todas as URLs
+    revalidação   cache aquecido e If-None-Match com o ETag da resposta (304)
+
+Para cada cenário e número de clientes o script informa requisições por
+segundo, latência (mediana e p95), megabytes recebidos e erros.
+
+Uso:
+    python benchmarks/carga_api.py --dados benchmarks/dados/pib_10x.parquet
+    python benchmarks/carga_api.py --clientes 1 8 32 --duracao 10 --saida benchmarks/resultados/api.json
+"""
+import argparse
+import http.client
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlencode
+
+import numpy as np
+
+RAIZ = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+os.environ.setdefault("PIB_INSTRUMENTACAO", "0")
+
+import api  # noqa: E402
+import executar  # noqa: E402
+
+# Fora do `streamlit run`, o cache do Streamlit avisa a cada chamada que não há runtime
+for _nome in list(logging.root.manager.loggerDict):
+    if _nome.startswith("streamlit"):
+        logging.getLogger(_nome).setLevel(logging.ERROR)
+
+
+CENARIOS = ["sem cache", "cache", "revalidação"]
+
+
+def montar_urls(arquivo, casos_por_funcao=20, municipios_por_uf=1, funcoes=None):
+    """
+    Converte os casos de executar.py das funções expostas pela API em caminhos com query string.
+
+    De cada função entram até `casos_por_funcao` casos, espaçados ao longo da varredura.
+
+    Returns:
+        Lista de caminhos (/funcao?arg=valor&...)
+    """
+    df = executar.data.load_data(arquivo=arquivo)
+    base = df if hasattr(df, "columns") else df.para_pandas()
+
+    urls = []
+    for nome, argumentos in executar._casos(base, municipios_por_uf).items():
+        if nome not in api.FUNCOES or (funcoes and nome not in funcoes):
+            continue
+        passo = max(1, len(argumentos) // casos_por_funcao)
+        for kwargs in argumentos[::passo][:casos_por_funcao]:
+            query = {
+                chave: valor if isinstance(valor, str) else json.dumps(valor, ensure_ascii=False)
+                for chave, valor in kwargs.items()
+            }
+            urls.append(f"/{nome}?{urlencode(query)}" if query else f"/{nome}")
+    return urls
+
+
+class ServidorAPI:
+    """Sobe api.py em um subprocesso (porta livre) e o encerra na saída do bloco with."""
+
+    def __init__(self, arquivo, cache=True):
+        self.arquivo = arquivo
+        self.cache = cache
+
+    def __enter__(self):
+        ambiente = {**os.environ, "PIB_INSTRUMENTACAO": "0"}
+        if not self.cache:
+            ambiente["PIB_CACHE_TAMANHO"] = "0"
+        self.processo = subprocess.Popen(
+            [sys.executable, str(RAIZ / "api.py"), "--dados", str(self.arquivo), "--porta", "0",
+             "--cache", str(api.TAMANHO_RESPOSTAS if self.cache else 0)],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, env=ambiente
+        )
+        linha = self.processo.stdout.readline()
+        if not linha:
+            raise RuntimeError("api.py terminou sem iniciar o servidor")
+        self.porta = int(linha.split("http://", 1)[1].split("/", 1)[0].rsplit(":", 1)[1])
+        return self
+
+    def __exit__(self, *excecao):
+        self.processo.terminate()
+        self.processo.wait()
+
+
+def aquecer(porta, urls):
+    """Faz uma requisição por URL e retorna o ETag de cada uma."""
+    conexao = http.client.HTTPConnection("127.0.0.1", porta)
+    etags = {}
+    for url in urls:
+        conexao.request("GET", url)
+        resposta = conexao.getresponse()
+        resposta.read()
+        etags[url] = resposta.getheader("ETag")
+    conexao.close()
+    return etags
+
+
+def medir(porta, urls, clientes, duracao, etags=None):
+    """
+    Dispara `clientes` threads simultâneas contra o servidor por `duracao` segundos.
+
+    Args:
+        porta: Porta do servidor local
+        urls: Caminhos requisitados (cada cliente começa em um ponto da lista)
+        clientes: Número de clientes simultâneos
+        duracao: Duração da medida em segundos
+        etags: URL -> ETag enviado em If-None-Match (None não envia)
+
+    Returns:
+        Dict com requisições por segundo, latências (ms), bytes recebidos e erros
+    """
+    latencias = [[] for _ in range(clientes)]
+    recebidos = [0] * clientes
+    erros = []
+    largada = threading.Barrier(clientes + 1)
+
+    def cliente(numero):
+        conexao = http.client.HTTPConnection("127.0.0.1", porta, timeout=120)
+        posicao = numero * len(urls) // clientes
+        largada.wait()
+        fim = time.perf_counter() + duracao
+        while time.perf_counter() < fim:
+            url = urls[posicao % len(urls)]
+            posicao += 1
+            cabecalhos = {"If-None-Match": etags[url]} if etags and etags.get(url) else {}
+            inicio = time.perf_counter()
+            conexao.request("GET", url, headers=cabecalhos)
+            resposta = conexao.getresponse()
+            corpo = resposta.read()
+            latencias[numero].append((time.perf_counter() - inicio) * 1000)
+            recebidos[numero] += len(corpo)
+            if resposta.status not in (200, 304):
+                erros.append(f"{resposta.status} {url}: {corpo[:200].decode(errors='replace')}")
+        conexao.close()
+
+    threads = [threading.Thread(target=cliente, args=(numero,)) for numero in range(clientes)]
+    for thread in threads:
+        thread.start()
+    largada.wait()
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    decorrido = time.perf_counter() - inicio
+
+    todas = np.concatenate([np.array(lista) for lista in latencias])
+    return {
+        "clientes": clientes,
+        "requisicoes": int(todas.size),
+        "requisicoes_por_s": round(todas.size / decorrido, 1),
+        "latencia_mediana_ms": round(float(np.median(todas)), 2),
+        "latencia_p95_ms": round(float(np.percentile(todas, 95)), 2),
+        "recebido_mib": round(sum(recebidos) / 2**20, 1),
+        "erros": len(erros),
+        "exemplos_erros": erros[:5]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vazão da API HTTP com clientes simultâneos")
+    parser.add_argument("--dados", default=executar.data.ARQUIVO_DADOS, help="Parquet ou diretório particionado da base")
+    parser.add_argument("--clientes", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--duracao", type=float, default=5, help="Segundos de medida por nível")
+    parser.add_argument("--cenarios", nargs="+", choices=CENARIOS, default=CENARIOS)
+    parser.add_argument("--casos-por-funcao", type=int, default=20)
+    parser.add_argument("--municipios-por-uf", type=int, default=1)
+    parser.add_argument("--funcoes", nargs="*", help="Requisita apenas as funções indicadas")
+    parser.add_argument("--saida", default=None, help="Arquivo JSON de resultados")
+    args = parser.parse_args()
+
+    urls = montar_urls(args.dados, args.casos_por_funcao, args.municipios_por_uf, args.funcoes)
+    print(f"{len(urls)} URLs de {len({url.split('?')[0] for url in urls})} funções")
+    print(f"{'cenário':12s} {'clientes':>8s} {'req/s':>9s} {'mediana':>10s} {'p95':>10s} {'recebido':>10s} {'erros':>6s}")
+
+    resultados = []
+    for cenario in args.cenarios:
+        with ServidorAPI(args.dados, cache=cenario != "sem cache") as servidor:
+            etags = aquecer(servidor.porta, urls)
+            for clientes in args.clientes:
+                nivel = medir(servidor.porta, urls, clientes, args.duracao, etags if cenario == "revalidação" else None)
+                resultados.append({"cenario": cenario, **nivel})
+                print(f"{cenario:12s} {clientes:8d} {nivel['requisicoes_por_s']:9.1f} "
+                      f"{nivel['latencia_mediana_ms']:8.2f}ms {nivel['latencia_p95_ms']:8.2f}ms "
+                      f"{nivel['recebido_mib']:7.1f}MiB {nivel['erros']:6d}")
+                for erro in nivel["exemplos_erros"]:
+                    print(f"    erro: {erro}")
+
+    if args.saida:
+        relatorio = {
+            "metadados": {
+                "data": datetime.now().isoformat(timespec="seconds"),
+                "arquivo": str(args.dados),
+                "backend": executar.data.BACKEND,
+                "urls": len(urls),
+                "duracao_s": args.duracao,
+                "python": sys.version.split()[0]
+            },
+            "niveis": resultados
+        }
+        Path(args.saida).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.saida).write_text(json.dumps(relatorio, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"resultados gravados em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Compara dois resultados de benchmarks/executar.py e aponta regressões.
+
+Uso:
+    python benchmarks/comparar.py antes.json depois.json --tolerancia 1.2
+
+Sai com código 1 se alguma função ficar mais lenta que a tolerância
+(razão entre as medianas).
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+
+def comparar(antes, depois, tolerancia=1.2, metrica="mediana_ms"):
+    """
+    Compara as estatísticas de cada função presente nos dois resultados.
+
+    Args:
+        antes: Relatório de referência (dict)
+        depois: Relatório novo (dict)
+        tolerancia: Razão depois/antes acima da qual há regressão
+        metrica: Estatística comparada (ex: "mediana_ms", "p95_ms")
+
+    Returns:
+        Lista de dicts (função, antes, depois, razão, regressão)
+    """
+    linhas = []
+    entradas = [("(carga)", {metrica: antes["carga_ms"]}, {metrica: depois["carga_ms"]}),
+                ("(índice)", antes["indice"], depois["indice"])]
+    entradas += [
+        (nome, antes["funcoes"][nome], depois["funcoes"][nome])
+        for nome in antes["funcoes"] if nome in depois["funcoes"]
+    ]
+    for nome, estat_antes, estat_depois in entradas:
+        valor_antes, valor_depois = estat_antes[metrica], estat_depois[metrica]
+        razao = valor_depois / valor_antes if valor_antes > 0 else float("inf")
+        linhas.append({
+            "funcao": nome,
+            "antes": valor_antes,
+            "depois": valor_depois,
+            "razao": razao,
+            "regressao": razao > tolerancia
+        })
+    return linhas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara dois resultados de benchmark")
+    parser.add_argument("antes")
+    parser.add_argument("depois")
+    parser.add_argument("--tolerancia", type=float, default=1.2)
+    parser.add_argument("--metrica", default="mediana_ms")
+    args = parser.parse_args()
+
+    antes = json.loads(Path(args.antes).read_text(encoding="utf-8"))
+    depois = json.loads(Path(args.depois).read_text(encoding="utf-8"))
+    linhas = comparar(antes, depois, args.tolerancia, args.metrica)
+
+    print(f"{'função':36s} {'antes':>10s} {'depois':>10s} {'razão':>7s}")
+    for linha in linhas:
+        marca = "  <- regressão" if linha["regressao"] else ""
+        print(f"{linha['funcao']:36s} {linha['antes']:10.2f} {linha['depois']:10.2f} {linha['razao']:7.2f}{marca}")
+
+    regressoes = [linha["funcao"] for linha in linhas if linha["regressao"]]
+    if regressoes:
+        print(f"\n{len(regressoes)} regressão(ões) acima de {args.tolerancia:.2f}x: {', '.join(regressoes)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
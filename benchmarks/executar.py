@@ -0,0 +1,285 @@
+"""
+Mede o custo das funções públicas de data.py sobre varreduras de parâmetros
+(todas as UFs, regiões e anos) e grava os tempos em JSON.
+
+O backend é o de data.py (PIB_BACKEND=duckdb ou polars mede as consultas
+sobre o parquet; a memória informada é, nesse caso, a que o backend mantém).
+
+Por padrão as funções memorizadas são chamadas sem o cache de consultas
+(mede-se o cálculo); --com-cache mede o caminho com cache aquecido.
+
+Uso:
+    python benchmarks/executar.py --dados benchmarks/dados/pib_10x.parquet --saida resultados_10x.json
+"""
+import argparse
+import inspect
+import json
+import logging
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Mede as funções sem a cronometragem do painel de diagnóstico
+os.environ.setdefault("PIB_INSTRUMENTACAO", "0")
+
+import data  # noqa: E402
+
+# Fora do `streamlit run`, o cache do Streamlit avisa a cada chamada que não há runtime
+for _nome in list(logging.root.manager.loggerDict):
+    if _nome.startswith("streamlit"):
+        logging.getLogger(_nome).setLevel(logging.ERROR)
+
+
+# Funções públicas de data.py que não são consultas e ficam fora da varredura
+FORA_DA_VARREDURA = {"compactar_base", "somente_leitura", "relatorio_memoria", "memorizar", "filtro_particoes", "ler_particoes"}
+
+
+def _casos(df, municipios_por_uf):
+    """Monta, para cada função, a lista de argumentos da varredura."""
+    anos = sorted(int(ano) for ano in df["ano"].unique())
+    anos_vab = [ano for ano in anos if ano <= 2021]
+    ano_ini = anos[0]
+    ufs = sorted(str(uf) for uf in df["sigla_uf"].unique())
+    regioes = sorted(str(regiao) for regiao in df["nome_grande_regiao"].unique())
+    regioes_brasil = [*regioes, "Brasil"]
+
+    # Maiores municípios de cada UF no último ano
+    ultimo = df[df["ano"] == anos[-1]]
+    amostra = ultimo.sort_values("pib_total", ascending=False).groupby("sigla_uf", observed=True).head(municipios_por_uf)
+    municipios = [(str(uf), int(cod), str(nome)) for uf, cod, nome in
+                  amostra[["sigla_uf", "cod_municipio", "nome_municipio"]].itertuples(index=False)]
+    ufs_por_regiao = {
+        regiao: sorted(str(uf) for uf in df.loc[df["nome_grande_regiao"] == regiao, "sigla_uf"].unique())
+        for regiao in regioes
+    }
+
+    return {
+        "filtrar_dados": [
+            *[dict(uf=uf, ano_ini=ano_ini, ano_fim=anos[-1]) for uf in ufs],
+            *[dict(regiao=regiao, ano_ini=ano_ini, ano_fim=anos[-1]) for regiao in regioes_brasil],
+            *[dict(municipios=[nome], ano_ini=ano_ini, ano_fim=anos[-1]) for _, _, nome in municipios]
+        ],
+        "dados_uf_ano": [dict(uf=uf, ano=ano) for uf in ufs for ano in anos],
+        "dados_regiao_ano": [dict(regiao=regiao, ano=ano) for regiao in regioes_brasil for ano in anos],
+        "dados_municipio_ano": [dict(municipio=cod, ano=ano) for _, cod, _ in municipios for ano in anos],
+        "resolver_municipio": [dict(municipio=nome, uf=uf) for uf, _, nome in municipios],
+        "obter_uf_municipio": [dict(municipio=cod) for _, cod, _ in municipios],
+        "totais_agregados": [
+            *[dict(nivel="uf", entidade=uf, ano=ano) for uf in ufs for ano in anos],
+            *[dict(nivel="regiao", entidade=regiao, ano=ano) for regiao in regioes for ano in anos]
+        ],
+        "cubo_agregado": [
+            *[dict(nivel="uf", regiao=regiao) for regiao in regioes],
+            *[dict(nivel="regiao", ano_ini=ano, ano_fim=ano) for ano in anos]
+        ],
+        "somar_cubo": [dict(nivel="uf", entidades=ufs_por_regiao[regiao], ano=ano) for regiao in regioes for ano in anos],
+        "catalogo_geografico": [dict()],
+        "obter_lista_municipios": [dict(uf=uf) for uf in ufs],
+        "obter_lista_ufs": [dict(regiao=regiao) for regiao in regioes_brasil],
+        "calcular_kpis_municipio": [dict(municipio=cod, ano=ano) for _, cod, _ in municipios for ano in anos],
+        "calcular_kpis_uf": [dict(uf=uf, ano=ano) for uf in ufs for ano in anos],
+        "calcular_kpis_agregado": [dict(regiao=regiao, ano=ano) for regiao in regioes_brasil for ano in anos],
+        "kpis_municipios": [
+            *[dict(municipios=[cod for _, cod, _ in municipios], ano_ref=ano, ano_ini=ano_ini, ano_fim=ano)
+              for ano in anos[1:]],
+            *[dict(municipios=[cod for uf_, cod, _ in municipios if uf_ == uf], ano_ref=anos[-1], ano_ini=ano_ini,
+                   ano_fim=anos[-1]) for uf in ufs]
+        ],
+        "painel_anual": [
+            *[dict(nivel=nivel, coluna=coluna) for nivel in data.NIVEIS_PAINEL for coluna in data.COLUNAS_PAINEL],
+            *[dict(nivel="uf", entidades=ufs_por_regiao[regiao]) for regiao in regioes]
+        ],
+        "crescimento_entre_anos": [
+            *[dict(nivel=nivel, ano_ini=ano_ini, ano_fim=ano) for nivel in data.NIVEIS_PAINEL for ano in anos[1:]],
+            *[dict(nivel="municipio", ano_ini=ano_ini, ano_fim=ano, entidades=[cod for _, cod, _ in municipios])
+              for ano in anos[1:]]
+        ],
+        "crescimento_anual": [dict(nivel=nivel, coluna=coluna) for nivel in data.NIVEIS_PAINEL for coluna in data.COLUNAS_PAINEL],
+        "crescimento_composto": [dict(nivel=nivel, ano_ini=ano_ini, ano_fim=ano) for nivel in data.NIVEIS_PAINEL for ano in anos[1:]],
+        "calcular_crescimento_periodo": [
+            *[dict(entidade=cod, entidade_col="cod_municipio", ano_ini=ano_ini, ano_fim=ano)
+              for _, cod, _ in municipios for ano in anos[1:]],
+            *[dict(entidade=uf, entidade_col="sigla_uf", ano_ini=ano_ini, ano_fim=ano) for uf in ufs for ano in anos[1:]],
+            *[dict(entidade=regiao, entidade_col="nome_grande_regiao", ano_ini=ano_ini, ano_fim=ano)
+              for regiao in regioes_brasil for ano in anos[1:]]
+        ],
+        "dados_evolucao_pib": [
+            *[dict(regiao=regiao, ano_ini=ano_ini, ano_fim=anos[-1]) for regiao in regioes_brasil],
+            *[dict(uf=uf, ano_ini=ano_ini, ano_fim=anos[-1]) for uf in ufs],
+            *[dict(uf=uf, municipios=[nome], ano_ini=ano_ini, ano_fim=anos[-1]) for uf, _, nome in municipios]
+        ],
+        "dados_evolucao_valor_adicionado": [
+            *[dict(regiao=regiao, ano_ini=ano_ini, ano_fim=anos_vab[-1]) for regiao in regioes_brasil],
+            *[dict(uf=uf, ano_ini=ano_ini, ano_fim=anos_vab[-1]) for uf in ufs],
+            *[dict(municipio=cod, uf=uf, ano_ini=ano_ini, ano_fim=anos_vab[-1]) for uf, cod, _ in municipios]
+        ],
+        "posicao_ranking": [
+            dict(municipio=cod, ano=ano, metrica=metrica, nacional=nacional)
+            for _, cod, _ in municipios for ano in anos for metrica in data.METRICAS_RANKING for nacional in (False, True)
+        ],
+        "posicoes_ranking": [dict(municipio=cod, ano=ano) for _, cod, _ in municipios for ano in anos],
+        "pagina_ranking": [
+            *[dict(ano=ano, metrica=metrica, posicao_ini=200, posicao_fim=250) for ano in anos for metrica in data.METRICAS_RANKING],
+            *[dict(ano=ano, metrica=metrica, uf=uf, posicao_ini=-10, posicao_fim=-1)
+              for uf in ufs for ano in anos for metrica in data.METRICAS_RANKING]
+        ],
+        "ranking_municipios_pib": [dict(uf=uf, ano=ano, top_n=10) for uf in ufs for ano in anos],
+        "ranking_municipios_per_capita": [dict(uf=uf, ano=ano, top_n=10) for uf in ufs for ano in anos],
+        "ranking_ufs": [dict(ano=ano, regiao=regiao) for regiao in regioes_brasil for ano in anos],
+        "ranking_ufs_per_capita": [dict(ano=ano, regiao=regiao) for regiao in regioes_brasil for ano in anos],
+        "composicao_setorial_municipio": [dict(municipio=cod, ano=ano) for _, cod, _ in municipios for ano in anos_vab],
+        "composicao_setorial_uf": [dict(uf=uf, ano=ano) for uf in ufs for ano in anos_vab],
+        "composicao_setorial_agregado": [dict(regiao=regiao, ano=ano) for regiao in regioes_brasil for ano in anos_vab],
+        "composicao_setorial": [
+            *[dict(nivel="uf", entidades=ufs_por_regiao[regiao], ano=ano) for regiao in regioes for ano in anos_vab],
+            *[dict(nivel="regiao", entidades=regioes, ano=ano) for ano in anos_vab],
+            *[dict(nivel="municipio", entidades=[cod for _, cod, _ in municipios], ano=ano) for ano in anos_vab]
+        ],
+        "tabela_setorial": [
+            *[dict(nivel=nivel, ano_ini=ano, ano_fim=ano) for nivel in data.NIVEIS_PAINEL for ano in anos],
+            *[dict(nivel="uf", entidades=ufs_por_regiao[regiao], ano_ini=ano_ini, ano_fim=anos[-1]) for regiao in regioes],
+            *[dict(nivel="municipio", entidades=[cod for _, cod, _ in municipios], ano_ini=ano, ano_fim=ano)
+              for ano in anos]
+        ],
+        "municipios_populacao_proxima": [
+            dict(municipio=cod, ano=ano, k=k, nacional=nacional)
+            for _, cod, _ in municipios for ano in anos for k in (10, 50) for nacional in (False, True)
+        ],
+        "scatter_pib_vs_per_capita": [
+            *[dict(uf=uf, municipio=cod, ano=ano) for uf, cod, _ in municipios for ano in anos],
+            *[dict(uf=uf, municipio=cod, ano=ano, k=30, nacional=True) for uf, cod, _ in municipios for ano in anos]
+        ],
+        "scatter_ufs_pib_vs_per_capita": [dict(ano=ano, regiao=regiao) for regiao in regioes_brasil for ano in anos],
+        "tabela_municipios_completa": [dict(uf=uf, ano=ano, ano_ini=ano_ini) for uf in ufs for ano in anos_vab],
+        "tabela_ufs_completa": [dict(ano=ano, ano_ini=ano_ini, regiao=regiao) for regiao in regioes_brasil for ano in anos_vab]
+    }
+
+
+def _resumo(tempos):
+    """Estatísticas (ms) de uma lista de tempos em segundos."""
+    ms = np.array(tempos) * 1000
+    return {
+        "chamadas": len(ms),
+        "total_ms": round(float(ms.sum()), 3),
+        "media_ms": round(float(ms.mean()), 4),
+        "mediana_ms": round(float(np.median(ms)), 4),
+        "p95_ms": round(float(np.percentile(ms, 95)), 4),
+        "max_ms": round(float(ms.max()), 4)
+    }
+
+
+def _cronometrar(funcao, *args, **kwargs):
+    inicio = time.perf_counter()
+    funcao(*args, **kwargs)
+    return time.perf_counter() - inicio
+
+
+def executar(arquivo, repeticoes=3, municipios_por_uf=1, com_cache=False, filtro=None):
+    """
+    Executa a varredura e retorna o relatório (dict serializável em JSON).
+
+    Args:
+        arquivo: Parquet da base (real ou sintética)
+        repeticoes: Número de passadas por caso
+        municipios_por_uf: Quantos municípios amostrar em cada UF
+        com_cache: Se True, mede as funções com o cache de consultas
+        filtro: Lista de nomes de funções a medir (opcional; padrão: todas)
+
+    Returns:
+        Dict com metadados, tempos de carga/índice e estatísticas por função
+    """
+    inicio = time.perf_counter()
+    df = data.load_data(arquivo=arquivo)
+    tempo_carga = time.perf_counter() - inicio
+
+    if isinstance(df, pd.DataFrame):
+        tempos_indice = [_cronometrar(data.IndiceBase, df) for _ in range(repeticoes)]
+        data.indexar(df)
+        base, memoria = df, df.memory_usage(deep=True).sum()
+    else:
+        # Backend SQL: o "índice" é a conexão (visões e tabela de posições); os casos
+        # são montados a partir de uma cópia da base em pandas
+        tempos_indice = [_cronometrar(type(df), arquivo) for _ in range(repeticoes)]
+        base, memoria = df.para_pandas(), df.memoria_bytes()
+
+    casos = _casos(base, municipios_por_uf)
+    publicas = {
+        nome for nome, objeto in vars(data).items()
+        if not nome.startswith("_") and inspect.isfunction(getattr(objeto, "__wrapped__", objeto))
+        and getattr(objeto, "__module__", None) == data.__name__
+    }
+    nao_cobertas = sorted(publicas - set(casos) - FORA_DA_VARREDURA - {"load_data", "indexar"})
+
+    funcoes = {}
+    for nome, argumentos in casos.items():
+        if filtro and nome not in filtro:
+            continue
+        funcao = getattr(data, nome)
+        if not com_cache:
+            funcao = getattr(funcao, "sem_cache", funcao)
+        tempos = [
+            _cronometrar(funcao, df, **kwargs)
+            for _ in range(repeticoes) for kwargs in argumentos
+        ]
+        funcoes[nome] = _resumo(tempos)
+
+    return {
+        "metadados": {
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "arquivo": str(arquivo),
+            "backend": data.BACKEND,
+            "linhas": len(df),
+            "municipios": int(base["cod_municipio"].nunique()),
+            "anos": int(base["ano"].nunique()),
+            "memoria_mib": round(memoria / 2**20, 2),
+            "repeticoes": repeticoes,
+            "com_cache": com_cache,
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "funcoes_nao_cobertas": nao_cobertas
+        },
+        "carga_ms": round(tempo_carga * 1000, 3),
+        "indice": _resumo(tempos_indice),
+        "funcoes": funcoes
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark das funções de data.py")
+    parser.add_argument("--dados", default=data.ARQUIVO_DADOS, help="Parquet da base (real ou sintética)")
+    parser.add_argument("--saida", default=None, help="Arquivo JSON de resultados")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--municipios-por-uf", type=int, default=1)
+    parser.add_argument("--com-cache", action="store_true", help="Mede com o cache de consultas aquecido")
+    parser.add_argument("--funcoes", nargs="*", help="Mede apenas as funções indicadas")
+    args = parser.parse_args()
+
+    relatorio = executar(args.dados, args.repeticoes, args.municipios_por_uf, args.com_cache, args.funcoes)
+
+    meta = relatorio["metadados"]
+    print(f"{meta['linhas']:,} linhas, {meta['municipios']:,} municípios, {meta['memoria_mib']} MiB")
+    print(f"carga: {relatorio['carga_ms']:.0f} ms | índice: {relatorio['indice']['mediana_ms']:.0f} ms")
+    print(f"{'função':36s} {'chamadas':>8s} {'mediana':>10s} {'p95':>10s} {'total':>10s}")
+    for nome, estat in relatorio["funcoes"].items():
+        print(f"{nome:36s} {estat['chamadas']:8d} {estat['mediana_ms']:8.2f}ms {estat['p95_ms']:8.2f}ms "
+              f"{estat['total_ms']:8.0f}ms")
+    if meta["funcoes_nao_cobertas"]:
+        print("funções públicas sem caso de benchmark:", ", ".join(meta["funcoes_nao_cobertas"]))
+
+    if args.saida:
+        Path(args.saida).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.saida).write_text(json.dumps(relatorio, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"resultados gravados em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
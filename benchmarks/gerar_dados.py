@@ -0,0 +1,183 @@
+"""
+Gera uma base sintética com o mesmo esquema de pib_municipios.parquet.
+
+A escala multiplica o número de municípios de cada UF (1x = 5.570 municípios,
+~78 mil linhas para 2010-2023). Os códigos seguem o aninhamento do IBGE
+(região > UF > município) e há municípios homônimos em várias UFs.
+
+Uso:
+    python benchmarks/gerar_dados.py --escala 10 --saida benchmarks/dados/pib_10x.parquet
+"""
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+REGIOES = {1: "Norte", 2: "Nordeste", 3: "Sudeste", 4: "Sul", 5: "Centro-oeste"}
+
+# (código, sigla, nome, número de municípios)
+UFS = [
+    (11, "RO", "Rondônia", 52), (12, "AC", "Acre", 22), (13, "AM", "Amazonas", 62),
+    (14, "RR", "Roraima", 15), (15, "PA", "Pará", 144), (16, "AP", "Amapá", 16),
+    (17, "TO", "Tocantins", 139), (21, "MA", "Maranhão", 217), (22, "PI", "Piauí", 224),
+    (23, "CE", "Ceará", 184), (24, "RN", "Rio Grande do Norte", 167), (25, "PB", "Paraíba", 223),
+    (26, "PE", "Pernambuco", 185), (27, "AL", "Alagoas", 102), (28, "SE", "Sergipe", 75),
+    (29, "BA", "Bahia", 417), (31, "MG", "Minas Gerais", 853), (32, "ES", "Espírito Santo", 78),
+    (33, "RJ", "Rio de Janeiro", 92), (35, "SP", "São Paulo", 645), (41, "PR", "Paraná", 399),
+    (42, "SC", "Santa Catarina", 295), (43, "RS", "Rio Grande do Sul", 497),
+    (50, "MS", "Mato Grosso do Sul", 79), (51, "MT", "Mato Grosso", 141), (52, "GO", "Goiás", 246),
+    (53, "DF", "Distrito Federal", 1)
+]
+
+ATIVIDADES = [
+    "Agropecuária",
+    "Indústria",
+    "Serviços",
+    "Administração, defesa, educação e saúde públicas e seguridade social"
+]
+
+# Nomes repetidos em todas as UFs, para exercitar a resolução de homônimos
+NOMES_HOMONIMOS = ["Santa Luzia", "Bom Jesus", "São Domingos", "Planalto", "Itaporanga"]
+
+COLUNAS_VAB = ["vab_agropecuaria", "vab_industria", "vab_servicos", "vab_adm_defesa_educacao_saude"]
+
+# O IBGE não publica o VAB dos anos mais recentes
+ULTIMO_ANO_VAB = 2021
+
+ESQUEMA = pa.schema([
+    ("ano", pa.int64()),
+    ("cod_grande_regiao", pa.int64()),
+    ("nome_grande_regiao", pa.string()),
+    ("cod_uf", pa.int64()),
+    ("sigla_uf", pa.string()),
+    ("nome_uf", pa.string()),
+    ("cod_municipio", pa.int64()),
+    ("nome_municipio", pa.string()),
+    *[(col, pa.float64()) for col in COLUNAS_VAB],
+    ("vab_total", pa.float64()),
+    ("impostos_liquidos_subsidios", pa.float64()),
+    ("pib_total", pa.float64()),
+    ("pib_per_capita", pa.float64()),
+    ("atividade_maior_vab", pa.string()),
+    ("atividade_segundo_maior_vab", pa.string()),
+    ("atividade_terceiro_maior_vab", pa.string())
+])
+
+
+def _municipios_uf(rng, cod_uf, sigla, n, fator_codigo):
+    """Sorteia os atributos fixos dos municípios de uma UF."""
+    nomes = [f"Município {sigla} {i}" for i in range(n)]
+    for j, nome in enumerate(NOMES_HOMONIMOS):
+        if n > j * 3:
+            nomes[j * 3] = nome
+
+    return {
+        "cod_municipio": cod_uf * fator_codigo + np.arange(n) * 10 + 1,
+        "nome_municipio": np.array(nomes, dtype=object),
+        "populacao": np.exp(rng.normal(9.5, 1.2, n)),
+        "per_capita_base": np.exp(rng.normal(9.8, 0.5, n)),
+        "participacoes": rng.dirichlet([2, 3, 5, 4], n)
+    }
+
+
+def _linhas_ano(rng, ano, cod_uf, sigla, nome_uf, municipios):
+    """Monta as linhas de uma UF em um ano."""
+    n = len(municipios["cod_municipio"])
+    crescimento = (1.07 ** (ano - 2010)) * np.exp(rng.normal(0, 0.03, n))
+    populacao = municipios["populacao"] * (1.008 ** (ano - 2010))
+    pib_per_capita = np.round(municipios["per_capita_base"] * crescimento, 2)
+    pib_total = pib_per_capita * populacao / 1000
+    vab_total = pib_total * 0.88
+
+    participacoes = municipios["participacoes"]
+    ordem = np.argsort(-participacoes, axis=1)
+    atividades = np.array(ATIVIDADES, dtype=object)
+
+    linhas = {
+        "ano": np.full(n, ano),
+        "cod_grande_regiao": np.full(n, cod_uf // 10),
+        "nome_grande_regiao": np.full(n, REGIOES[cod_uf // 10], dtype=object),
+        "cod_uf": np.full(n, cod_uf),
+        "sigla_uf": np.full(n, sigla, dtype=object),
+        "nome_uf": np.full(n, nome_uf, dtype=object),
+        "cod_municipio": municipios["cod_municipio"],
+        "nome_municipio": municipios["nome_municipio"],
+        **{col: vab_total * participacoes[:, i] for i, col in enumerate(COLUNAS_VAB)},
+        "vab_total": vab_total,
+        "impostos_liquidos_subsidios": pib_total - vab_total,
+        "pib_total": pib_total,
+        "pib_per_capita": pib_per_capita,
+        "atividade_maior_vab": atividades[ordem[:, 0]],
+        "atividade_segundo_maior_vab": atividades[ordem[:, 1]],
+        "atividade_terceiro_maior_vab": atividades[ordem[:, 2]]
+    }
+
+    if ano > ULTIMO_ANO_VAB:
+        for col in [*COLUNAS_VAB, "vab_total", "impostos_liquidos_subsidios"]:
+            linhas[col] = np.full(n, np.nan)
+        for col in ["atividade_maior_vab", "atividade_segundo_maior_vab", "atividade_terceiro_maior_vab"]:
+            linhas[col] = np.full(n, None, dtype=object)
+
+    return linhas
+
+
+def gerar_base(saida, escala=1, ano_ini=2010, ano_fim=2023, semente=0):
+    """
+    Escreve a base sintética em parquet, um grupo de linhas por ano.
+
+    Args:
+        saida: Caminho do arquivo parquet
+        escala: Multiplicador do número de municípios por UF
+        ano_ini: Primeiro ano
+        ano_fim: Último ano
+        semente: Semente do gerador aleatório
+
+    Returns:
+        Número de linhas escritas
+    """
+    rng = np.random.default_rng(semente)
+    maior_uf = max(n for *_, n in UFS) * escala
+    fator_codigo = 10 ** max(5, len(str(maior_uf * 10)))
+
+    municipios = {
+        cod_uf: _municipios_uf(rng, cod_uf, sigla, n * escala, fator_codigo)
+        for cod_uf, sigla, _, n in UFS
+    }
+
+    Path(saida).parent.mkdir(parents=True, exist_ok=True)
+    total = 0
+    with pq.ParquetWriter(saida, ESQUEMA) as escritor:
+        for ano in range(ano_ini, ano_fim + 1):
+            partes = [
+                pd.DataFrame(_linhas_ano(rng, ano, cod_uf, sigla, nome_uf, municipios[cod_uf]))
+                for cod_uf, sigla, nome_uf, _ in UFS
+            ]
+            tabela = pa.Table.from_pandas(pd.concat(partes, ignore_index=True), schema=ESQUEMA, preserve_index=False)
+            escritor.write_table(tabela)
+            total += tabela.num_rows
+
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera base sintética do PIB dos municípios")
+    parser.add_argument("--escala", type=int, default=1, help="Multiplicador de municípios (ex: 1, 10, 100)")
+    parser.add_argument("--saida", default=None, help="Arquivo parquet de saída")
+    parser.add_argument("--ano-ini", type=int, default=2010)
+    parser.add_argument("--ano-fim", type=int, default=2023)
+    parser.add_argument("--semente", type=int, default=0)
+    args = parser.parse_args()
+
+    saida = args.saida or str(Path(__file__).parent / "dados" / f"pib_{args.escala}x.parquet")
+    inicio = time.perf_counter()
+    linhas = gerar_base(saida, args.escala, args.ano_ini, args.ano_fim, args.semente)
+    print(f"{linhas:,} linhas escritas em {saida} ({time.perf_counter() - inicio:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Confere se um backend alternativo de data.py (PIB_BACKEND) devolve os
+mesmos resultados do backend pandas em todos os casos de benchmarks/executar.py.
+
+Cada backend roda em um subprocesso, porque o backend é escolhido na
+importação de data.py, e grava os resultados em pickle. A comparação tolera
+diferenças de arredondamento das somas (--rtol) e ignora o tipo das colunas
+(categoria x texto, int16 x int64); valores, índices, colunas e ordem das
+linhas precisam coincidir.
+
+Uso:
+    python benchmarks/paridade.py --backend duckdb
+    python benchmarks/paridade.py --backend polars
+    python benchmarks/paridade.py --backend duckdb --dados benchmarks/dados/pib_10x.parquet
+
+Sai com código 1 se algum caso divergir.
+"""
+import argparse
+import math
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from types import MappingProxyType
+
+import numpy as np
+import pandas as pd
+
+
+def _normalizar(valor):
+    """Converte o resultado em tipos comparáveis e serializáveis (objetos viram dicts de atributos)."""
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        return valor
+    if isinstance(valor, (dict, MappingProxyType)):
+        return {chave: _normalizar(item) for chave, item in valor.items()}
+    if isinstance(valor, (list, tuple)):
+        return [_normalizar(item) for item in valor]
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if hasattr(valor, "__dict__") and not callable(valor):
+        return {chave: _normalizar(item) for chave, item in vars(valor).items()}
+    return valor
+
+
+def gravar_resultados(arquivo, saida, municipios_por_uf=1, filtro=None):
+    """
+    Executa os casos de executar.py no backend de PIB_BACKEND e grava os resultados.
+
+    Exceções entram no resultado pelo tipo: o caso confere se os dois
+    backends levantam o mesmo tipo de erro.
+    """
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    import executar
+
+    data = executar.data
+    df = data.load_data(arquivo=arquivo)
+    base = df if isinstance(df, pd.DataFrame) else df.para_pandas()
+
+    resultados = {}
+    for nome, argumentos in executar._casos(base, municipios_por_uf).items():
+        if filtro and nome not in filtro:
+            continue
+        funcao = getattr(data, nome)
+        funcao = getattr(funcao, "sem_cache", funcao)
+        resultados[nome] = []
+        for kwargs in argumentos:
+            try:
+                resultado = _normalizar(funcao(df, **kwargs))
+            except Exception as erro:  # noqa: BLE001 - o erro faz parte do resultado comparado
+                resultado = ("erro", type(erro).__name__)
+            resultados[nome].append((kwargs, resultado))
+
+    Path(saida).write_bytes(pickle.dumps(resultados, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def _categorias_como_texto(tabela):
+    """Colunas categóricas como objeto (os backends podem ter conjuntos de categorias diferentes)."""
+    if isinstance(tabela, pd.Series):
+        return tabela.astype(object) if isinstance(tabela.dtype, pd.CategoricalDtype) else tabela
+    categoricas = [col for col in tabela.columns if isinstance(tabela[col].dtype, pd.CategoricalDtype)]
+    return tabela.astype({col: object for col in categoricas})
+
+
+def diferenca(a, b, rtol=1e-9):
+    """
+    Compara dois resultados.
+
+    Returns:
+        None se forem iguais, ou texto descrevendo a primeira diferença
+    """
+    if isinstance(a, (pd.DataFrame, pd.Series)) or isinstance(b, (pd.DataFrame, pd.Series)):
+        if type(a) is not type(b):
+            return f"tipos diferentes: {type(a).__name__} x {type(b).__name__}"
+        a, b = _categorias_como_texto(a), _categorias_como_texto(b)
+        try:
+            if isinstance(a, pd.DataFrame):
+                pd.testing.assert_frame_equal(
+                    a, b, check_dtype=False, check_index_type=False, check_column_type=False, rtol=rtol, atol=0
+                )
+            else:
+                pd.testing.assert_series_equal(a, b, check_dtype=False, check_index_type=False, rtol=rtol, atol=0)
+        except AssertionError as erro:
+            return str(erro).strip().splitlines()[0]
+        return None
+    if isinstance(a, dict) and isinstance(b, dict):
+        if list(a) != list(b):
+            return f"chaves diferentes: {list(a)} x {list(b)}"
+        for chave in a:
+            texto = diferenca(a[chave], b[chave], rtol)
+            if texto:
+                return f"[{chave!r}] {texto}"
+        return None
+    if isinstance(a, list) and isinstance(b, list):
+        if len(a) != len(b):
+            return f"tamanhos diferentes: {len(a)} x {len(b)}"
+        for i, (item_a, item_b) in enumerate(zip(a, b)):
+            texto = diferenca(item_a, item_b, rtol)
+            if texto:
+                return f"[{i}] {texto}"
+        return None
+    if isinstance(a, float) or isinstance(b, float):
+        ausente_a = a is None or (isinstance(a, float) and math.isnan(a))
+        ausente_b = b is None or (isinstance(b, float) and math.isnan(b))
+        if ausente_a or ausente_b:
+            return None if ausente_a and ausente_b else f"{a!r} x {b!r}"
+        return None if math.isclose(a, b, rel_tol=rtol, abs_tol=0) else f"{a!r} x {b!r}"
+    return None if a == b else f"{a!r} x {b!r}"
+
+
+def comparar(referencia, candidato, rtol=1e-9):
+    """
+    Compara, caso a caso, os resultados de dois backends.
+
+    Returns:
+        Dict função -> (casos, lista de (kwargs, diferença))
+    """
+    relatorio = {}
+    for nome, casos in referencia.items():
+        outros = candidato.get(nome, [])
+        divergencias = [
+            (kwargs, diferenca(resultado, outro, rtol) if outro_kwargs == kwargs else "caso ausente")
+            for (kwargs, resultado), (outro_kwargs, outro) in zip(casos, outros)
+        ]
+        divergencias = [(kwargs, texto) for kwargs, texto in divergencias if texto]
+        if len(outros) != len(casos):
+            divergencias.append(({}, f"{len(casos)} casos x {len(outros)}"))
+        relatorio[nome] = (len(casos), divergencias)
+    return relatorio
+
+
+def _executar_backend(backend, arquivo, saida, municipios_por_uf, filtro):
+    comando = [sys.executable, __file__, "--gravar", str(saida), "--dados", str(arquivo),
+               "--municipios-por-uf", str(municipios_por_uf)]
+    if filtro:
+        comando += ["--funcoes", *filtro]
+    subprocess.run(comando, check=True, env={**os.environ, "PIB_BACKEND": backend, "PIB_INSTRUMENTACAO": "0"})
+
+
+def main():
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    from data import ARQUIVO_DADOS
+
+    parser = argparse.ArgumentParser(description="Paridade entre backends de data.py")
+    parser.add_argument("--backend", default="duckdb", help="Backend comparado com o pandas")
+    parser.add_argument("--dados", default=ARQUIVO_DADOS, help="Parquet ou diretório particionado da base")
+    parser.add_argument("--municipios-por-uf", type=int, default=1)
+    parser.add_argument("--funcoes", nargs="*", help="Confere apenas as funções indicadas")
+    parser.add_argument("--rtol", type=float, default=1e-9, help="Tolerância relativa dos valores numéricos")
+    parser.add_argument("--gravar", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.gravar:
+        gravar_resultados(args.dados, args.gravar, args.municipios_por_uf, args.funcoes)
+        return
+
+    with tempfile.TemporaryDirectory() as temporario:
+        resultados = {}
+        for backend in ("pandas", args.backend):
+            saida = Path(temporario) / f"{backend}.pkl"
+            _executar_backend(backend, args.dados, saida, args.municipios_por_uf, args.funcoes)
+            resultados[backend] = pickle.loads(saida.read_bytes())
+
+    relatorio = comparar(resultados["pandas"], resultados[args.backend], args.rtol)
+    print(f"{'função':36s} {'casos':>6s} {'divergentes':>12s}")
+    for nome, (casos, divergencias) in relatorio.items():
+        print(f"{nome:36s} {casos:6d} {len(divergencias):12d}")
+        for kwargs, texto in divergencias[:3]:
+            print(f"    {kwargs}: {texto}")
+
+    total = sum(len(divergencias) for _, divergencias in relatorio.values())
+    if total:
+        print(f"\n{total} caso(s) divergente(s) entre pandas e {args.backend}")
+        sys.exit(1)
+    print(f"\n{args.backend}: mesmos resultados do pandas em {sum(casos for casos, _ in relatorio.values())} casos")
+
+
+if __name__ == "__main__":
+    main()
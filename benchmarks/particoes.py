@@ -0,0 +1,204 @@
+"""
+Mede quantos bytes cada consulta lê da base particionada (ano/sigla_uf)
+em comparação com o parquet único, usando os filtros de filtrar_dados.
+
+Uso:
+    python ingestao.py pib_municipios.parquet --particionado pib_municipios/
+    python benchmarks/particoes.py --arquivo pib_municipios.parquet --particionado pib_municipios/
+"""
+import argparse
+import io
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs as pafs
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import data  # noqa: E402
+
+for _nome in list(logging.root.manager.loggerDict):
+    if _nome.startswith("streamlit"):
+        logging.getLogger(_nome).setLevel(logging.ERROR)
+
+
+class _LeitorContado(io.RawIOBase):
+    """Arquivo somente leitura que soma os bytes lidos no contador compartilhado."""
+
+    def __init__(self, caminho, contador):
+        self._arquivo = open(caminho, "rb")
+        self._contador = contador
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, posicao, referencia=io.SEEK_SET):
+        return self._arquivo.seek(posicao, referencia)
+
+    def tell(self):
+        return self._arquivo.tell()
+
+    def readinto(self, buffer):
+        lidos = self._arquivo.readinto(buffer)
+        self._contador["bytes"] += lidos or 0
+        return lidos
+
+    def close(self):
+        self._arquivo.close()
+        super().close()
+
+
+class SistemaContado(pafs.FileSystemHandler):
+    """Sistema de arquivos local que conta bytes lidos e arquivos abertos."""
+
+    def __init__(self):
+        self._local = pafs.LocalFileSystem()
+        self.contador = {"bytes": 0, "arquivos": 0}
+
+    def zerar(self):
+        self.contador.update(bytes=0, arquivos=0)
+
+    def _abrir(self, caminho):
+        self.contador["arquivos"] += 1
+        return pa.PythonFile(_LeitorContado(caminho, self.contador), mode="r")
+
+    def open_input_file(self, path):
+        return self._abrir(path)
+
+    def open_input_stream(self, path):
+        return self._abrir(path)
+
+    def get_type_name(self):
+        return "contado"
+
+    def normalize_path(self, path):
+        return self._local.normalize_path(path)
+
+    def equals(self, other):
+        return self is other
+
+    def get_file_info(self, paths):
+        return self._local.get_file_info(paths)
+
+    def get_file_info_selector(self, selector):
+        return self._local.get_file_info(selector)
+
+    def create_dir(self, path, recursive):
+        raise NotImplementedError
+
+    def delete_dir(self, path):
+        raise NotImplementedError
+
+    def delete_dir_contents(self, path, missing_dir_ok=False):
+        raise NotImplementedError
+
+    def delete_root_dir_contents(self):
+        raise NotImplementedError
+
+    def delete_file(self, path):
+        raise NotImplementedError
+
+    def move(self, src, dest):
+        raise NotImplementedError
+
+    def copy_file(self, src, dest):
+        raise NotImplementedError
+
+    def open_output_stream(self, path, metadata):
+        raise NotImplementedError
+
+    def open_append_stream(self, path, metadata):
+        raise NotImplementedError
+
+
+def _tamanho(caminho):
+    if not os.path.isdir(caminho):
+        return os.path.getsize(caminho)
+    return sum(os.path.getsize(os.path.join(raiz, nome)) for raiz, _, nomes in os.walk(caminho) for nome in nomes)
+
+
+def medir(arquivo, particionado, ano=2021):
+    """
+    Executa as consultas nas duas organizações e retorna bytes lidos, arquivos abertos e tempo.
+
+    Args:
+        arquivo: Parquet único
+        particionado: Diretório da base particionada
+        ano: Ano das consultas de um único ano
+
+    Returns:
+        Lista de dicts, um por consulta e organização
+    """
+    sistema = SistemaContado()
+    contado = pafs.PyFileSystem(sistema)
+    local = pafs.LocalFileSystem()
+    particoes = ds.partitioning(data.ESQUEMA_PARTICOES, flavor="hive")
+
+    # Bytes são contados em um sistema de arquivos Python; o tempo é medido no local
+    bases = {
+        "arquivo único": (
+            ds.dataset(os.path.abspath(arquivo), format="parquet", filesystem=contado),
+            ds.dataset(os.path.abspath(arquivo), format="parquet", filesystem=local),
+            _tamanho(arquivo)
+        ),
+        "particionado": (
+            ds.dataset(os.path.abspath(particionado), format="parquet", filesystem=contado, partitioning=particoes),
+            ds.dataset(os.path.abspath(particionado), format="parquet", filesystem=local, partitioning=particoes),
+            _tamanho(particionado)
+        )
+    }
+
+    consultas = {
+        f"MG {ano}": dict(uf="MG", ano_ini=ano, ano_fim=ano),
+        f"AC {ano}": dict(uf="AC", ano_ini=ano, ano_fim=ano),
+        f"Brasil {ano}": dict(ano_ini=ano, ano_fim=ano),
+        "SP, todos os anos": dict(uf="SP"),
+        f"Sul {ano}": dict(regiao="Sul", ano_ini=ano, ano_fim=ano),
+        "Santa Luzia (homônimos)": dict(municipios=["Santa Luzia"]),
+        "tudo": dict()
+    }
+
+    resultados = []
+    for consulta, filtros in consultas.items():
+        filtro = data.filtro_particoes(**filtros)
+        for organizacao, (base_contada, base, tamanho) in bases.items():
+            sistema.zerar()
+            base_contada.to_table(filter=filtro)
+            inicio = time.perf_counter()
+            linhas = base.to_table(filter=filtro).num_rows
+            duracao = time.perf_counter() - inicio
+            resultados.append({
+                "consulta": consulta,
+                "organizacao": organizacao,
+                "linhas": linhas,
+                "arquivos": sistema.contador["arquivos"],
+                "bytes_lidos": sistema.contador["bytes"],
+                "fracao": sistema.contador["bytes"] / tamanho,
+                "tempo_ms": duracao * 1000
+            })
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes lidos por consulta: parquet único x particionado")
+    parser.add_argument("--arquivo", default="pib_municipios.parquet")
+    parser.add_argument("--particionado", default="pib_municipios")
+    parser.add_argument("--ano", type=int, default=2021)
+    args = parser.parse_args()
+
+    print(f"{'consulta':26s} {'organização':14s} {'linhas':>8s} {'arquivos':>8s} {'KiB lidos':>10s} {'fração':>8s} {'tempo':>9s}")
+    for r in medir(args.arquivo, args.particionado, args.ano):
+        print(f"{r['consulta']:26s} {r['organizacao']:14s} {r['linhas']:8d} {r['arquivos']:8d} "
+              f"{r['bytes_lidos'] / 1024:10.1f} {r['fracao']:8.2%} {r['tempo_ms']:7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
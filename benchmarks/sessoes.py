@@ -0,0 +1,194 @@
+"""
+Teste de carga do app com várias sessões simultâneas.
+
+Cada nível de concorrência roda em um processo novo: N sessões (AppTest,
+uma thread cada, como as sessões do servidor do Streamlit) executam o
+app.py ao mesmo tempo, --execucoes vezes cada. Para cada nível o script
+informa a latência das execuções (mediana e p95), o tempo médio do bloco
+"Carregamento da base" (load_data e catálogo) e a memória residente do
+processo antes e no pico da carga (amostrada durante as execuções).
+
+A base é carregada e indexada uma vez, antes da medida, por uma execução de
+aquecimento: a memória que cresce com o número de sessões é a das próprias
+sessões (estado dos widgets, elementos e resultados de cada execução).
+
+Uso:
+    python benchmarks/sessoes.py --dados benchmarks/dados/pib_10x.parquet
+    python benchmarks/sessoes.py --sessoes 1 10 50 --execucoes 3 --saida benchmarks/resultados/sessoes.json
+
+Para comparar duas versões do app, rode o script em cada uma com os mesmos
+argumentos e compare os JSON gravados.
+"""
+import argparse
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import threading
+import time
+import warnings
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+
+def _memoria_mib():
+    """Memória residente atual do processo (Linux; pico do processo nos demais sistemas)."""
+    try:
+        paginas = int(Path("/proc/self/statm").read_text().split()[1])
+        return paginas * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        # ru_maxrss: KiB no Linux, bytes no macOS
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return pico / 2**20 if sys.platform == "darwin" else pico / 1024
+
+
+class _MonitorMemoria(threading.Thread):
+    """Amostra a memória residente a cada `intervalo` segundos e guarda o máximo."""
+
+    def __init__(self, intervalo=0.05):
+        super().__init__(daemon=True)
+        self.intervalo = intervalo
+        self.pico = _memoria_mib()
+        self._parar = threading.Event()
+
+    def run(self):
+        while not self._parar.wait(self.intervalo):
+            self.pico = max(self.pico, _memoria_mib())
+
+    def parar(self):
+        self._parar.set()
+        self.join()
+        self.pico = max(self.pico, _memoria_mib())
+        return self.pico
+
+
+def medir_nivel(sessoes, execucoes, timeout=600):
+    """
+    Executa o app em `sessoes` sessões simultâneas e mede latência e memória.
+
+    Args:
+        sessoes: Número de sessões simultâneas
+        execucoes: Execuções do app por sessão (a primeira cria a sessão)
+        timeout: Limite, em segundos, de cada execução
+
+    Returns:
+        Dict com latências (ms), carregamento da base (ms), memória (MiB) e erros
+    """
+    warnings.filterwarnings("ignore")
+    logging.disable(logging.CRITICAL)
+    sys.path.insert(0, str(RAIZ))
+    from streamlit.testing.v1 import AppTest
+
+    from instrumentacao import registro_processo
+
+    app = str(RAIZ / "app.py")
+
+    # Aquecimento: carrega a base e monta o índice fora da medida
+    AppTest.from_file(app, default_timeout=timeout).run()
+    registro_processo().limpar()
+    memoria_inicial = _memoria_mib()
+
+    latencias = []
+    erros = []
+    largada = threading.Barrier(sessoes)
+
+    def sessao():
+        teste = AppTest.from_file(app, default_timeout=timeout)
+        largada.wait()
+        for _ in range(execucoes):
+            inicio = time.perf_counter()
+            teste.run()
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            erros.extend(str(excecao.value)[:200] for excecao in teste.exception)
+
+    monitor = _MonitorMemoria()
+    monitor.start()
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=sessao) for _ in range(sessoes)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duracao = time.perf_counter() - inicio
+    memoria_pico = monitor.parar()
+
+    carregamento = next(
+        (medida for medida in registro_processo().medidas() if medida["nome"] == "Carregamento da base"), None
+    )
+    return {
+        "sessoes": sessoes,
+        "execucoes": len(latencias),
+        "duracao_s": round(duracao, 2),
+        "execucoes_por_s": round(len(latencias) / duracao, 2),
+        "latencia_mediana_ms": round(float(np.median(latencias)), 1),
+        "latencia_p95_ms": round(float(np.percentile(latencias, 95)), 1),
+        "carregamento_medio_ms": round(carregamento["medio_ms"], 2) if carregamento else None,
+        "memoria_inicial_mib": round(memoria_inicial, 1),
+        "memoria_pico_mib": round(memoria_pico, 1),
+        "erros": erros[:5]
+    }
+
+
+def _executar_nivel(sessoes, execucoes):
+    """Roda um nível em um processo novo (memória medida sem os níveis anteriores)."""
+    resultado = subprocess.run(
+        [sys.executable, __file__, "--nivel", str(sessoes), "--execucoes", str(execucoes)],
+        check=True, capture_output=True, text=True
+    )
+    return json.loads(resultado.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga do app com sessões simultâneas")
+    parser.add_argument("--dados", help="Parquet ou diretório particionado da base (padrão: PIB_DADOS)")
+    parser.add_argument("--sessoes", type=int, nargs="+", default=[1, 5, 10, 25, 50])
+    parser.add_argument("--execucoes", type=int, default=3, help="Execuções do app por sessão")
+    parser.add_argument("--saida", default=None, help="Arquivo JSON de resultados")
+    parser.add_argument("--nivel", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.nivel:
+        print(json.dumps(medir_nivel(args.nivel, args.execucoes)))
+        return
+
+    if args.dados:
+        os.environ["PIB_DADOS"] = args.dados
+
+    niveis = []
+    print(f"{'sessões':>8s} {'execuções':>10s} {'exec/s':>8s} {'mediana':>10s} {'p95':>10s} "
+          f"{'carga base':>11s} {'memória':>9s} {'pico':>9s}")
+    for sessoes in args.sessoes:
+        nivel = _executar_nivel(sessoes, args.execucoes)
+        niveis.append(nivel)
+        carregamento = nivel["carregamento_medio_ms"]
+        print(f"{sessoes:8d} {nivel['execucoes']:10d} {nivel['execucoes_por_s']:8.2f} "
+              f"{nivel['latencia_mediana_ms']:8.0f}ms {nivel['latencia_p95_ms']:8.0f}ms "
+              f"{carregamento if carregamento is not None else float('nan'):9.2f}ms "
+              f"{nivel['memoria_inicial_mib']:7.1f}MiB {nivel['memoria_pico_mib']:7.1f}MiB")
+        for erro in nivel["erros"]:
+            print(f"    erro: {erro}")
+
+    if args.saida:
+        relatorio = {
+            "metadados": {
+                "data": datetime.now().isoformat(timespec="seconds"),
+                "arquivo": os.environ.get("PIB_DADOS", "pib_municipios.parquet"),
+                "execucoes_por_sessao": args.execucoes,
+                "python": sys.version.split()[0]
+            },
+            "niveis": niveis
+        }
+        Path(args.saida).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.saida).write_text(json.dumps(relatorio, ensure_ascii=False, indent=2))
+        print(f"resultados gravados em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import functools
+import inspect
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+# Limites padrão do cache de consultas (configuráveis por variável de ambiente)
+TAMANHO_PADRAO = int(os.environ.get("PIB_CACHE_TAMANHO", "512"))
+TTL_PADRAO = float(os.environ.get("PIB_CACHE_TTL", "0")) or None
+
+
+class CacheConsultas:
+    """
+    Cache LRU das funções de consulta, com limite de entradas e validade opcional.
+
+    As chaves combinam o nome da função, a versão da base (df.attrs["versao_base"])
+    e os argumentos escalares, de modo que o DataFrame nunca precisa ser hasheado.
+    """
+
+    def __init__(self, tamanho_maximo=TAMANHO_PADRAO, ttl=TTL_PADRAO):
+        self.tamanho_maximo = tamanho_maximo
+        self.ttl = ttl
+        self._entradas = OrderedDict()
+        self._trava = threading.Lock()
+        self._contadores = {}
+
+    def _contar(self, funcao, evento):
+        contadores = self._contadores.setdefault(funcao, {"acertos": 0, "falhas": 0, "descartes": 0})
+        contadores[evento] += 1
+
+    def obter(self, chave):
+        """Retorna (True, valor) se a chave estiver no cache e válida; senão (False, None)."""
+        with self._trava:
+            entrada = self._entradas.get(chave)
+            if entrada is not None:
+                valor, criado_em = entrada
+                if self.ttl is None or time.monotonic() - criado_em <= self.ttl:
+                    self._entradas.move_to_end(chave)
+                    self._contar(chave[0], "acertos")
+                    return True, valor
+                del self._entradas[chave]
+            self._contar(chave[0], "falhas")
+            return False, None
+
+    def guardar(self, chave, valor):
+        """Guarda um valor, descartando as entradas menos usadas acima do limite."""
+        with self._trava:
+            self._entradas[chave] = (valor, time.monotonic())
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.tamanho_maximo:
+                chave_antiga, _ = self._entradas.popitem(last=False)
+                self._contar(chave_antiga[0], "descartes")
+
+    def limpar(self):
+        """Remove todas as entradas e zera os contadores."""
+        with self._trava:
+            self._entradas.clear()
+            self._contadores.clear()
+
+    def estatisticas(self):
+        """Retorna contadores por função e o total de entradas."""
+        with self._trava:
+            por_funcao = {funcao: dict(contadores) for funcao, contadores in self._contadores.items()}
+            return {
+                "entradas": len(self._entradas),
+                "tamanho_maximo": self.tamanho_maximo,
+                "ttl": self.ttl,
+                "acertos": sum(c["acertos"] for c in por_funcao.values()),
+                "falhas": sum(c["falhas"] for c in por_funcao.values()),
+                "descartes": sum(c["descartes"] for c in por_funcao.values()),
+                "por_funcao": por_funcao
+            }
+
+
+_CACHE = CacheConsultas()
+
+# Base carregada por load_data em cada versão. Recortes da base (df[mascara],
+# df.iloc[...]) herdam os attrs, inclusive a versão, mas não são este objeto.
+# As referências são fracas: a base sai do registro quando é descartada.
+_BASES = weakref.WeakValueDictionary()
+
+
+def registrar_base(base):
+    """
+    Registra `base` como a base carregada da sua versão (base.attrs["versao_base"]).
+
+    Returns:
+        A própria base
+    """
+    _BASES[base.attrs["versao_base"]] = base
+    return base
+
+
+def base_registrada(base):
+    """True se `base` é o próprio objeto registrado para a sua versão (e não um recorte com os mesmos attrs)."""
+    versao = base.attrs.get("versao_base")
+    return versao is not None and _BASES.get(versao) is base
+
+
+def configurar_cache(tamanho_maximo=None, ttl=None):
+    """
+    Ajusta os limites do cache de consultas.
+
+    Args:
+        tamanho_maximo: Número máximo de entradas (LRU)
+        ttl: Validade das entradas em segundos (0 desativa a expiração)
+    """
+    with _CACHE._trava:
+        if tamanho_maximo is not None:
+            _CACHE.tamanho_maximo = tamanho_maximo
+        if ttl is not None:
+            _CACHE.ttl = ttl or None
+        while len(_CACHE._entradas) > _CACHE.tamanho_maximo:
+            chave_antiga, _ = _CACHE._entradas.popitem(last=False)
+            _CACHE._contar(chave_antiga[0], "descartes")
+
+
+def estatisticas_cache():
+    """Retorna acertos, falhas e descartes do cache de consultas (total e por função)."""
+    return _CACHE.estatisticas()
+
+
+def limpar_cache():
+    """Esvazia o cache de consultas."""
+    _CACHE.limpar()
+
+
+def _normalizar(valor):
+    """Converte um argumento em valor hasheável (listas viram tuplas, escalares NumPy viram Python)."""
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if isinstance(valor, (list, tuple, np.ndarray, pd.Index, pd.Series)):
+        return tuple(_normalizar(item) for item in valor)
+    hash(valor)
+    return valor
+
+
+def _copiar(valor):
+    """Copia o resultado para que o chamador possa alterá-lo sem afetar o cache."""
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        return valor.copy()
+    if isinstance(valor, dict):
+        return {chave: _copiar(item) for chave, item in valor.items()}
+    if isinstance(valor, list):
+        return [_copiar(item) for item in valor]
+    return valor
+
+
+def memorizar(funcao):
+    """
+    Decorador que memoriza uma função de consulta cujo primeiro argumento é a base.
+
+    A chave usa a versão da base e os demais argumentos (com os valores padrão
+    aplicados). Só a base registrada por load_data usa o cache: recortes dela
+    herdam a versão nos attrs, mas não o conteúdo. Outros DataFrames, bases
+    sem versão e argumentos não hasheáveis são calculados diretamente.
+    """
+    assinatura = inspect.signature(funcao)
+
+    @functools.wraps(funcao)
+    def envoltorio(df, *args, **kwargs):
+        versao = df.attrs.get("versao_base") if base_registrada(df) else None
+        try:
+            argumentos = assinatura.bind(df, *args, **kwargs)
+            argumentos.apply_defaults()
+            parametros = tuple(
+                (nome, _normalizar(valor)) for nome, valor in list(argumentos.arguments.items())[1:]
+            )
+        except TypeError:
+            versao = None
+
+        if versao is None:
+            return funcao(df, *args, **kwargs)
+
+        chave = (funcao.__name__, versao, len(df), parametros)
+        encontrado, valor = _CACHE.obter(chave)
+        if not encontrado:
+            valor = funcao(df, *args, **kwargs)
+            _CACHE.guardar(chave, valor)
+        return _copiar(valor)
+
+    envoltorio.sem_cache = funcao
+    return envoltorio
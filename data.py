@@ -1,47 +1,1282 @@
+import json
+import os
+import weakref
+from functools import lru_cache
+from types import MappingProxyType
+
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
 import streamlit as st
 
+from cache import base_registrada, memorizar, registrar_base
+from instrumentacao import instrumentar_modulo
+
+
+# Arquivo parquet único ou diretório da base particionada por ano/sigla_uf (ver ingestao.py)
+ARQUIVO_DADOS = os.environ.get("PIB_DADOS", "pib_municipios.parquet")
+
+# Manifesto de versão gravado por ingestao.py: arquivo na raiz do diretório
+# particionado ou metadado do parquet único
+ARQUIVO_MANIFESTO = "_versao.json"
+CHAVE_MANIFESTO = b"pib_manifesto"
+
+COLUNAS_BASE = [
+    "ano", "cod_grande_regiao", "nome_grande_regiao", "cod_uf", "sigla_uf", "nome_uf",
+    "cod_municipio", "nome_municipio", "vab_agropecuaria", "vab_industria", "vab_servicos",
+    "vab_adm_defesa_educacao_saude", "vab_total", "impostos_liquidos_subsidios", "pib_total",
+    "pib_per_capita", "atividade_maior_vab", "atividade_segundo_maior_vab", "atividade_terceiro_maior_vab"
+]
+
+# Ordem física da base: ano e, dentro do ano, código IBGE. Como o código do
+# município começa pelo código da UF (que começa pelo da região), cada
+# (ano, região) e (ano, UF) ocupa um bloco contíguo de linhas.
+ORDEM_BASE = ["ano", "cod_grande_regiao", "cod_uf", "cod_municipio"]
+
+COLUNAS_VAB = ["vab_agropecuaria", "vab_industria", "vab_servicos", "vab_adm_defesa_educacao_saude"]
+NOMES_SETORES = ["Agropecuária", "Indústria", "Serviços", "Administração Pública"]
+
+# Totais aditivos guardados no cubo de agregados
+COLUNAS_CUBO = ["pib_total", "populacao", *COLUNAS_VAB, "vab_total", "num_municipios", "num_ufs"]
+
+# Colunas disponíveis nos painéis entidade × ano (população derivada de PIB / PIB per capita)
+COLUNAS_PAINEL = ["pib_total", "pib_per_capita", "populacao", *COLUNAS_VAB, "vab_total"]
+
+# Esquema compacto da base: rótulos repetidos viram categorias (filtros e
+# agrupamentos comparam códigos inteiros), anos e códigos IBGE usam inteiros curtos
+COLUNAS_CATEGORICAS = [
+    "nome_grande_regiao", "sigla_uf", "nome_uf", "nome_municipio",
+    "atividade_maior_vab", "atividade_segundo_maior_vab", "atividade_terceiro_maior_vab"
+]
+TIPOS_INTEIROS = {
+    "ano": "int16",
+    "cod_grande_regiao": "int32",
+    "cod_uf": "int32",
+    "cod_municipio": "int32"
+}
+COLUNAS_MONETARIAS = [
+    *COLUNAS_VAB, "vab_total", "impostos_liquidos_subsidios", "pib_total", "pib_per_capita"
+]
+
+# Valores monetários em float32 (metade da memória, ~7 dígitos significativos)
+USAR_FLOAT32 = os.environ.get("PIB_FLOAT32", "").lower() in ("1", "true", "sim")
+
+# Motor das consultas: "pandas" (padrão), "duckdb" (SQL sobre o parquet, ver backend_duckdb.py)
+# ou "polars" (consultas preguiçosas sobre o parquet, ver backend_polars.py)
+BACKEND = os.environ.get("PIB_BACKEND", "pandas").lower()
+
+
+def load_data(float32=None, arquivo=ARQUIVO_DADOS):
+    """
+    Carrega os dados do arquivo parquet no esquema compacto, ordenados por ano e código IBGE.
+
+    A base é carregada uma vez por versão e o mesmo DataFrame é entregue a
+    todas as sessões e reruns, sem cópia; os valores são somente leitura
+    (ver somente_leitura). Quando ingestao.py grava uma nova versão, a
+    próxima chamada carrega a base de novo, e o índice da versão anterior é
+    reaproveitado nos anos que não mudaram (ver indexar).
+    
+    Args:
+        float32: Se True, guarda as colunas monetárias em float32
+                 (padrão: variável de ambiente PIB_FLOAT32)
+        arquivo: Caminho do arquivo parquet ou do diretório particionado
+                 (padrão: ARQUIVO_DADOS)
+    
+    Returns:
+        DataFrame base
+    """
+    float32 = USAR_FLOAT32 if float32 is None else float32
+    return _carregar_base(arquivo, float32, _versao_arquivo(arquivo))
+
+
+# Bases mantidas pelo cache do Streamlit: a versão atual e a anterior (ainda em
+# uso por sessões no meio de um rerun quando a nova versão é gravada)
+VERSOES_EM_MEMORIA = 2
+
+
+@st.cache_resource(max_entries=VERSOES_EM_MEMORIA)
+def _carregar_base(arquivo, float32, versao):
+    if os.path.isdir(arquivo):
+        df = _dataset_particionado(arquivo).to_table().to_pandas()[COLUNAS_BASE]
+    else:
+        df = pd.read_parquet(arquivo)
+    df = compactar_base(df, float32=float32)
+    df = df.sort_values(ORDEM_BASE, ignore_index=True)
+
+    # Identifica a versão do arquivo para associar o índice a este DataFrame,
+    # e as versões anteriores, com os anos alterados desde cada uma
+    sufixo = "-float32" if float32 else ""
+    df.attrs["versao_base"] = versao + sufixo
+    df.attrs["versoes_anteriores"] = _versoes_anteriores(_manifesto(arquivo), sufixo)
+    return registrar_base(somente_leitura(df))
+
+
+def _manifesto(caminho):
+    """Manifesto de versão gravado por ingestao.py (None se a base não tiver manifesto)."""
+    alvo = os.path.join(caminho, ARQUIVO_MANIFESTO) if os.path.isdir(caminho) else caminho
+    try:
+        info = os.stat(alvo)
+    except FileNotFoundError:
+        return None
+    return _ler_manifesto(alvo, info.st_size, info.st_mtime_ns)
+
+
+@lru_cache(maxsize=8)
+def _ler_manifesto(alvo, tamanho, modificado):
+    # Tamanho e data de modificação entram na chave: o arquivo só é relido quando muda
+    if alvo.endswith(ARQUIVO_MANIFESTO):
+        with open(alvo, encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+    texto = (pq.read_metadata(alvo).metadata or {}).get(CHAVE_MANIFESTO)
+    return json.loads(texto) if texto else None
+
+
+def _versoes_anteriores(manifesto, sufixo=""):
+    """
+    Versões anteriores do manifesto, da mais recente para a mais antiga.
+
+    Returns:
+        Tupla de (versao_base anterior, anos alterados desde ela)
+    """
+    if manifesto is None:
+        return ()
+    versoes = []
+    anos = set()
+    for entrada in sorted(manifesto["historico"], key=lambda entrada: entrada["versao"], reverse=True):
+        if entrada["versao"] < manifesto["versao"]:
+            versoes.append((f"{manifesto['id']}-v{entrada['versao']}{sufixo}", tuple(sorted(anos))))
+        anos.update(entrada["anos"])
+    return tuple(versoes)
+
+
+def _versao_arquivo(caminho):
+    """
+    Versão da base: a do manifesto gravado por ingestao.py ou, sem manifesto,
+    tamanho e data de modificação do arquivo (ou dos arquivos do diretório).
+    """
+    manifesto = _manifesto(caminho)
+    if manifesto is not None:
+        return f"{manifesto['id']}-v{manifesto['versao']}"
+
+    if not os.path.isdir(caminho):
+        info = os.stat(caminho)
+        return f"{info.st_size}-{info.st_mtime_ns}"
+    
+    tamanho, modificado, arquivos = 0, 0, 0
+    for raiz, _, nomes in os.walk(caminho):
+        for nome in nomes:
+            info = os.stat(os.path.join(raiz, nome))
+            tamanho += info.st_size
+            modificado = max(modificado, info.st_mtime_ns)
+            arquivos += 1
+    return f"{tamanho}-{modificado}-{arquivos}"
+
+
+def compactar_base(df, float32=False):
+    """
+    Converte a base para o esquema compacto (categorias, int16/int32 e, opcionalmente, float32).
+    
+    Args:
+        df: DataFrame base
+        float32: Se True, converte as colunas monetárias para float32
+    
+    Returns:
+        DataFrame convertido (colunas ausentes são ignoradas)
+    """
+    tipos = {col: "category" for col in COLUNAS_CATEGORICAS if col in df.columns}
+    tipos.update({col: tipo for col, tipo in TIPOS_INTEIROS.items() if col in df.columns})
+    if float32:
+        tipos.update({col: "float32" for col in COLUNAS_MONETARIAS if col in df.columns})
+    return df.astype(tipos)
+
+
+def somente_leitura(df):
+    """
+    Remonta o DataFrame sobre os mesmos arrays, marcados como somente leitura.
+
+    Usado nos DataFrames compartilhados entre sessões (base e cubo): uma
+    escrita nos valores (ex: df.loc[0, "pib_total"] = 0) levanta ValueError
+    em vez de alterar os dados das demais sessões. Consultas e cópias
+    continuam funcionando normalmente.
+
+    Args:
+        df: DataFrame (colunas NumPy ou categóricas)
+
+    Returns:
+        DataFrame com os mesmos valores, índice e attrs, sem cópia dos dados
+    """
+    colunas = {}
+    for col in df.columns:
+        valores = df[col].array
+        if isinstance(valores, pd.Categorical):
+            # Os códigos de um Categorical já são expostos como somente leitura
+            valores = pd.Categorical.from_codes(valores.codes, dtype=valores.dtype)
+        elif isinstance(valores, pd.arrays.NumpyExtensionArray):
+            valores = valores.to_numpy()
+            valores.flags.writeable = False
+        colunas[col] = valores
+
+    compartilhado = pd.DataFrame(colunas, index=df.index, copy=False)
+    compartilhado.attrs = dict(df.attrs)
+    return compartilhado
+
+
+def relatorio_memoria(antes, depois):
+    """
+    Compara o uso de memória, coluna a coluna, de duas versões da base.
+    
+    Args:
+        antes: DataFrame original
+        depois: DataFrame compactado
+    
+    Returns:
+        DataFrame com tipo e memória (MiB) antes e depois, com linha de total
+    """
+    mem_antes = antes.memory_usage(deep=True, index=False)
+    mem_depois = depois.memory_usage(deep=True, index=False)
+    relatorio = pd.DataFrame({
+        "Tipo antes": antes.dtypes.astype(str),
+        "Tipo depois": depois.dtypes.reindex(antes.columns).astype(str),
+        "Antes (MiB)": mem_antes / 2**20,
+        "Depois (MiB)": mem_depois.reindex(antes.columns) / 2**20
+    })
+    relatorio.loc["Total"] = ["", "", mem_antes.sum() / 2**20, mem_depois.sum() / 2**20]
+    relatorio["Redução (%)"] = (1 - relatorio["Depois (MiB)"] / relatorio["Antes (MiB)"]) * 100
+    return relatorio
+
+
+# ===============================
+# LEITURA DA BASE PARTICIONADA
+# ===============================
+
+# Partições gravadas por ingestao.gravar_particionado (ano=2021/sigla_uf=SP/)
+ESQUEMA_PARTICOES = pa.schema([("ano", pa.int16()), ("sigla_uf", pa.string())])
+
+
+def _dataset_particionado(caminho):
+    return ds.dataset(caminho, format="parquet", partitioning=ds.partitioning(ESQUEMA_PARTICOES, flavor="hive"))
+
+
+def filtro_particoes(regiao=None, uf=None, municipios=None, ano_ini=None, ano_fim=None):
+    """
+    Traduz os filtros de filtrar_dados em uma expressão do pyarrow.dataset.
+    
+    Filtros de ano e UF descartam partições inteiras; os de região e município
+    usam as estatísticas dos grupos de linhas de cada arquivo.
+    
+    Args:
+        regiao: Nome da região (ex: "Sudeste")
+        uf: Sigla da UF (ex: "SP")
+        municipios: Lista de nomes ou códigos de municípios
+        ano_ini: Ano inicial
+        ano_fim: Ano final
+    
+    Returns:
+        Expressão de filtro (None se não houver filtro)
+    """
+    condicoes = []
+    if ano_ini and ano_fim:
+        condicoes += [ds.field("ano") >= ano_ini, ds.field("ano") <= ano_fim]
+    if uf and uf != "Todas":
+        condicoes.append(ds.field("sigla_uf") == uf)
+    if regiao and regiao != "Brasil":
+        condicoes.append(ds.field("nome_grande_regiao") == regiao)
+    if municipios:
+        nomes = [municipio for municipio in municipios if isinstance(municipio, str)]
+        codigos = [int(municipio) for municipio in municipios if not isinstance(municipio, str)]
+        por_municipio = []
+        if nomes:
+            por_municipio.append(ds.field("nome_municipio").isin(nomes))
+        if codigos:
+            por_municipio.append(ds.field("cod_municipio").isin(codigos))
+        condicoes.append(por_municipio[0] if len(por_municipio) == 1 else por_municipio[0] | por_municipio[1])
+    
+    filtro = None
+    for condicao in condicoes:
+        filtro = condicao if filtro is None else filtro & condicao
+    return filtro
+
+
+def ler_particoes(caminho, regiao=None, uf=None, municipios=None, ano_ini=None, ano_fim=None, colunas=None):
+    """
+    Lê da base particionada só as linhas que passam pelos filtros de filtrar_dados.
+    
+    Args:
+        caminho: Diretório da base particionada
+        regiao: Nome da região (ex: "Sudeste")
+        uf: Sigla da UF (ex: "SP")
+        municipios: Lista de nomes ou códigos de municípios
+        ano_ini: Ano inicial
+        ano_fim: Ano final
+        colunas: Lista de colunas a retornar (opcional; padrão: todas)
+    
+    Returns:
+        DataFrame no esquema compacto, ordenado por ano e código IBGE
+    """
+    colunas = colunas or COLUNAS_BASE
+    lidas = [col for col in COLUNAS_BASE if col in colunas or col in ORDEM_BASE]
+    filtro = filtro_particoes(regiao, uf, municipios, ano_ini, ano_fim)
+    
+    tabela = _dataset_particionado(caminho).to_table(columns=lidas, filter=filtro)
+    df = compactar_base(tabela.to_pandas())
+    return df.sort_values(ORDEM_BASE, ignore_index=True)[colunas]
+
+
+# ===============================
+# ÍNDICE DA BASE
+# ===============================
+
+class IndiceBase:
+    """
+    Índice posicional e agregados pré-calculados da base de municípios.
+
+    Mapeia (cod_municipio, ano) para a posição da linha e (sigla_uf, ano),
+    (nome_grande_regiao, ano) e ano para o bloco de linhas correspondente,
+    de modo que as consultas não precisem varrer o DataFrame inteiro.
+
+    Também guarda o cubo de totais por (UF, ano), (região, ano) e
+    (Brasil, ano), usado pelos KPIs, rankings e composições agregadas.
+
+    Um índice por processo é compartilhado por todas as sessões: o cubo, os
+    totais, os painéis e as tabelas de ordenação são somente leitura.
+
+    Com o índice de uma versão anterior da mesma base e os anos alterados
+    desde ela, as linhas do cubo dos demais anos e os blocos das tabelas de
+    ordenação que não mudaram de posição são reaproveitados; só os anos
+    alterados são agregados e ordenados de novo.
+    """
+
+    def __init__(self, df, anterior=None, anos_alterados=()):
+        # Base de origem (referência fraca), conferida por indexar antes de reaproveitar o índice
+        self.base = weakref.ref(df)
+        self.n_linhas = len(df)
+
+        codigos = df["cod_municipio"].to_numpy()
+        anos = df["ano"].to_numpy()
+
+        self.linhas_uf = _blocos(df.groupby(["sigla_uf", "ano"], sort=False, observed=True).indices)
+        self.linhas_regiao = _blocos(df.groupby(["nome_grande_regiao", "ano"], sort=False, observed=True).indices)
+        self.linhas_ano = _blocos(df.groupby("ano", sort=False).indices)
+
+        if anterior is not None and _blocos_mantidos(anterior.linhas_ano, self.linhas_ano, anos_alterados):
+            # Linhas dos anos não alterados continuam nas mesmas posições: só as
+            # entradas dos anos alterados saem (códigos da versão anterior) e entram de novo
+            self.linha_municipio = dict(anterior.linha_municipio)
+            painel_anterior = anterior.paineis["municipio"]
+            for ano in anos_alterados:
+                if ano in anterior.linhas_ano:
+                    for cod in painel_anterior.entidades_nas_linhas(anterior.linhas_ano[ano]).tolist():
+                        del self.linha_municipio[(cod, ano)]
+                if ano in self.linhas_ano:
+                    linhas = _linhas_bloco(self.linhas_ano[ano])
+                    self.linha_municipio.update(zip(zip(codigos[linhas].tolist(), anos[linhas].tolist()), linhas.tolist()))
+        else:
+            self.linha_municipio = dict(zip(zip(codigos.tolist(), anos.tolist()), range(len(df))))
+
+        # Nome -> códigos (ordenados) e código -> UF, para resolver municípios homônimos
+        municipios = df[["cod_municipio", "nome_municipio", "sigla_uf"]].drop_duplicates("cod_municipio")
+        municipios = municipios.sort_values("cod_municipio")
+        self.codigos_por_nome = {}
+        for cod, nome in zip(municipios["cod_municipio"].tolist(), municipios["nome_municipio"].tolist()):
+            self.codigos_por_nome.setdefault(nome, []).append(cod)
+        self.uf_por_codigo = dict(zip(municipios["cod_municipio"].tolist(), municipios["sigla_uf"].tolist()))
+        self.anos = sorted(self.linhas_ano)
+        self.catalogo = CatalogoGeografico(df)
+        self.regiao_por_uf = {
+            uf: regiao for regiao, ufs in self.catalogo.ufs_por_regiao.items() if regiao != "Brasil" for uf in ufs
+        }
+
+        if anterior is None:
+            cubo = _construir_cubo(df)
+        else:
+            cubo = _atualizar_cubo(anterior.cubo, df, anos_alterados)
+        self.cubo = {nivel: somente_leitura(cubo_nivel) for nivel, cubo_nivel in cubo.items()}
+        self.totais = {
+            (nivel, entidade, ano): MappingProxyType(linha)
+            for nivel, cubo in self.cubo.items()
+            for (entidade, ano), linha in cubo.set_index(["entidade", "ano"])[COLUNAS_CUBO].to_dict("index").items()
+        }
+
+        # Municípios ordenados por população em cada (UF, ano) e (Brasil, ano), montado na primeira consulta
+        self.ordem_populacao = None
+        # Tabelas de ranking por métrica (ver _tabela_ranking), montadas na primeira consulta
+        self.rankings = {}
+        if anterior is not None:
+            # As tabelas já montadas na versão anterior são atualizadas agora
+            reaproveitar = (anterior, anos_alterados)
+            if anterior.ordem_populacao is not None:
+                self.ordem_populacao = OrdemPopulacao(df, self, (*reaproveitar, anterior.ordem_populacao.escopos))
+            for metrica, tabelas in anterior.rankings.items():
+                self.rankings[metrica] = _ordenar_escopos(
+                    self, _valores_metrica(df, metrica), decrescente=True, anterior=(*reaproveitar, tabelas)
+                )
+
+        # Tabelas longas de composição setorial por nível (ver tabela_setorial), montadas na primeira consulta
+        self.setores = {}
+
+        # Painéis entidade × ano por nível (municípios a partir da base, demais a partir do cubo)
+        self.paineis = {"municipio": PainelAnual(codigos, anos, self.anos)}
+        for nivel, cubo in self.cubo.items():
+            self.paineis[nivel] = PainelAnual(cubo["entidade"].to_numpy(dtype=object), cubo["ano"].to_numpy(), self.anos)
+
+
+class CatalogoGeografico:
+    """
+    Hierarquia região → UF → município da base, já ordenada, para as listas de seleção.
+
+    Construído uma vez por versão da base (junto com o índice) e imutável:
+    as coleções são tuplas e os mapeamentos são somente leitura. Municípios
+    são identificados pelo código IBGE; o rótulo "Nome (UF)" distingue os
+    homônimos de UFs diferentes.
+
+    Atributos:
+        regioes: Regiões na ordem do código IBGE
+        ufs_por_regiao: Região (ou "Brasil") -> siglas das UFs em ordem alfabética
+        municipios_por_uf: UF -> códigos dos municípios em ordem de nome
+        municipios_por_regiao: Região (ou "Brasil") -> códigos em ordem de rótulo
+        nome_por_codigo, uf_por_codigo, rotulo_por_codigo: Atributos de cada município
+    """
+
+    def __init__(self, df):
+        municipios = df[["cod_grande_regiao", "nome_grande_regiao", "sigla_uf", "cod_municipio", "nome_municipio"]]
+        municipios = municipios.drop_duplicates("cod_municipio")
+        codigos = municipios["cod_municipio"].tolist()
+        nomes = municipios["nome_municipio"].astype(str).tolist()
+        ufs = municipios["sigla_uf"].astype(str).tolist()
+        regioes = municipios["nome_grande_regiao"].astype(str).tolist()
+
+        self.nome_por_codigo = MappingProxyType(dict(zip(codigos, nomes)))
+        self.uf_por_codigo = MappingProxyType(dict(zip(codigos, ufs)))
+        self.rotulo_por_codigo = MappingProxyType({cod: f"{nome} ({uf})" for cod, nome, uf in zip(codigos, nomes, ufs)})
+
+        ordem_regioes = municipios.drop_duplicates("nome_grande_regiao").sort_values("cod_grande_regiao")
+        self.regioes = tuple(ordem_regioes["nome_grande_regiao"].astype(str).tolist())
+
+        # Municípios ordenados por (nome, UF), como nas listas ordenadas por nome
+        ordenados = sorted(zip(nomes, ufs, regioes, codigos))
+        ufs_por_regiao = {"Brasil": set()}
+        municipios_por_uf = {}
+        municipios_por_regiao = {"Brasil": []}
+        for _, uf, regiao, cod in ordenados:
+            ufs_por_regiao.setdefault(regiao, set()).add(uf)
+            ufs_por_regiao["Brasil"].add(uf)
+            municipios_por_uf.setdefault(uf, []).append(cod)
+            municipios_por_regiao.setdefault(regiao, []).append(cod)
+            municipios_por_regiao["Brasil"].append(cod)
+
+        self.ufs_por_regiao = MappingProxyType({regiao: tuple(sorted(siglas)) for regiao, siglas in ufs_por_regiao.items()})
+        self.municipios_por_uf = MappingProxyType({uf: tuple(cods) for uf, cods in municipios_por_uf.items()})
+        self.municipios_por_regiao = MappingProxyType({
+            regiao: tuple(cods) for regiao, cods in municipios_por_regiao.items()
+        })
+
+
+class PainelAnual:
+    """
+    Painel denso entidade × ano de um nível (município, UF, região ou Brasil).
+
+    Guarda, para cada linha da origem (base ou cubo), a linha da entidade e a
+    coluna do ano na matriz. As matrizes (uma por coluna de COLUNAS_PAINEL,
+    com NaN nas células sem dado) são montadas na primeira consulta e
+    reaproveitadas enquanto o índice existir.
+    """
+
+    def __init__(self, entidades, anos, anos_base):
+        self.entidades, linhas = np.unique(entidades, return_inverse=True)
+        self.posicao = {entidade: i for i, entidade in enumerate(self.entidades.tolist())}
+
+        # Anos consecutivos, um por coluna: a coluna de um ano é ano - anos[0]
+        self.anos = np.arange(anos_base[0], anos_base[-1] + 1)
+        self._linhas = linhas.astype(np.int32)
+        self._colunas = (np.asarray(anos, dtype=np.int32) - self.anos[0]).astype(np.int32)
+        self.matrizes = {}
+        self._origem = None
+
+    def linhas_origem(self):
+        """Matriz entidade × ano com a linha da origem de cada célula (-1 onde não há dado)."""
+        if self._origem is None:
+            origem = np.full((len(self.entidades), len(self.anos)), -1, dtype=np.int64)
+            origem[self._linhas, self._colunas] = np.arange(len(self._linhas))
+            origem.flags.writeable = False
+            self._origem = origem
+        return self._origem
+
+    def entidades_nas_linhas(self, linhas):
+        """Entidade de cada linha da origem (posições ou fatia)."""
+        return self.entidades[self._linhas[linhas]]
+
+    def montar(self, coluna, valores):
+        """Espalha os valores da origem na matriz entidade × ano da coluna."""
+        matriz = np.full((len(self.entidades), len(self.anos)), np.nan, dtype=valores.dtype)
+        matriz[self._linhas, self._colunas] = valores
+        matriz.flags.writeable = False
+        self.matrizes[coluna] = matriz
+        return matriz
+
+
+def _construir_cubo(df):
+    """
+    Soma os totais aditivos por (UF, ano), (região, ano) e (Brasil, ano).
+
+    Todas as colunas são agregadas em uma única passada sobre os municípios;
+    os níveis região e Brasil são somados a partir do nível UF.
+
+    Returns:
+        Dict nível ('uf', 'regiao', 'brasil') -> DataFrame com colunas
+        entidade, nome_grande_regiao, ano, COLUNAS_CUBO, setor_dominante,
+        pib_per_capita e participações setoriais (%)
+    """
+    # Somas acumuladas em float64 mesmo quando a base está em float32
+    base = df[["nome_grande_regiao", "sigla_uf", "ano", "pib_total", *COLUNAS_VAB, "vab_total"]].astype(
+        {col: "float64" for col in ["pib_total", *COLUNAS_VAB, "vab_total"]}
+    ).assign(
+        populacao=(df["pib_total"].astype("float64") / df["pib_per_capita"].astype("float64")) * 1000,
+        num_municipios=1
+    )
+
+    por_uf = base.groupby(["nome_grande_regiao", "sigla_uf", "ano"], observed=True).sum()
+    por_uf["num_ufs"] = 1
+    por_regiao = por_uf.groupby(level=["nome_grande_regiao", "ano"], observed=True).sum()
+    por_brasil = por_regiao.groupby(level="ano", observed=True).sum()
+
+    # Setor dominante: atividade cujos municípios somam o maior PIB
+    pib_atividade = df.groupby(
+        ["nome_grande_regiao", "sigla_uf", "ano", "atividade_maior_vab"], observed=True
+    )["pib_total"].sum()
+    por_uf["setor_dominante"] = _setor_dominante(pib_atividade, ["nome_grande_regiao", "sigla_uf", "ano"])
+    por_regiao["setor_dominante"] = _setor_dominante(pib_atividade, ["nome_grande_regiao", "ano"])
+    por_brasil["setor_dominante"] = _setor_dominante(pib_atividade, ["ano"])
+
+    por_uf = por_uf.reset_index().rename(columns={"sigla_uf": "entidade"})
+    por_regiao = por_regiao.reset_index()
+    por_regiao["entidade"] = por_regiao["nome_grande_regiao"]
+    por_brasil = por_brasil.reset_index()
+    por_brasil["entidade"] = "Brasil"
+    por_brasil["nome_grande_regiao"] = "Brasil"
+
+    colunas = ["entidade", "nome_grande_regiao", "ano", *COLUNAS_CUBO, "setor_dominante"]
+    return {
+        nivel: _com_razoes(cubo[colunas].sort_values(["entidade", "ano"], ignore_index=True))
+        for nivel, cubo in [("uf", por_uf), ("regiao", por_regiao), ("brasil", por_brasil)]
+    }
+
+
+def _atualizar_cubo(cubo_anterior, df, anos):
+    """
+    Cubo da base a partir do cubo de uma versão anterior: as linhas dos anos
+    alterados são agregadas de novo e as dos demais anos são mantidas.
+
+    Args:
+        cubo_anterior: Cubo da versão anterior (ver _construir_cubo)
+        df: DataFrame base da nova versão
+        anos: Anos alterados desde a versão anterior
+
+    Returns:
+        Dict nível -> DataFrame, como em _construir_cubo
+    """
+    alterados = df[df["ano"].isin(anos)]
+    novo = _construir_cubo(alterados) if len(alterados) else None
+    cubo = {}
+    for nivel, anterior in cubo_anterior.items():
+        partes = [anterior[~anterior["ano"].isin(anos)]]
+        if novo is not None:
+            partes.append(novo[nivel])
+        cubo_nivel = pd.concat(partes, ignore_index=True)
+        if novo is not None:
+            # Categorias da nova versão, como se o cubo fosse montado do zero
+            cubo_nivel = cubo_nivel.astype({
+                col: tipo for col, tipo in novo[nivel].dtypes.items() if isinstance(tipo, pd.CategoricalDtype)
+            })
+        cubo[nivel] = cubo_nivel.sort_values(["entidade", "ano"], ignore_index=True)
+    return cubo
+
+
+def _setor_dominante(pib_atividade, chaves):
+    """Retorna, para cada chave, a atividade com maior PIB somado (empate: ordem alfabética)."""
+    soma = pib_atividade.groupby(level=[*chaves, "atividade_maior_vab"], observed=True).sum().reset_index()
+    soma = soma.sort_values("pib_total", ascending=False, kind="stable").drop_duplicates(chaves)
+    return soma.set_index(chaves)["atividade_maior_vab"]
+
+
+def _blocos(grupos):
+    """Converte posições de grupos em fatias quando as linhas são contíguas."""
+    blocos = {}
+    for chave, posicoes in grupos.items():
+        if posicoes[-1] - posicoes[0] + 1 == len(posicoes):
+            blocos[chave] = slice(int(posicoes[0]), int(posicoes[-1]) + 1)
+        else:
+            blocos[chave] = posicoes
+    return blocos
+
+
+_INDICES = {}
+
+
+def indexar(df):
+    """
+    Retorna o índice do DataFrame base.
+
+    O índice é construído uma única vez por versão da base carregada por
+    load_data() e reaproveitado nas chamadas seguintes. Se já houver o
+    índice de uma versão anterior da mesma base, o novo parte dele e só
+    recalcula os anos alterados. Para outros DataFrames (ex: já filtrados,
+    que herdam os attrs da base) um índice é construído na hora.
+    """
+    if not base_registrada(df):
+        return IndiceBase(df)
+
+    versao = df.attrs["versao_base"]
+    indice = _INDICES.get(versao)
+    if indice is not None and indice.base() is df:
+        return indice
+
+    anterior, anos_alterados = _indice_anterior(df)
+    indice = IndiceBase(df, anterior, anos_alterados)
+    _INDICES[versao] = indice
+    _descartar_indices(anterior)
+    return indice
+
+
+def _descartar_indices(aproveitado):
+    """
+    Remove do registro o índice da versão anterior, já aproveitado pelo novo,
+    e os índices cujas bases foram descartadas (ex: pelo limite de versões
+    do cache do Streamlit), para que versões antigas não se acumulem na memória.
+    """
+    for versao, indice in list(_INDICES.items()):
+        if indice is aproveitado or indice.base() is None:
+            _INDICES.pop(versao, None)
+
+
+def _indice_anterior(df):
+    """Índice já construído da versão anterior mais recente da base e os anos alterados desde ela."""
+    for versao, anos in df.attrs.get("versoes_anteriores", ()):
+        anterior = _INDICES.get(versao)
+        if anterior is not None:
+            return anterior, anos
+    return None, ()
+
+
+class OrdemPopulacao:
+    """
+    Municípios ordenados por população dentro de cada (UF, ano) e de cada ano (Brasil).
+
+    Para cada escopo ('uf' e 'brasil') guarda as posições da base ordenadas
+    por (bloco, população), as populações nessa ordem, a fatia de cada bloco
+    e a posição de cada linha da base na ordenação. Com isso, os municípios de
+    população mais próxima de um município ficam ao redor dele na fatia do bloco.
+    """
+
+    def __init__(self, df, indice, anterior=None):
+        self.escopos = _ordenar_escopos(indice, _valores_metrica(df, "populacao"), anterior=anterior)
+
+
+def _valores_metrica(df, metrica):
+    """Valores de uma métrica de ranking em cada linha da base (float64)."""
+    if metrica == "populacao":
+        return (df["pib_total"].to_numpy(dtype="float64") / df["pib_per_capita"].to_numpy(dtype="float64")) * 1000
+    return df[metrica].to_numpy(dtype="float64")
+
+
+def _ordenar_escopos(indice, valores, decrescente=False, anterior=None):
+    """
+    Ordena as posições da base em cada escopo: 'uf' (blocos (UF, ano)) e 'brasil' (blocos ano).
+
+    Args:
+        indice: IndiceBase da base
+        valores: Valor de cada linha da base
+        decrescente: Se True, do maior para o menor valor (empates na ordem da base)
+        anterior: (índice anterior, anos alterados, tabelas anteriores) para
+                  reaproveitar os blocos que não mudaram (opcional)
+
+    Returns:
+        Dict escopo -> (ordem, valores ordenados, fatias, posição na ordem),
+        como em _ordenar_blocos
+    """
+    chaves = -valores if decrescente else valores
+    tabelas = {}
+    for escopo, atributo in [("uf", "linhas_uf"), ("brasil", "linhas_ano")]:
+        blocos = getattr(indice, atributo)
+        if anterior is None:
+            ordem, ordenados, fatias, posicao_na_ordem = _ordenar_blocos(blocos, chaves)
+        else:
+            indice_anterior, anos, tabelas_anteriores = anterior
+            ordem_anterior, valores_anteriores, fatias_anteriores, _ = tabelas_anteriores[escopo]
+            ordem, ordenados, fatias, posicao_na_ordem = _emendar_blocos(
+                (ordem_anterior, -valores_anteriores if decrescente else valores_anteriores, fatias_anteriores),
+                getattr(indice_anterior, atributo), blocos, chaves, anos
+            )
+        if decrescente:
+            ordenados = -ordenados
+            ordenados.flags.writeable = False
+        tabelas[escopo] = (ordem, ordenados, fatias, posicao_na_ordem)
+    return tabelas
+
+
+def _ordenar_blocos(blocos, valores):
+    """
+    Ordena as posições da base por (bloco, valor) e retorna ordem, valores ordenados,
+    fatia de cada bloco (apenas valores não nulos; os nulos ficam no fim do bloco)
+    e a posição de cada linha da base na ordem.
+    """
+    chaves = list(blocos)
+    numero_bloco = np.empty(len(valores), dtype=np.int64)
+    for numero, chave in enumerate(chaves):
+        numero_bloco[blocos[chave]] = numero
+
+    ordem = np.lexsort((valores, numero_bloco))
+    fins = np.cumsum(np.bincount(numero_bloco, minlength=len(chaves)))
+    inicios = np.concatenate([[0], fins[:-1]])
+    validos = np.bincount(numero_bloco, weights=~np.isnan(valores), minlength=len(chaves)).astype(np.int64)
+    fatias = {chave: slice(int(inicio), int(inicio + n)) for chave, inicio, n in zip(chaves, inicios, validos)}
+
+    posicao_na_ordem = np.empty(len(valores), dtype=np.int64)
+    posicao_na_ordem[ordem] = np.arange(len(valores))
+    valores_ordenados = valores[ordem]
+    # Tabelas guardadas no índice compartilhado entre sessões
+    for array in (ordem, valores_ordenados, posicao_na_ordem):
+        array.flags.writeable = False
+    return ordem, valores_ordenados, fatias, posicao_na_ordem
+
+
+def _emendar_blocos(tabela_anterior, blocos_anteriores, blocos, valores, anos):
+    """
+    Mesmo resultado de _ordenar_blocos(blocos, valores), copiando da tabela de
+    uma versão anterior os blocos que ocupam as mesmas posições e não são de
+    um ano alterado; só os demais blocos são ordenados.
+    """
+    ordem_anterior, valores_anteriores, fatias_anteriores = tabela_anterior
+    partes_ordem, partes_valores, fatias = [], [], {}
+    inicio = 0
+    for chave, posicoes in blocos.items():
+        ano = chave[-1] if isinstance(chave, tuple) else chave
+        posicoes_anteriores = blocos_anteriores.get(chave)
+        if ano not in anos and _mesmas_posicoes(posicoes, posicoes_anteriores):
+            fatia = fatias_anteriores[chave]
+            segmento = slice(fatia.start, fatia.start + _tamanho_bloco(posicoes))
+            ordem_bloco, valores_bloco = ordem_anterior[segmento], valores_anteriores[segmento]
+            validos = fatia.stop - fatia.start
+        else:
+            linhas = _linhas_bloco(posicoes)
+            ordem_bloco = linhas[np.argsort(valores[linhas], kind="stable")]
+            valores_bloco = valores[ordem_bloco]
+            validos = int(np.count_nonzero(~np.isnan(valores_bloco)))
+        partes_ordem.append(ordem_bloco)
+        partes_valores.append(valores_bloco)
+        fatias[chave] = slice(inicio, inicio + validos)
+        inicio += len(ordem_bloco)
+
+    ordem = np.concatenate(partes_ordem)
+    valores_ordenados = np.concatenate(partes_valores)
+    posicao_na_ordem = np.empty(len(valores), dtype=np.int64)
+    posicao_na_ordem[ordem] = np.arange(len(valores))
+    for array in (ordem, valores_ordenados, posicao_na_ordem):
+        array.flags.writeable = False
+    return ordem, valores_ordenados, fatias, posicao_na_ordem
+
+
+def _blocos_mantidos(blocos_anteriores, blocos, anos):
+    """Indica se os blocos por ano que não são de anos alterados ocupam as mesmas linhas nas duas versões."""
+    return all(
+        _mesmas_posicoes(blocos.get(ano), blocos_anteriores.get(ano))
+        for ano in set(blocos_anteriores) | set(blocos) if ano not in anos
+    )
+
+
+def _tamanho_bloco(posicoes):
+    return posicoes.stop - posicoes.start if isinstance(posicoes, slice) else len(posicoes)
+
+
+def _linhas_bloco(posicoes):
+    """Posições das linhas de um bloco (fatia ou array) como array."""
+    return np.arange(posicoes.start, posicoes.stop) if isinstance(posicoes, slice) else posicoes
+
+
+def _mesmas_posicoes(posicoes, anteriores):
+    """Indica se um bloco ocupa as mesmas linhas da base nas duas versões."""
+    if anteriores is None or isinstance(posicoes, slice) != isinstance(anteriores, slice):
+        return False
+    if isinstance(posicoes, slice):
+        return posicoes == anteriores
+    return np.array_equal(posicoes, anteriores)
+
+
+def _ordem_populacao(df):
+    """Retorna o índice e a ordenação por população (montada na primeira chamada)."""
+    indice = indexar(df)
+    if indice.ordem_populacao is None:
+        indice.ordem_populacao = OrdemPopulacao(df, indice)
+    return indice, indice.ordem_populacao
+
+
+# Métricas com tabela de ranking de municípios
+METRICAS_RANKING = ["pib_total", "pib_per_capita", "populacao"]
+
+
+def _tabela_ranking(df, metrica):
+    """
+    Retorna o índice e as tabelas de ranking de uma métrica (montadas na primeira chamada).
+
+    As tabelas são dicts escopo ('uf', 'brasil') -> (ordem, valores, fatias,
+    posição na ordem), como em _ordenar_blocos, do maior para o menor valor.
+    Empates ficam na ordem da base, como em nlargest.
+    """
+    if metrica not in METRICAS_RANKING:
+        raise ValueError(f"Métrica sem ranking: {metrica!r} (use uma de {METRICAS_RANKING})")
+
+    indice = indexar(df)
+    tabelas = indice.rankings.get(metrica)
+    if tabelas is None:
+        tabelas = _ordenar_escopos(indice, _valores_metrica(df, metrica), decrescente=True)
+        indice.rankings[metrica] = tabelas
+    return indice, tabelas
+
+
+def municipios_populacao_proxima(df, municipio, ano, k=10, uf=None, nacional=False):
+    """
+    Retorna um município e os k municípios com população mais próxima no mesmo ano.
+    
+    A busca parte da posição do município na ordenação por população da UF
+    (ou do Brasil) e examina apenas as k posições de cada lado, sem percorrer
+    os demais municípios.
+    
+    Args:
+        df: DataFrame base
+        municipio: Código IBGE ou nome do município
+        ano: Ano de referência
+        k: Número de municípios semelhantes
+        uf: Sigla da UF para desambiguar nomes (opcional)
+        nacional: Se True, procura em todo o Brasil (padrão: na UF do município)
+    
+    Returns:
+        DataFrame com as linhas da base, o município de referência primeiro e os demais
+        por diferença de população (vazio se o município não tiver dados no ano)
+    """
+    indice, ordem_populacao = _ordem_populacao(df)
+    cod = resolver_municipio(df, municipio, uf)
+    posicao = indice.linha_municipio.get((cod, ano))
+    if posicao is None or (uf and uf != "Todas" and indice.uf_por_codigo[cod] != uf):
+        return df.iloc[0:0]
+
+    chave = ano if nacional else (indice.uf_por_codigo[cod], ano)
+    ordem, populacao, fatias, posicao_na_ordem = ordem_populacao.escopos["brasil" if nacional else "uf"]
+    fatia = fatias[chave]
+
+    # Candidatos: até k vizinhos de cada lado na ordem de população
+    centro = posicao_na_ordem[posicao]
+    if not fatia.start <= centro < fatia.stop:
+        return df.iloc[[posicao]]
+    inicio, fim = max(fatia.start, centro - k), min(fatia.stop, centro + k + 1)
+    candidatos = np.delete(ordem[inicio:fim], centro - inicio)
+    diferencas = np.abs(np.delete(populacao[inicio:fim], centro - inicio) - populacao[centro])
+
+    # Menor diferença primeiro; empates pela ordem da base
+    escolhidos = candidatos[np.lexsort((candidatos, diferencas))[:k]]
+    return df.iloc[np.concatenate([[posicao], escolhidos])]
+
+
+def _linhas(df, blocos, chave):
+    """Retorna as linhas de um bloco do índice (DataFrame vazio se não existir)."""
+    posicoes = blocos.get(chave)
+    if posicoes is None:
+        return df.iloc[0:0]
+    return df.iloc[posicoes]
+
+
+def dados_uf_ano(df, uf, ano):
+    """Retorna as linhas dos municípios de uma UF em um ano."""
+    return _linhas(df, indexar(df).linhas_uf, (uf, ano))
+
+
+def dados_regiao_ano(df, regiao, ano):
+    """Retorna as linhas dos municípios de uma região (ou do Brasil) em um ano."""
+    indice = indexar(df)
+    if regiao == "Brasil":
+        return _linhas(df, indice.linhas_ano, ano)
+    return _linhas(df, indice.linhas_regiao, (regiao, ano))
+
+
+def _nivel_regiao(regiao):
+    return "brasil" if regiao == "Brasil" else "regiao"
+
+
+def totais_agregados(df, nivel, entidade, ano):
+    """
+    Retorna os totais do cubo para uma entidade em um ano.
+
+    Args:
+        df: DataFrame base
+        nivel: 'uf', 'regiao' ou 'brasil'
+        entidade: Sigla da UF, nome da região ou "Brasil"
+        ano: Ano de referência
+
+    Returns:
+        Dict (somente leitura) com COLUNAS_CUBO ou None se não houver dados
+    """
+    return indexar(df).totais.get((nivel, entidade, ano))
+
+
+def cubo_agregado(df, nivel, entidades=None, ano_ini=None, ano_fim=None, regiao=None):
+    """
+    Retorna as linhas do cubo de agregados com PIB per capita e participações setoriais.
+
+    Args:
+        df: DataFrame base
+        nivel: 'uf', 'regiao' ou 'brasil'
+        entidades: Lista de UFs/regiões (opcional)
+        ano_ini: Ano inicial (opcional)
+        ano_fim: Ano final (opcional; igual a ano_ini quando omitido)
+        regiao: Restringe as UFs a uma região (opcional)
+
+    Returns:
+        DataFrame com entidade, nome_grande_regiao, ano, totais e razões
+    """
+    cubo = indexar(df).cubo[nivel]
+
+    mascara = np.ones(len(cubo), dtype=bool)
+    if entidades is not None:
+        mascara &= np.isin(cubo["entidade"].to_numpy(), list(entidades))
+    if regiao and regiao != "Brasil":
+        mascara &= cubo["nome_grande_regiao"].to_numpy() == regiao
+    if ano_ini is not None:
+        ano_fim = ano_ini if ano_fim is None else ano_fim
+        anos = cubo["ano"].to_numpy()
+        mascara &= (anos >= ano_ini) & (anos <= ano_fim)
+
+    return cubo[mascara].reset_index(drop=True)
+
+
+def somar_cubo(df, nivel, entidades, ano):
+    """
+    Soma os totais do cubo de várias entidades em um ano.
+
+    Args:
+        df: DataFrame base
+        nivel: 'uf' ou 'regiao'
+        entidades: Lista de UFs ou regiões
+        ano: Ano de referência
+
+    Returns:
+        Dict com COLUNAS_CUBO e pib_per_capita ou None se não houver dados
+    """
+    linhas = [totais_agregados(df, nivel, entidade, ano) for entidade in entidades]
+    linhas = [linha for linha in linhas if linha is not None]
+    if not linhas:
+        return None
+
+    soma = {col: sum(linha[col] for linha in linhas) for col in COLUNAS_CUBO}
+    soma["pib_per_capita"] = soma["pib_total"] / (soma["populacao"] / 1000) if soma["populacao"] > 0 else 0
+    return soma
+
+
+def _com_razoes(cubo):
+    """Acrescenta PIB per capita e participações setoriais (%) às linhas do cubo."""
+    cubo = cubo.copy()
+    cubo["pib_per_capita"] = cubo["pib_total"] / (cubo["populacao"] / 1000)
+    for col, setor in zip(COLUNAS_VAB, NOMES_SETORES):
+        cubo[f"{setor} (%)"] = (cubo[col] / cubo["vab_total"]) * 100
+    return cubo
+
+
+def resolver_municipio(df, municipio, uf=None):
+    """
+    Retorna o código IBGE de um município.
+
+    Args:
+        df: DataFrame base
+        municipio: Código IBGE ou nome do município
+        uf: Sigla da UF, usada para desambiguar nomes repetidos (opcional)
+
+    Returns:
+        Código do município ou None se não encontrado
+    """
+    indice = indexar(df)
+    if municipio is None:
+        return None
+    if not isinstance(municipio, str):
+        return int(municipio) if int(municipio) in indice.uf_por_codigo else None
+
+    codigos = indice.codigos_por_nome.get(municipio, [])
+    if uf and uf != "Todas":
+        codigos = [cod for cod in codigos if indice.uf_por_codigo[cod] == uf]
+    return codigos[0] if codigos else None
+
+
+def obter_uf_municipio(df, municipio):
+    """Retorna a sigla da UF de um município (código ou nome)."""
+    cod = resolver_municipio(df, municipio)
+    return indexar(df).uf_por_codigo.get(cod)
+
+
+def dados_municipio_ano(df, municipio, ano, uf=None):
+    """
+    Retorna a linha de um município em um ano.
+
+    Args:
+        df: DataFrame base
+        municipio: Código IBGE ou nome do município
+        ano: Ano de referência
+        uf: Sigla da UF para desambiguar nomes (opcional)
+
+    Returns:
+        Series com os dados do município ou None se não houver dados
+    """
+    cod = resolver_municipio(df, municipio, uf)
+    posicao = indexar(df).linha_municipio.get((cod, ano))
+    if posicao is None:
+        return None
+    return df.iloc[posicao]
+
+
+# ===============================
+# PAINÉIS ENTIDADE × ANO
+# ===============================
+
+NIVEIS_PAINEL = ["municipio", "uf", "regiao", "brasil"]
+
+
+def _matriz(df, nivel, coluna):
+    """Retorna o painel do nível e a matriz entidade × ano da coluna (montada na primeira chamada)."""
+    if nivel not in NIVEIS_PAINEL:
+        raise ValueError(f"Nível inválido: {nivel!r} (use um de {NIVEIS_PAINEL})")
+    if coluna not in COLUNAS_PAINEL:
+        raise ValueError(f"Coluna sem painel: {coluna!r} (use uma de {COLUNAS_PAINEL})")
+
+    indice = indexar(df)
+    painel = indice.paineis[nivel]
+    matriz = painel.matrizes.get(coluna)
+    if matriz is not None:
+        return painel, matriz
+
+    origem = df if nivel == "municipio" else indice.cubo[nivel]
+    if coluna == "populacao" and nivel == "municipio":
+        valores = (origem["pib_total"].to_numpy(dtype="float64") / origem["pib_per_capita"].to_numpy(dtype="float64")) * 1000
+    else:
+        valores = origem[coluna].to_numpy()
+        valores = valores.astype(np.result_type(valores.dtype, np.float32))
+    return painel, painel.montar(coluna, valores)
+
+
+def _selecionar(painel, matriz, entidades):
+    """Linhas das entidades pedidas (NaN para as que não existem no painel)."""
+    if entidades is None:
+        return painel.entidades.tolist(), matriz
+    entidades = list(entidades)
+    linhas = np.array([painel.posicao.get(entidade, -1) for entidade in entidades], dtype=np.int64)
+    selecao = matriz[np.maximum(linhas, 0)]
+    selecao[linhas < 0] = np.nan
+    return entidades, selecao
+
+
+def _coluna_ano(painel, matriz, ano):
+    """Coluna de um ano da matriz (NaN se o ano estiver fora do painel)."""
+    coluna = int(ano) - int(painel.anos[0])
+    if 0 <= coluna < len(painel.anos):
+        return matriz[:, coluna]
+    return np.full(len(matriz), np.nan)
+
+
+def _crescimento_entidade(df, nivel, entidade, ano_ini, ano_fim, coluna="pib_total"):
+    """Crescimento (%) de uma entidade entre dois anos (None quando falta um dos anos)."""
+    painel, matriz = _matriz(df, nivel, coluna)
+    linha = painel.posicao.get(entidade)
+    if linha is None:
+        return None
+    inicio = _coluna_ano(painel, matriz[linha:linha + 1], ano_ini)[0]
+    fim = _coluna_ano(painel, matriz[linha:linha + 1], ano_fim)[0]
+    if np.isnan(inicio) or np.isnan(fim) or inicio == 0:
+        return None
+    return float(((fim - inicio) / inicio) * 100)
+
+
+def painel_anual(df, nivel, coluna="pib_total", entidades=None, ano_ini=None, ano_fim=None):
+    """
+    Retorna o painel entidade × ano de uma coluna.
+    
+    Args:
+        df: DataFrame base
+        nivel: 'municipio', 'uf', 'regiao' ou 'brasil'
+        coluna: Uma das COLUNAS_PAINEL
+        entidades: Códigos IBGE, UFs ou regiões (opcional; padrão: todas)
+        ano_ini: Primeiro ano (opcional)
+        ano_fim: Último ano (opcional)
+    
+    Returns:
+        DataFrame com uma linha por entidade e uma coluna por ano (NaN onde não há dado)
+    """
+    painel, matriz = _matriz(df, nivel, coluna)
+    rotulos, selecao = _selecionar(painel, matriz, entidades)
+    anos = painel.anos
+    colunas = (anos >= (anos[0] if ano_ini is None else ano_ini)) & (anos <= (anos[-1] if ano_fim is None else ano_fim))
+    return pd.DataFrame(selecao[:, colunas], index=pd.Index(rotulos, name="entidade"), columns=anos[colunas].tolist())
+
+
+def crescimento_entre_anos(df, nivel, ano_ini, ano_fim, coluna="pib_total", entidades=None):
+    """
+    Calcula o crescimento acumulado (%) entre dois anos para todas as entidades de um nível.
+    
+    Args:
+        df: DataFrame base
+        nivel: 'municipio', 'uf', 'regiao' ou 'brasil'
+        ano_ini: Ano inicial
+        ano_fim: Ano final
+        coluna: Uma das COLUNAS_PAINEL (padrão: pib_total)
+        entidades: Códigos IBGE, UFs ou regiões (opcional; padrão: todas)
+    
+    Returns:
+        Series indexada pela entidade (NaN quando falta um dos anos)
+    """
+    painel, matriz = _matriz(df, nivel, coluna)
+    rotulos, selecao = _selecionar(painel, matriz, entidades)
+    inicio = _coluna_ano(painel, selecao, ano_ini)
+    fim = _coluna_ano(painel, selecao, ano_fim)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        crescimento = np.where(inicio != 0, ((fim - inicio) / inicio) * 100, np.nan)
+    return pd.Series(crescimento, index=pd.Index(rotulos, name="entidade"), name=coluna)
+
+
+def crescimento_anual(df, nivel, coluna="pib_total", entidades=None, ano_ini=None, ano_fim=None):
+    """
+    Calcula o crescimento (%) de cada ano em relação ao anterior.
+    
+    Args:
+        df: DataFrame base
+        nivel: 'municipio', 'uf', 'regiao' ou 'brasil'
+        coluna: Uma das COLUNAS_PAINEL (padrão: pib_total)
+        entidades: Códigos IBGE, UFs ou regiões (opcional; padrão: todas)
+        ano_ini: Primeiro ano (opcional)
+        ano_fim: Último ano (opcional)
+    
+    Returns:
+        DataFrame entidade × ano (NaN no primeiro ano do painel e onde falta dado)
+    """
+    painel, matriz = _matriz(df, nivel, coluna)
+    rotulos, selecao = _selecionar(painel, matriz, entidades)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        anterior = selecao[:, :-1]
+        crescimento = np.full(selecao.shape, np.nan)
+        crescimento[:, 1:] = np.where(anterior != 0, ((selecao[:, 1:] - anterior) / anterior) * 100, np.nan)
+    anos = painel.anos
+    colunas = (anos >= (anos[0] if ano_ini is None else ano_ini)) & (anos <= (anos[-1] if ano_fim is None else ano_fim))
+    return pd.DataFrame(crescimento[:, colunas], index=pd.Index(rotulos, name="entidade"), columns=anos[colunas].tolist())
+
 
-@st.cache_data
-def load_data():
-    """Carrega os dados do arquivo parquet."""
-    return pd.read_parquet("pib_municipios.parquet")
+def crescimento_composto(df, nivel, ano_ini, ano_fim, coluna="pib_total", entidades=None):
+    """
+    Calcula a taxa de crescimento anual composta (% a.a.) entre dois anos.
+    
+    Args:
+        df: DataFrame base
+        nivel: 'municipio', 'uf', 'regiao' ou 'brasil'
+        ano_ini: Ano inicial
+        ano_fim: Ano final (maior que ano_ini)
+        coluna: Uma das COLUNAS_PAINEL (padrão: pib_total)
+        entidades: Códigos IBGE, UFs ou regiões (opcional; padrão: todas)
+    
+    Returns:
+        Series indexada pela entidade (NaN quando falta um dos anos ou os valores têm sinais opostos)
+    """
+    painel, matriz = _matriz(df, nivel, coluna)
+    rotulos, selecao = _selecionar(painel, matriz, entidades)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        razao = _coluna_ano(painel, selecao, ano_fim) / _coluna_ano(painel, selecao, ano_ini)
+        if ano_fim > ano_ini:
+            taxa = np.where(razao > 0, (np.power(razao, 1 / (ano_fim - ano_ini)) - 1) * 100, np.nan)
+        else:
+            taxa = np.full(len(razao), np.nan)
+    return pd.Series(taxa, index=pd.Index(rotulos, name="entidade"), name=coluna)
 
 
 # ===============================
 # FUNÇÕES DE FILTRAGEM BASE
 # ===============================
 
-def filtrar_dados(df, regiao=None, uf=None, municipios=None, ano_ini=None, ano_fim=None):
+def filtrar_dados(df, regiao=None, uf=None, municipios=None, ano_ini=None, ano_fim=None, colunas=None):
     """
     Filtra o DataFrame base por região, UF, municípios e intervalo de anos.
     
+    As linhas são localizadas pelo índice da base (blocos por UF/região/ano
+    e posição de cada município), sem copiar o DataFrame inteiro nem criar
+    DataFrames intermediários a cada filtro.
+    
     Args:
         df: DataFrame base
         regiao: Nome da região (ex: "Sudeste")
         uf: Sigla da UF (ex: "SP")
-        municipios: Lista de nomes de municípios
+        municipios: Lista de nomes ou códigos de municípios
         ano_ini: Ano inicial
         ano_fim: Ano final
+        colunas: Lista de colunas a retornar (opcional; padrão: todas)
     
     Returns:
         DataFrame filtrado
     """
-    df_filtrado = df.copy()
+    indice = indexar(df)
     
-    if regiao and regiao != "Brasil":
-        df_filtrado = df_filtrado[df_filtrado["nome_grande_regiao"] == regiao]
+    if ano_ini and ano_fim:
+        anos = [ano for ano in indice.anos if ano_ini <= ano <= ano_fim]
+    else:
+        anos = indice.anos
     
-    if uf and uf != "Todas":
-        df_filtrado = df_filtrado[df_filtrado["sigla_uf"] == uf]
+    if regiao == "Brasil":
+        regiao = None
+    if uf == "Todas":
+        uf = None
     
     if municipios:
-        df_filtrado = df_filtrado[df_filtrado["nome_municipio"].isin(municipios)]
-    
-    if ano_ini and ano_fim:
-        df_filtrado = df_filtrado[(df_filtrado["ano"] >= ano_ini) & (df_filtrado["ano"] <= ano_fim)]
+        # Nomes incluem todos os municípios homônimos; UF e região restringem a seleção
+        codigos = []
+        for municipio in municipios:
+            if isinstance(municipio, str):
+                codigos.extend(indice.codigos_por_nome.get(municipio, []))
+            else:
+                codigos.append(int(municipio))
+        codigos = [
+            cod for cod in sorted(set(codigos))
+            if (not uf or indice.uf_por_codigo.get(cod) == uf)
+            and (not regiao or indice.regiao_por_uf.get(indice.uf_por_codigo.get(cod)) == regiao)
+        ]
+        blocos = [
+            indice.linha_municipio[(cod, ano)]
+            for ano in anos for cod in codigos
+            if (cod, ano) in indice.linha_municipio
+        ]
+    elif uf:
+        if regiao and indice.regiao_por_uf.get(uf) != regiao:
+            blocos = []
+        else:
+            blocos = [indice.linhas_uf[(uf, ano)] for ano in anos if (uf, ano) in indice.linhas_uf]
+    elif regiao:
+        blocos = [indice.linhas_regiao[(regiao, ano)] for ano in anos if (regiao, ano) in indice.linhas_regiao]
+    else:
+        blocos = [indice.linhas_ano[ano] for ano in anos]
     
-    return df_filtrado
+    linhas = _juntar_blocos(blocos)
+    if colunas is None:
+        return df.iloc[linhas]
+    return df.iloc[linhas, [df.columns.get_loc(col) for col in colunas]]
+
+
+def _juntar_blocos(blocos):
+    """Junta posições e fatias do índice em uma única seleção de linhas (fatia quando contígua)."""
+    if blocos and all(isinstance(bloco, slice) for bloco in blocos):
+        if all(anterior.stop == atual.start for anterior, atual in zip(blocos, blocos[1:])):
+            return slice(blocos[0].start, blocos[-1].stop)
+    
+    partes = []
+    for bloco in blocos:
+        if isinstance(bloco, slice):
+            partes.append(np.arange(bloco.start, bloco.stop))
+        else:
+            partes.append(np.atleast_1d(bloco))
+    return np.concatenate(partes) if partes else np.array([], dtype=np.intp)
+
+
+def catalogo_geografico(df):
+    """Retorna o catálogo região → UF → município da base (ver CatalogoGeografico)."""
+    return indexar(df).catalogo
 
 
 def obter_lista_municipios(df, uf):
@@ -56,8 +1291,8 @@ def obter_lista_municipios(df, uf):
         Lista de nomes de municípios ordenada
     """
     if uf and uf != "Todas":
-        municipios = df[df["sigla_uf"] == uf]["nome_municipio"].unique()
-        return sorted(municipios.tolist())
+        catalogo = catalogo_geografico(df)
+        return [catalogo.nome_por_codigo[cod] for cod in catalogo.municipios_por_uf.get(uf, ())]
     return []
 
 
@@ -72,25 +1307,21 @@ def obter_lista_ufs(df, regiao=None):
     Returns:
         Lista de siglas de UFs ordenada
     """
-    if regiao and regiao != "Brasil":
-        ufs = df[df["nome_grande_regiao"] == regiao]["sigla_uf"].unique()
-    else:
-        ufs = df["sigla_uf"].unique()
-    
-    return sorted(ufs.tolist())
+    return list(catalogo_geografico(df).ufs_por_regiao.get(regiao or "Brasil", ()))
 
 
 # ===============================
 # FUNÇÕES DE KPIs
 # ===============================
 
+@memorizar
 def calcular_kpis_municipio(df, municipio, ano):
     """
     Calcula KPIs para um município específico em um ano.
     
     Args:
         df: DataFrame base
-        municipio: Nome do município
+        municipio: Código IBGE ou nome do município
         ano: Ano de referência
     
     Returns:
@@ -98,32 +1329,19 @@ def calcular_kpis_municipio(df, municipio, ano):
     """
 
     ano2 = min(ano, 2021)  # Limitar ao máximo de 2021 para evitar dados inexistentes de VAB
-    # Dados do ano atual
-    dados_ano = df[(df["nome_municipio"] == municipio) & (df["ano"] == ano)]
+    cod = resolver_municipio(df, municipio)
 
-    dados_ano2 = df[(df["nome_municipio"] == municipio) & (df["ano"] == ano2)]
+    # Dados do ano atual
+    dados_ano = dados_municipio_ano(df, cod, ano)
     
-    if dados_ano.empty:
+    if dados_ano is None:
         return None
-    
-    dados_ano = dados_ano.iloc[0]
 
-    dados_ano2 = dados_ano2.iloc[0]
-    
-    # Dados do ano anterior para calcular crescimento
-    dados_ano_anterior = df[(df["nome_municipio"] == municipio) & (df["ano"] == ano - 1)]
+    dados_ano2 = dados_municipio_ano(df, cod, ano2)
     
-    crescimento = None
-    if not dados_ano_anterior.empty:
-        pib_anterior = dados_ano_anterior.iloc[0]["pib_total"]
-        crescimento = ((dados_ano["pib_total"] - pib_anterior) / pib_anterior) * 100
-
-    # Calcular crescimento pib per capita ano anterior
-    cresc_ppc = None
-    if not dados_ano_anterior.empty:
-        ppc_anterior = dados_ano_anterior.iloc[0]["pib_per_capita"]
-        cresc_ppc = ((dados_ano["pib_per_capita"] - ppc_anterior) / ppc_anterior) * 100
-
+    # Crescimento do PIB e do PIB per capita em relação ao ano anterior (painéis município × ano)
+    crescimento = _crescimento_entidade(df, "municipio", cod, ano - 1, ano)
+    cresc_ppc = _crescimento_entidade(df, "municipio", cod, ano - 1, ano, "pib_per_capita")
 
     # Calcular população (PIB total / PIB per capita)
     populacao = dados_ano["pib_total"] / dados_ano["pib_per_capita"] if dados_ano["pib_per_capita"] > 0 else 0
@@ -142,68 +1360,42 @@ def calcular_kpis_municipio(df, municipio, ano):
     }
 
 
+@memorizar
 def calcular_kpis_uf(df, uf, ano):
     """
     Calcula KPIs agregados para uma UF em um ano.
     """
-    dados_ano = df[(df["sigla_uf"] == uf) & (df["ano"] == ano)]
-    dados_ano_anterior = df[(df["sigla_uf"] == uf) & (df["ano"] == ano - 1)]
-    
-    if dados_ano.empty:
-        return None
-    
-    pib_total = dados_ano["pib_total"].sum()
-    pib_total_anterior = dados_ano_anterior["pib_total"].sum() if not dados_ano_anterior.empty else None
-    
-    # Calcular população total
-    populacao_total = (dados_ano["pib_total"] / dados_ano["pib_per_capita"]).sum() * 1000
-    populacao_total_anterior = (dados_ano_anterior["pib_total"] / dados_ano_anterior["pib_per_capita"]).sum() * 1000 if not dados_ano_anterior.empty else None
-    
-    # PIB per capita médio ponderado
-    pib_per_capita_medio = pib_total / (populacao_total / 1000) if populacao_total > 0 else 0
-    pib_per_capita_medio_anterior = pib_total_anterior / (populacao_total_anterior / 1000) if pib_total_anterior and populacao_total_anterior > 0 else None
-    
-    # Crescimento PIB total
-    crescimento = ((pib_total - pib_total_anterior) / pib_total_anterior) * 100 if pib_total_anterior else None
-    
-    # Crescimento PIB per capita
-    cresc_ppc = ((pib_per_capita_medio - pib_per_capita_medio_anterior) / pib_per_capita_medio_anterior) * 100 if pib_per_capita_medio_anterior else None
-    
-    # Número de municípios
-    num_municipios = dados_ano["nome_municipio"].nunique()
-    
-    return {
-        "pib_total": pib_total,
-        "populacao_total": int(populacao_total),
-        "pib_per_capita_medio": pib_per_capita_medio,
-        "crescimento_ano_anterior": crescimento,
-        "cresc_ppc_ano_anterior": cresc_ppc,  # ADICIONAR
-        "num_municipios": num_municipios
-    }
+    return _kpis_agregados(
+        totais_agregados(df, "uf", uf, ano),
+        totais_agregados(df, "uf", uf, ano - 1)
+    )
 
 
+@memorizar
 def calcular_kpis_agregado(df, regiao, ano):
     """
     Calcula KPIs agregados para região ou Brasil.
     """
-    if regiao == "Brasil":
-        dados_ano = df[df["ano"] == ano]
-        dados_ano_anterior = df[df["ano"] == ano - 1]
-    else:
-        dados_ano = df[(df["nome_grande_regiao"] == regiao) & (df["ano"] == ano)]
-        dados_ano_anterior = df[(df["nome_grande_regiao"] == regiao) & (df["ano"] == ano - 1)]
-    
-    if dados_ano.empty:
+    nivel = _nivel_regiao(regiao)
+    return _kpis_agregados(
+        totais_agregados(df, nivel, regiao, ano),
+        totais_agregados(df, nivel, regiao, ano - 1)
+    )
+
+
+def _kpis_agregados(totais, totais_anterior):
+    """Calcula os KPIs a partir dos totais do cubo no ano e no ano anterior."""
+    if totais is None:
         return None
     
-    pib_total = dados_ano["pib_total"].sum()
-    pib_total_anterior = dados_ano_anterior["pib_total"].sum() if not dados_ano_anterior.empty else None
+    pib_total = totais["pib_total"]
+    pib_total_anterior = totais_anterior["pib_total"] if totais_anterior else None
     
-    # Calcular população total
-    populacao_total = (dados_ano["pib_total"] / dados_ano["pib_per_capita"]).sum() * 1000
-    populacao_total_anterior = (dados_ano_anterior["pib_total"] / dados_ano_anterior["pib_per_capita"]).sum() * 1000 if not dados_ano_anterior.empty else None
+    # População total (derivada de PIB / PIB per capita)
+    populacao_total = totais["populacao"]
+    populacao_total_anterior = totais_anterior["populacao"] if totais_anterior else None
     
-    # PIB per capita médio
+    # PIB per capita médio ponderado
     pib_per_capita_medio = pib_total / (populacao_total / 1000) if populacao_total > 0 else 0
     pib_per_capita_medio_anterior = pib_total_anterior / (populacao_total_anterior / 1000) if pib_total_anterior and populacao_total_anterior > 0 else None
     
@@ -213,49 +1405,110 @@ def calcular_kpis_agregado(df, regiao, ano):
     # Crescimento PIB per capita
     cresc_ppc = ((pib_per_capita_medio - pib_per_capita_medio_anterior) / pib_per_capita_medio_anterior) * 100 if pib_per_capita_medio_anterior else None
     
-    # Número de municípios
-    num_municipios = dados_ano["nome_municipio"].nunique()
-    
     return {
         "pib_total": pib_total,
         "populacao_total": int(populacao_total),
         "pib_per_capita_medio": pib_per_capita_medio,
         "crescimento_ano_anterior": crescimento,
-        "cresc_ppc_ano_anterior": cresc_ppc,  # ADICIONAR
-        "num_municipios": num_municipios
+        "cresc_ppc_ano_anterior": cresc_ppc,
+        "num_municipios": int(totais["num_municipios"])
     }
 
 
+@memorizar
 def calcular_crescimento_periodo(df, entidade, entidade_col, ano_ini, ano_fim):
     """
     Calcula crescimento acumulado entre dois anos para município/UF.
     
     Args:
         df: DataFrame base
-        entidade: Nome do município ou UF
-        entidade_col: Nome da coluna ('nome_municipio' ou 'sigla_uf')
+        entidade: Município (nome ou código), UF ou região
+        entidade_col: Nome da coluna ('nome_municipio', 'cod_municipio', 'sigla_uf' ou 'nome_grande_regiao')
         ano_ini: Ano inicial
         ano_fim: Ano final
     
     Returns:
         Percentual de crescimento
     """
-    dados_ini = df[(df[entidade_col] == entidade) & (df["ano"] == ano_ini)]
-    dados_fim = df[(df[entidade_col] == entidade) & (df["ano"] == ano_fim)]
+    if entidade_col in ("nome_municipio", "cod_municipio"):
+        return _crescimento_entidade(df, "municipio", resolver_municipio(df, entidade), ano_ini, ano_fim)
+
+    nivel = "uf" if entidade_col == "sigla_uf" else _nivel_regiao(entidade)
+    return _crescimento_entidade(df, nivel, entidade, ano_ini, ano_fim)
+
+
+@memorizar
+def kpis_municipios(df, municipios, ano_ref, ano_ini, ano_fim):
+    """
+    Calcula os KPIs de vários municípios de uma vez, em colunas.
     
-    if dados_ini.empty or dados_fim.empty:
-        return None
+    Args:
+        df: DataFrame base
+        municipios: Lista de códigos IBGE dos municípios
+        ano_ref: Ano de referência (participações setoriais limitadas a 2021)
+        ano_ini: Ano inicial do crescimento do período
+        ano_fim: Ano final do crescimento do período
     
-    pib_ini = dados_ini["pib_total"].sum()
-    pib_fim = dados_fim["pib_total"].sum()
+    Returns:
+        DataFrame (uma linha por município com dados em ano_ref, na ordem recebida) com
+        cod_municipio, nome_municipio, sigla_uf, pib_total, pib_per_capita, populacao,
+        participações setoriais (%), dependencia_publica, setor_dominante,
+        crescimento_ano_anterior, cresc_ppc_ano_anterior e crescimento_periodo
+    """
+    indice = indexar(df)
+    codigos = list(dict.fromkeys(int(cod) for cod in municipios))
+    
+    def posicoes(ano):
+        return np.array([indice.linha_municipio.get((cod, ano), -1) for cod in codigos], dtype=np.int64)
+    
+    pos_ref = posicoes(ano_ref)
+    presentes = pos_ref >= 0
+    codigos = [cod for cod, presente in zip(codigos, presentes) if presente]
+    pos_ref = pos_ref[presentes]
+    
+    def valores(coluna, pos):
+        # NaN onde o município não tem linha no ano
+        selecionados = df[coluna].to_numpy()[np.maximum(pos, 0)].astype(float)
+        return np.where(pos >= 0, selecionados, np.nan)
+    
+    # Colunas montadas em um dict e convertidas em DataFrame uma única vez
+    tabela = {
+        coluna: df[coluna].iloc[pos_ref].reset_index(drop=True)
+        for coluna in ["cod_municipio", "nome_municipio", "sigla_uf", "pib_total", "pib_per_capita"]
+    }
+    pib = tabela["pib_total"].to_numpy(dtype=float)
+    ppc = tabela["pib_per_capita"].to_numpy(dtype=float)
     
-    return ((pib_fim - pib_ini) / pib_ini) * 100
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tabela["populacao"] = np.where(ppc > 0, pib / ppc * 1000, 0).astype(np.int64)
+        
+        # Participações setoriais no ano de VAB (0 quando não há VAB)
+        pos_vab = pos_ref if ano_ref <= 2021 else posicoes(2021)
+        vab_total = valores("vab_total", pos_vab)
+        for coluna, setor in zip(COLUNAS_VAB, NOMES_SETORES):
+            tabela[f"{setor} (%)"] = np.where(vab_total > 0, valores(coluna, pos_vab) / vab_total * 100, 0)
+        tabela["dependencia_publica"] = tabela["Administração Pública (%)"]
+        setor_dominante = np.full(len(pos_vab), None, dtype=object)
+        setor_dominante[pos_vab >= 0] = df["atividade_maior_vab"].iloc[pos_vab[pos_vab >= 0]].to_numpy(dtype=object)
+        tabela["setor_dominante"] = setor_dominante
+    
+    # Crescimento em relação ao ano anterior e no período (painéis município × ano)
+    tabela["crescimento_ano_anterior"] = crescimento_entre_anos(
+        df, "municipio", ano_ref - 1, ano_ref, entidades=codigos
+    ).to_numpy()
+    tabela["cresc_ppc_ano_anterior"] = crescimento_entre_anos(
+        df, "municipio", ano_ref - 1, ano_ref, "pib_per_capita", entidades=codigos
+    ).to_numpy()
+    tabela["crescimento_periodo"] = crescimento_entre_anos(df, "municipio", ano_ini, ano_fim, entidades=codigos).to_numpy()
+    
+    return pd.DataFrame(tabela)
 
 
 # ===============================
 # FUNÇÕES DE EVOLUÇÃO TEMPORAL
 # ===============================
 
+@memorizar
 def dados_evolucao_pib(df, regiao=None, uf=None, municipios=None, ano_ini=None, ano_fim=None):
     """
     Retorna dados de evolução do PIB ao longo do tempo.
@@ -271,36 +1524,43 @@ def dados_evolucao_pib(df, regiao=None, uf=None, municipios=None, ano_ini=None,
     Returns:
         DataFrame com evolução (ano, entidade, pib_total)
     """
-    df_filtrado = filtrar_dados(df, regiao=regiao, uf=uf, municipios=municipios, ano_ini=ano_ini, ano_fim=ano_fim)
-    
     if municipios:
         # Evolução por município
-        df_agrupado = df_filtrado.groupby(["ano", "nome_municipio"]).agg(
+        df_filtrado = filtrar_dados(df, regiao=regiao, uf=uf, municipios=municipios, ano_ini=ano_ini, ano_fim=ano_fim,
+                                    colunas=["ano", "nome_municipio", "pib_total"])
+        df_agrupado = df_filtrado.groupby(["ano", "nome_municipio"], observed=True).agg(
             pib_total=("pib_total", "sum")
         ).reset_index()
     elif uf and uf != "Todas":
         # Top 5 municípios da UF
-        top_municipios = df_filtrado[df_filtrado["ano"] == ano_fim].nlargest(5, "pib_total")["nome_municipio"].tolist()
-        df_top = df_filtrado[df_filtrado["nome_municipio"].isin(top_municipios)]
-        df_agrupado = df_top.groupby(["ano", "nome_municipio"]).agg(
+        top_municipios = dados_uf_ano(df, uf, ano_fim).nlargest(5, "pib_total")["cod_municipio"].tolist()
+        df_top = filtrar_dados(df, regiao=regiao, uf=uf, municipios=top_municipios, ano_ini=ano_ini, ano_fim=ano_fim,
+                               colunas=["ano", "nome_municipio", "pib_total"])
+        df_agrupado = df_top.groupby(["ano", "nome_municipio"], observed=True).agg(
             pib_total=("pib_total", "sum")
         ).reset_index()
     else:
+        # Totais por UF vêm do cubo de agregados
+        cubo_ufs = cubo_agregado(df, "uf", regiao=regiao)
+        if ano_ini and ano_fim:
+            cubo_ufs = cubo_ufs[(cubo_ufs["ano"] >= ano_ini) & (cubo_ufs["ano"] <= ano_fim)]
+        
+        pib_ano_fim = cubo_ufs[cubo_ufs["ano"] == ano_fim].set_index("entidade")["pib_total"]
         if regiao and regiao == "Brasil":
-            top_ufs_ano_fim = df_filtrado[df_filtrado["ano"] == ano_fim].groupby("sigla_uf")["pib_total"].sum().nlargest(5).index.tolist()
+            top_ufs_ano_fim = pib_ano_fim.nlargest(5).index.tolist()
         else:
             # se for região específica, pegar todas as UFs da região
-            top_ufs_ano_fim = df_filtrado[df_filtrado["ano"] == ano_fim].groupby("sigla_uf")["pib_total"].sum().index.tolist()
+            top_ufs_ano_fim = pib_ano_fim.index.tolist()
         
-        df_top_ufs = df_filtrado[df_filtrado["sigla_uf"].isin(top_ufs_ano_fim)]
-        df_agrupado = df_top_ufs.groupby(["ano", "sigla_uf"]).agg(
-            pib_total=("pib_total", "sum")
-        ).reset_index()
+        df_agrupado = cubo_ufs[cubo_ufs["entidade"].isin(top_ufs_ano_fim)]
+        df_agrupado = df_agrupado[["ano", "entidade", "pib_total"]].rename(columns={"entidade": "sigla_uf"})
+        df_agrupado = df_agrupado.sort_values(["ano", "sigla_uf"], ignore_index=True)
 
     
     return df_agrupado
 
 
+@memorizar
 def dados_evolucao_valor_adicionado(df, municipio=None, uf=None, regiao=None, ano_ini=None, ano_fim=None):
     """
     Retorna evolução do valor adicionado por setor ao longo do tempo.
@@ -322,16 +1582,29 @@ def dados_evolucao_valor_adicionado(df, municipio=None, uf=None, regiao=None, an
     if ano_fim and ano_fim > 2021:
         ano_fim = 2021
 
-    df_filtrado = filtrar_dados(df, regiao=regiao, uf=uf, municipios=[municipio] if municipio else None, 
-                                 ano_ini=ano_ini, ano_fim=ano_fim)
-
-    
-    df_agrupado = df_filtrado.groupby("ano").agg({
-        "vab_agropecuaria": "sum",
-        "vab_industria": "sum",
-        "vab_servicos": "sum",
-        "vab_adm_defesa_educacao_saude": "sum"
-    }).reset_index()
+    if municipio:
+        df_filtrado = filtrar_dados(df, regiao=regiao, uf=uf, municipios=[municipio],
+                                    ano_ini=ano_ini, ano_fim=ano_fim, colunas=["ano", *COLUNAS_VAB])
+        
+        df_agrupado = df_filtrado.groupby("ano").agg({
+            "vab_agropecuaria": "sum",
+            "vab_industria": "sum",
+            "vab_servicos": "sum",
+            "vab_adm_defesa_educacao_saude": "sum"
+        }).reset_index()
+    else:
+        # UF, região ou Brasil: somas anuais já estão no cubo
+        if uf and uf != "Todas":
+            nivel, entidade = "uf", uf
+        elif regiao and regiao != "Brasil":
+            nivel, entidade = "regiao", regiao
+        else:
+            nivel, entidade = "brasil", "Brasil"
+        
+        df_agrupado = cubo_agregado(df, nivel, [entidade])
+        if ano_ini and ano_fim:
+            df_agrupado = df_agrupado[(df_agrupado["ano"] >= ano_ini) & (df_agrupado["ano"] <= ano_fim)]
+        df_agrupado = df_agrupado[["ano", *COLUNAS_VAB]].reset_index(drop=True)
     
     # Renomear colunas para visualização
     df_agrupado = df_agrupado.rename(columns={
@@ -348,6 +1621,88 @@ def dados_evolucao_valor_adicionado(df, municipio=None, uf=None, regiao=None, an
 # FUNÇÕES DE RANKING
 # ===============================
 
+def posicao_ranking(df, municipio, ano, metrica="pib_total", nacional=False, uf=None):
+    """
+    Retorna a posição de um município no ranking de uma métrica.
+    
+    Args:
+        df: DataFrame base
+        municipio: Código IBGE ou nome do município
+        ano: Ano de referência
+        metrica: Uma das METRICAS_RANKING (padrão: pib_total)
+        nacional: Se True, posição entre todos os municípios do Brasil (padrão: na UF)
+        uf: Sigla da UF para desambiguar nomes (opcional)
+    
+    Returns:
+        Dict com posicao (1 = maior valor) e total de municípios ranqueados, ou None se não houver dados
+    """
+    indice, tabelas = _tabela_ranking(df, metrica)
+    cod = resolver_municipio(df, municipio, uf)
+    posicao = indice.linha_municipio.get((cod, ano))
+    if posicao is None:
+        return None
+
+    _, _, fatias, posicao_na_ordem = tabelas["brasil" if nacional else "uf"]
+    fatia = fatias[ano if nacional else (indice.uf_por_codigo[cod], ano)]
+    na_ordem = posicao_na_ordem[posicao]
+    if not fatia.start <= na_ordem < fatia.stop:
+        return None
+    return {"posicao": int(na_ordem - fatia.start) + 1, "total": fatia.stop - fatia.start}
+
+
+def posicoes_ranking(df, municipio, ano, uf=None):
+    """
+    Retorna as posições de um município nos rankings de todas as métricas, na UF e no Brasil.
+    
+    Returns:
+        Dict (metrica, 'uf' ou 'brasil') -> dict de posicao_ranking (ou None)
+    """
+    return {
+        (metrica, escopo): posicao_ranking(df, municipio, ano, metrica, nacional=escopo == "brasil", uf=uf)
+        for metrica in METRICAS_RANKING for escopo in ("uf", "brasil")
+    }
+
+
+def pagina_ranking(df, ano, metrica="pib_total", uf=None, posicao_ini=1, posicao_fim=10):
+    """
+    Retorna um trecho do ranking de municípios de uma métrica.
+    
+    Posições negativas contam a partir do fim, como em listas Python:
+    posicao_ini=-10, posicao_fim=-1 retorna os 10 últimos.
+    
+    Args:
+        df: DataFrame base
+        ano: Ano de referência
+        metrica: Uma das METRICAS_RANKING (padrão: pib_total)
+        uf: Sigla da UF (opcional; padrão: ranking nacional)
+        posicao_ini: Primeira posição (1 = maior valor)
+        posicao_fim: Última posição (inclusive)
+    
+    Returns:
+        DataFrame com Posição, cod_municipio, Município, UF e o valor da métrica
+    """
+    _, tabelas = _tabela_ranking(df, metrica)
+    ordem, valores, fatias, _ = tabelas["uf" if uf and uf != "Todas" else "brasil"]
+    fatia = fatias.get((uf, ano) if uf and uf != "Todas" else ano, slice(0, 0))
+    total = fatia.stop - fatia.start
+
+    # Posições de 1 a total (negativas contadas a partir do fim)
+    ini = posicao_ini + total + 1 if posicao_ini < 0 else posicao_ini
+    fim = posicao_fim + total + 1 if posicao_fim < 0 else posicao_fim
+    ini, fim = max(ini, 1), min(fim, total)
+    trecho = slice(fatia.start + ini - 1, fatia.start + max(fim, ini - 1))
+
+    posicoes = ordem[trecho]
+    return pd.DataFrame({
+        "Posição": np.arange(ini, ini + len(posicoes)),
+        "cod_municipio": df["cod_municipio"].to_numpy()[posicoes],
+        "Município": df["nome_municipio"].iloc[posicoes].to_numpy(),
+        "UF": df["sigla_uf"].iloc[posicoes].to_numpy(),
+        metrica: valores[trecho]
+    })
+
+
+@memorizar
 def ranking_municipios_pib(df, uf, ano, top_n=10):
     """
     Retorna ranking de municípios por PIB total.
@@ -361,16 +1716,15 @@ def ranking_municipios_pib(df, uf, ano, top_n=10):
     Returns:
         DataFrame com ranking
     """
-    dados = df[(df["sigla_uf"] == uf) & (df["ano"] == ano)]
-    ranking = dados.nlargest(top_n, "pib_total")[["nome_municipio", "pib_total"]].copy()
-    ranking["pib_total_mi"] = ranking["pib_total"] / 1000  # Converter para milhões
+    ranking = _topo_ranking(df, uf, ano, "pib_total", top_n)
     
-    return ranking[["nome_municipio", "pib_total_mi"]].rename(columns={
-        "nome_municipio": "Município",
-        "pib_total_mi": "PIB Total (R$ mi)"
+    return pd.DataFrame({
+        "Município": ranking["nome_municipio"],
+        "PIB Total (R$ mi)": ranking["pib_total"] / 1000  # Converter para milhões
     })
 
 
+@memorizar
 def ranking_municipios_per_capita(df, uf, ano, top_n=10):
     """
     Retorna ranking de municípios por PIB per capita.
@@ -384,15 +1738,24 @@ def ranking_municipios_per_capita(df, uf, ano, top_n=10):
     Returns:
         DataFrame com ranking
     """
-    dados = df[(df["sigla_uf"] == uf) & (df["ano"] == ano)]
-    ranking = dados.nlargest(top_n, "pib_per_capita")[["nome_municipio", "pib_per_capita"]].copy()
+    ranking = _topo_ranking(df, uf, ano, "pib_per_capita", top_n)
     
-    return ranking.rename(columns={
-        "nome_municipio": "Município",
-        "pib_per_capita": "PIB per capita (R$)"
+    return pd.DataFrame({
+        "Município": ranking["nome_municipio"],
+        "PIB per capita (R$)": ranking["pib_per_capita"]
     })
 
 
+def _topo_ranking(df, uf, ano, metrica, top_n):
+    """Nome e métrica dos top_n municípios da UF (tabela de ranking do índice)."""
+    _, tabelas = _tabela_ranking(df, metrica)
+    ordem, _, fatias, _ = tabelas["uf"]
+    fatia = fatias.get((uf, ano), slice(0, 0))
+    posicoes = ordem[fatia.start:min(fatia.stop, fatia.start + top_n)]
+    return {coluna: df[coluna].iloc[posicoes] for coluna in ["nome_municipio", metrica]}
+
+
+@memorizar
 def ranking_ufs(df, ano, regiao=None, top_n=None):
     """
     Retorna ranking de UFs por PIB total.
@@ -406,15 +1769,7 @@ def ranking_ufs(df, ano, regiao=None, top_n=None):
     Returns:
         DataFrame com ranking
     """
-    if regiao and regiao != "Brasil":
-        dados = df[(df["ano"] == ano) & (df["nome_grande_regiao"] == regiao)]
-    else:
-        dados = df[df["ano"] == ano]
-    
-    ranking = dados.groupby("sigla_uf").agg({
-        "pib_total": "sum",
-        "nome_municipio": "nunique"
-    }).reset_index()
+    ranking = cubo_agregado(df, "uf", ano_ini=ano, regiao=regiao)
     
     ranking["pib_total_bi"] = ranking["pib_total"] / 1_000_000  # Converter para bilhões
     ranking = ranking.sort_values("pib_total_bi", ascending=False)
@@ -422,13 +1777,14 @@ def ranking_ufs(df, ano, regiao=None, top_n=None):
     if top_n:
         ranking = ranking.head(top_n)
     
-    return ranking[["sigla_uf", "pib_total_bi", "nome_municipio"]].rename(columns={
-        "sigla_uf": "UF",
+    return ranking[["entidade", "pib_total_bi", "num_municipios"]].rename(columns={
+        "entidade": "UF",
         "pib_total_bi": "PIB Total (R$ bi)",
-        "nome_municipio": "Nº Municípios"
+        "num_municipios": "Nº Municípios"
     })
 
 
+@memorizar
 def ranking_ufs_per_capita(df, ano, regiao=None, top_n=None):
     """
     Retorna ranking de UFs por PIB per capita médio.
@@ -442,16 +1798,10 @@ def ranking_ufs_per_capita(df, ano, regiao=None, top_n=None):
     Returns:
         DataFrame com ranking
     """
-    if regiao and regiao != "Brasil":
-        dados = df[(df["ano"] == ano) & (df["nome_grande_regiao"] == regiao)]
-    else:
-        dados = df[df["ano"] == ano]
-    
-    # Calcular PIB per capita ponderado
-    ranking = dados.groupby("sigla_uf").apply(
-        lambda x: (x["pib_total"].sum() / ((x["pib_total"] / x["pib_per_capita"]).sum()))
-    ).reset_index()
+    # PIB per capita ponderado (PIB total / população total da UF)
+    ranking = cubo_agregado(df, "uf", ano_ini=ano, regiao=regiao)
     
+    ranking = ranking[["entidade", "pib_per_capita"]]
     ranking.columns = ["UF", "PIB per capita (R$)"]
     ranking = ranking.sort_values("PIB per capita (R$)", ascending=False)
     
@@ -465,25 +1815,24 @@ def ranking_ufs_per_capita(df, ano, regiao=None, top_n=None):
 # FUNÇÕES DE COMPOSIÇÃO SETORIAL
 # ===============================
 
+@memorizar
 def composicao_setorial_municipio(df, municipio, ano):
     """
     Retorna composição setorial de um município.
     
     Args:
         df: DataFrame base
-        municipio: Nome do município
+        municipio: Código IBGE ou nome do município
         ano: Ano de referência
     
     Returns:
         DataFrame com participação por setor
     """
-    dados = df[(df["nome_municipio"] == municipio) & (df["ano"] == ano)]
+    dados = dados_municipio_ano(df, municipio, ano)
     
-    if dados.empty:
+    if dados is None:
         return None
     
-    dados = dados.iloc[0]
-    
     composicao = pd.DataFrame({
         "Setor": ["Agropecuária", "Indústria", "Serviços", "Administração Pública"],
         "Valor": [
@@ -499,6 +1848,7 @@ def composicao_setorial_municipio(df, municipio, ano):
     return composicao[["Setor", "Participação (%)"]]
 
 
+@memorizar
 def composicao_setorial_uf(df, uf, ano):
     """
     Retorna composição setorial média de uma UF.
@@ -511,25 +1861,10 @@ def composicao_setorial_uf(df, uf, ano):
     Returns:
         DataFrame com participação por setor
     """
-    dados = df[(df["sigla_uf"] == uf) & (df["ano"] == ano)]
-    
-    total_vab = dados[["vab_agropecuaria", "vab_industria", "vab_servicos", "vab_adm_defesa_educacao_saude"]].sum()
-    
-    composicao = pd.DataFrame({
-        "Setor": ["Agropecuária", "Indústria", "Serviços", "Administração Pública"],
-        "Valor": [
-            total_vab["vab_agropecuaria"],
-            total_vab["vab_industria"],
-            total_vab["vab_servicos"],
-            total_vab["vab_adm_defesa_educacao_saude"]
-        ]
-    })
-    
-    composicao["Participação (%)"] = (composicao["Valor"] / composicao["Valor"].sum()) * 100
-    
-    return composicao[["Setor", "Participação (%)"]]
+    return _composicao_totais(totais_agregados(df, "uf", uf, ano))
 
 
+@memorizar
 def composicao_setorial_agregado(df, regiao, ano):
     """
     Retorna composição setorial de região ou Brasil.
@@ -542,21 +1877,124 @@ def composicao_setorial_agregado(df, regiao, ano):
     Returns:
         DataFrame com participação por setor
     """
-    if regiao == "Brasil":
-        dados = df[df["ano"] == ano]
-    else:
-        dados = df[(df["nome_grande_regiao"] == regiao) & (df["ano"] == ano)]
-    
-    total_vab = dados[["vab_agropecuaria", "vab_industria", "vab_servicos", "vab_adm_defesa_educacao_saude"]].sum()
+    return _composicao_totais(totais_agregados(df, _nivel_regiao(regiao), regiao, ano))
+
+
+@memorizar
+def composicao_setorial(df, nivel, entidades, ano):
+    """
+    Retorna a composição setorial de várias entidades de um nível em um ano.
+
+    Todas as entidades saem de uma única leitura da tabela setorial do nível
+    (ver tabela_setorial), sem uma consulta por entidade.
+
+    Args:
+        df: DataFrame base
+        nivel: 'municipio', 'uf', 'regiao' ou 'brasil'
+        entidades: Códigos IBGE, siglas de UFs ou nomes de regiões
+        ano: Ano de referência
+
+    Returns:
+        DataFrame com colunas entidade, Setor, Valor (R$ 1.000) e Participação (%),
+        quatro linhas por entidade na ordem pedida (entidades sem dados ficam de fora)
+    """
+    composicao = tabela_setorial(df, nivel, entidades, ano, ano)
+    return composicao[["entidade", "Setor", "Valor", "Participação (%)"]]
+
+
+def tabela_setorial(df, nivel, entidades=None, ano_ini=None, ano_fim=None):
+    """
+    Retorna a composição setorial de várias entidades e anos em formato longo.
+
+    A tabela longa de cada nível é montada uma vez por versão da base, com
+    quatro linhas (uma por setor) para cada linha da origem (base para
+    municípios, cubo para os demais níveis), na mesma ordem. A consulta é
+    uma única seleção de posições dessa tabela.
+
+    Args:
+        df: DataFrame base
+        nivel: 'municipio', 'uf', 'regiao' ou 'brasil'
+        entidades: Códigos IBGE, UFs ou regiões (opcional; padrão: todas)
+        ano_ini: Primeiro ano (opcional)
+        ano_fim: Último ano (opcional)
+
+    Returns:
+        DataFrame com colunas entidade, ano, Setor, Valor (R$ 1.000) e
+        Participação (%), ordenado por entidade (na ordem pedida), ano e setor;
+        entidades e anos sem dados ficam de fora
+    """
+    if nivel not in NIVEIS_PAINEL:
+        raise ValueError(f"Nível inválido: {nivel!r} (use um de {NIVEIS_PAINEL})")
+
+    indice = indexar(df)
+    painel = indice.paineis[nivel]
+    tabela = indice.setores.get(nivel)
+    if tabela is None:
+        if nivel == "municipio":
+            tabela = _tabela_setorial(df["cod_municipio"].to_numpy(), df["ano"].to_numpy(), df[COLUNAS_VAB].to_numpy())
+        else:
+            cubo = indice.cubo[nivel]
+            tabela = _tabela_setorial(
+                cubo["entidade"].to_numpy(dtype=object), cubo["ano"].to_numpy(), cubo[COLUNAS_VAB].to_numpy()
+            )
+        tabela = somente_leitura(tabela)
+        indice.setores[nivel] = tabela
+
+    origem = painel.linhas_origem()
+    if entidades is not None:
+        posicoes = np.array([painel.posicao.get(entidade, -1) for entidade in entidades], dtype=np.int64)
+        origem = np.where(posicoes[:, None] >= 0, origem[np.maximum(posicoes, 0)], -1)
+    anos = painel.anos
+    colunas = (anos >= (anos[0] if ano_ini is None else ano_ini)) & (anos <= (anos[-1] if ano_fim is None else ano_fim))
+    linhas = origem[:, colunas].ravel()
+    linhas = linhas[linhas >= 0]
+
+    setores = len(COLUNAS_VAB)
+    posicoes_tabela = (linhas[:, None] * setores + np.arange(setores)).ravel()
+    return tabela.take(posicoes_tabela).reset_index(drop=True)
+
+
+def _tabela_setorial(entidades, anos, valores):
+    """
+    Monta a tabela longa de composição setorial: quatro linhas (setores na
+    ordem de NOMES_SETORES) para cada linha de `valores` (colunas COLUNAS_VAB).
+    """
+    valores = np.asarray(valores, dtype="float64")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        participacao = (valores / np.nansum(valores, axis=1, keepdims=True)) * 100
+    setores = len(COLUNAS_VAB)
+    return pd.DataFrame({
+        "entidade": np.repeat(entidades, setores),
+        "ano": np.repeat(anos, setores),
+        "Setor": pd.Categorical.from_codes(np.tile(np.arange(setores), len(valores)), categories=NOMES_SETORES),
+        "Valor": valores.ravel(),
+        "Participação (%)": participacao.ravel()
+    })
+
+
+def _tabela_setorial_linhas(linhas, entidades=None):
+    """
+    tabela_setorial a partir de linhas já filtradas com entidade, ano e
+    COLUNAS_VAB (usada pelos backends DuckDB e Polars): entidades na ordem
+    pedida (ou ordenadas, sem lista), depois ano.
+    """
+    if entidades is None:
+        entidades = sorted(linhas["entidade"].unique().tolist())
+    ordem = pd.DataFrame({"entidade": list(entidades), "_ordem": range(len(entidades))})
+    linhas = ordem.merge(linhas, on="entidade").sort_values(["_ordem", "ano"], kind="stable")
+    return _tabela_setorial(
+        linhas["entidade"].to_numpy(dtype=object), linhas["ano"].to_numpy(), linhas[COLUNAS_VAB].to_numpy()
+    )
+
+
+def _composicao_totais(totais):
+    """Monta a composição setorial a partir dos totais do cubo."""
+    if totais is None:
+        return None
     
     composicao = pd.DataFrame({
-        "Setor": ["Agropecuária", "Indústria", "Serviços", "Administração Pública"],
-        "Valor": [
-            total_vab["vab_agropecuaria"],
-            total_vab["vab_industria"],
-            total_vab["vab_servicos"],
-            total_vab["vab_adm_defesa_educacao_saude"]
-        ]
+        "Setor": NOMES_SETORES,
+        "Valor": [totais[col] for col in COLUNAS_VAB]
     })
     
     composicao["Participação (%)"] = (composicao["Valor"] / composicao["Valor"].sum()) * 100
@@ -568,59 +2006,46 @@ def composicao_setorial_agregado(df, regiao, ano):
 # FUNÇÕES PARA SCATTER/ANÁLISES
 # ===============================
 
-def scatter_pib_vs_per_capita(df, uf, municipio, ano):
+@memorizar
+def scatter_pib_vs_per_capita(df, uf, municipio, ano, k=10, nacional=False):
     """
     Retorna dados para scatter PIB total vs PIB per capita.
-    Retorna o município de referência + 10 municípios com população mais próxima.
+    Retorna o município de referência + k municípios com população mais próxima.
     
     Args:
         df: DataFrame base
         uf: Sigla da UF
-        municipio: Nome do município
+        municipio: Código IBGE ou nome do município
         ano: Ano de referência
+        k: Número de municípios comparados (padrão: 10)
+        nacional: Se True, compara com municípios de todo o Brasil (padrão: da UF)
     
     Returns:
         DataFrame pronto para scatter plot
     """
-    dados = df[(df["sigla_uf"] == uf) & (df["ano"] == ano)].copy()
-    
-    # Calcular população
-    dados["Populacao"] = (dados["pib_total"] / dados["pib_per_capita"]) * 1000
+    # Município de referência + k mais próximos em população (ordenação pré-calculada do índice)
+    municipios_proximos = municipios_populacao_proxima(df, municipio, ano, k=k, uf=uf, nacional=nacional)
     
-    # Obter população do município de referência
-    municipio_ref = dados[dados["nome_municipio"] == municipio]
-    
-    if municipio_ref.empty:
+    if municipios_proximos.empty:
         return pd.DataFrame()
     
-    pop_referencia = municipio_ref.iloc[0]["Populacao"]
-    
-    # Calcular diferença absoluta de população
-    dados["Diferenca_Pop"] = (dados["Populacao"] - pop_referencia).abs()
-    
-    # Pegar município de referência + 10 mais próximos
-    municipios_proximos = dados.nsmallest(11, "Diferenca_Pop")
-    
-    # Calcular dependência pública
-    municipios_proximos["Dependência Pública (%)"] = (
-        municipios_proximos["vab_adm_defesa_educacao_saude"] / municipios_proximos["vab_total"]
-    ) * 100
-    
-    municipios_proximos["PIB Total (R$ mi)"] = municipios_proximos["pib_total"] / 1000
-    
-    # Adicionar coluna para destacar o município de referência
-    municipios_proximos["É Referência"] = municipios_proximos["nome_municipio"] == municipio
-    
-    return municipios_proximos[[
-        "nome_municipio", "PIB Total (R$ mi)", "pib_per_capita", 
-        "Dependência Pública (%)", "Populacao", "É Referência"
-    ]].rename(columns={
-        "nome_municipio": "Município",
-        "pib_per_capita": "PIB per capita (R$)",
-        "Populacao": "População"
+    cod = municipios_proximos["cod_municipio"].iloc[0]
+    
+    return pd.DataFrame({
+        "Município": municipios_proximos["nome_municipio"],
+        "PIB Total (R$ mi)": municipios_proximos["pib_total"] / 1000,
+        "PIB per capita (R$)": municipios_proximos["pib_per_capita"],
+        # Dependência pública
+        "Dependência Pública (%)": (
+            municipios_proximos["vab_adm_defesa_educacao_saude"] / municipios_proximos["vab_total"]
+        ) * 100,
+        "População": (municipios_proximos["pib_total"] / municipios_proximos["pib_per_capita"]) * 1000,
+        # Destaca o município de referência
+        "É Referência": municipios_proximos["cod_municipio"] == cod
     })
 
 
+@memorizar
 def scatter_ufs_pib_vs_per_capita(df, ano, regiao=None):
     """
     Retorna dados para scatter de UFs (PIB total vs PIB per capita).
@@ -633,20 +2058,14 @@ def scatter_ufs_pib_vs_per_capita(df, ano, regiao=None):
     Returns:
         DataFrame pronto para scatter plot
     """
-    if regiao and regiao != "Brasil":
-        dados = df[(df["ano"] == ano) & (df["nome_grande_regiao"] == regiao)]
-    else:
-        dados = df[df["ano"] == ano]
-    
-    scatter_data = dados.groupby("sigla_uf").apply(
-        lambda x: pd.Series({
-            "PIB Total (R$ bi)": x["pib_total"].sum() / 1_000_000,
-            "PIB per capita (R$)": x["pib_total"].sum() / ((x["pib_total"] / x["pib_per_capita"]).sum()),
-            "Nº Municípios": x["nome_municipio"].nunique()
-        })
-    ).reset_index()
+    dados = cubo_agregado(df, "uf", ano_ini=ano, regiao=regiao)
     
-    scatter_data = scatter_data.rename(columns={"sigla_uf": "UF"})
+    scatter_data = pd.DataFrame({
+        "UF": dados["entidade"],
+        "PIB Total (R$ bi)": dados["pib_total"] / 1_000_000,
+        "PIB per capita (R$)": dados["pib_per_capita"],
+        "Nº Municípios": dados["num_municipios"]
+    })
     
     return scatter_data
 
@@ -655,6 +2074,7 @@ def scatter_ufs_pib_vs_per_capita(df, ano, regiao=None):
 # FUNÇÕES PARA TABELAS CONSOLIDADAS
 # ===============================
 
+@memorizar
 def tabela_municipios_completa(df, uf, ano, ano_ini):
     """
     Retorna tabela consolidada de todos os municípios da UF.
@@ -668,40 +2088,26 @@ def tabela_municipios_completa(df, uf, ano, ano_ini):
     Returns:
         DataFrame com tabela completa
     """
-    dados_ano = df[(df["sigla_uf"] == uf) & (df["ano"] == ano)].copy()
-    dados_ano_ini = df[(df["sigla_uf"] == uf) & (df["ano"] == ano_ini)]
+    dados_ano = dados_uf_ano(df, uf, ano)
     
-    # Calcular crescimento
-    crescimento_map = {}
-    for _, row in dados_ano_ini.iterrows():
-        municipio = row["nome_municipio"]
-        pib_ini = row["pib_total"]
-        dados_fim = dados_ano[dados_ano["nome_municipio"] == municipio]
-        if not dados_fim.empty:
-            pib_fim = dados_fim.iloc[0]["pib_total"]
-            crescimento_map[municipio] = ((pib_fim - pib_ini) / pib_ini) * 100
-    
-    dados_ano["Crescimento"] = dados_ano["nome_municipio"].map(crescimento_map)
-    dados_ano["População"] = ((dados_ano["pib_total"] / dados_ano["pib_per_capita"]) * 1000).astype(int)
-    dados_ano["PIB Total (R$ mi)"] = dados_ano["pib_total"] / 1000
+    # Calcular crescimento (painel município × ano, alinhado pelo código do município)
+    crescimento = crescimento_entre_anos(
+        df, "municipio", ano_ini, ano, entidades=dados_ano["cod_municipio"].tolist()
+    ).set_axis(dados_ano.index)
     
     # Calcular percentuais setoriais
-    dados_ano["Agropecuária (%)"] = (dados_ano["vab_agropecuaria"] / dados_ano["vab_total"]) * 100
-    dados_ano["Indústria (%)"] = (dados_ano["vab_industria"] / dados_ano["vab_total"]) * 100
-    dados_ano["Serviços (%)"] = (dados_ano["vab_servicos"] / dados_ano["vab_total"]) * 100
-    dados_ano["Adm. Pública (%)"] = (dados_ano["vab_adm_defesa_educacao_saude"] / dados_ano["vab_total"]) * 100
-    
-    tabela = dados_ano[[
-        "nome_municipio", "População", "PIB Total (R$ mi)", "pib_per_capita",
-        "Agropecuária (%)", "Indústria (%)", "Serviços (%)", "Adm. Pública (%)",
-        "Crescimento", "atividade_maior_vab"
-    ]].copy()
-    
-    tabela["Crescimento"] = tabela["Crescimento"].apply(lambda x: f"{x:.1f}%" if pd.notna(x) else "N/A")
-    tabela["Agropecuária (%)"] = tabela["Agropecuária (%)"].round(1)
-    tabela["Indústria (%)"] = tabela["Indústria (%)"].round(1)
-    tabela["Serviços (%)"] = tabela["Serviços (%)"].round(1)
-    tabela["Adm. Pública (%)"] = tabela["Adm. Pública (%)"].round(1)
+    percentuais = dados_ano[COLUNAS_VAB].div(dados_ano["vab_total"], axis=0) * 100
+    percentuais.columns = ["Agropecuária (%)", "Indústria (%)", "Serviços (%)", "Adm. Pública (%)"]
+    
+    tabela = pd.concat([
+        dados_ano["nome_municipio"],
+        ((dados_ano["pib_total"] / dados_ano["pib_per_capita"]) * 1000).astype(int).rename("População"),
+        (dados_ano["pib_total"] / 1000).rename("PIB Total (R$ mi)"),
+        dados_ano["pib_per_capita"],
+        percentuais.round(1),
+        crescimento.map(lambda x: f"{x:.1f}%" if pd.notna(x) else "N/A").rename("Crescimento"),
+        dados_ano["atividade_maior_vab"]
+    ], axis=1)
     
     tabela = tabela.rename(columns={
         "nome_municipio": "Município",
@@ -713,6 +2119,7 @@ def tabela_municipios_completa(df, uf, ano, ano_ini):
     return tabela.sort_values("PIB Total (R$ mi)", ascending=False)
 
 
+@memorizar
 def tabela_ufs_completa(df, ano, ano_ini, regiao=None):
     """
     Retorna tabela consolidada de UFs.
@@ -726,37 +2133,24 @@ def tabela_ufs_completa(df, ano, ano_ini, regiao=None):
     Returns:
         DataFrame com tabela completa
     """
-    if regiao and regiao != "Brasil":
-        dados_ano = df[(df["ano"] == ano) & (df["nome_grande_regiao"] == regiao)]
-        dados_ano_ini = df[(df["ano"] == ano_ini) & (df["nome_grande_regiao"] == regiao)]
-    else:
-        dados_ano = df[df["ano"] == ano]
-        dados_ano_ini = df[df["ano"] == ano_ini]
-    
-    # Agregar por UF
-    tabela = dados_ano.groupby("sigla_uf").apply(
-        lambda x: pd.Series({
-            "Nº Municípios": x["nome_municipio"].nunique(),
-            "População": int((x["pib_total"].sum() / (x["pib_total"] / x["pib_per_capita"]).sum()) * 1000),
-            "PIB Total (R$ bi)": x["pib_total"].sum() / 1_000_000,
-            "PIB per capita (R$)": x["pib_total"].sum() / ((x["pib_total"] / x["pib_per_capita"]).sum()),
-            "Agropecuária (%)": (x["vab_agropecuaria"].sum() / x["vab_total"].sum()) * 100 if x["vab_total"].sum() > 0 else 0,
-            "Indústria (%)": (x["vab_industria"].sum() / x["vab_total"].sum()) * 100 if x["vab_total"].sum() > 0 else 0,
-            "Serviços (%)": (x["vab_servicos"].sum() / x["vab_total"].sum()) * 100 if x["vab_total"].sum() > 0 else 0,
-            "Adm. Pública (%)": (x["vab_adm_defesa_educacao_saude"].sum() / x["vab_total"].sum()) * 100 if x["vab_total"].sum() > 0 else 0,
-            "Setor Dominante": x.groupby("atividade_maior_vab")["pib_total"].sum().idxmax()
-        })
-    ).reset_index()
+    dados_ano = cubo_agregado(df, "uf", ano_ini=ano, regiao=regiao)
+    
+    # Participações setoriais (0 quando não há VAB no ano)
+    percentuais = dados_ano[[f"{setor} (%)" for setor in NOMES_SETORES]].where(dados_ano["vab_total"] > 0, 0)
+    percentuais.columns = ["Agropecuária (%)", "Indústria (%)", "Serviços (%)", "Adm. Pública (%)"]
+    
+    tabela = pd.concat([
+        dados_ano[["entidade", "num_municipios", "populacao"]],
+        (dados_ano["pib_total"] / 1_000_000).rename("PIB Total (R$ bi)"),
+        dados_ano["pib_per_capita"].rename("PIB per capita (R$)"),
+        percentuais,
+        dados_ano["setor_dominante"].rename("Setor Dominante")
+    ], axis=1).rename(columns={"num_municipios": "Nº Municípios", "populacao": "População"})
     
     # Calcular crescimento
-    crescimento_map = {}
-    for uf in tabela["sigla_uf"].unique():
-        pib_ini = dados_ano_ini[dados_ano_ini["sigla_uf"] == uf]["pib_total"].sum()
-        pib_fim = dados_ano[dados_ano["sigla_uf"] == uf]["pib_total"].sum()
-        if pib_ini > 0:
-            crescimento_map[uf] = ((pib_fim - pib_ini) / pib_ini) * 100
-    
-    tabela["Crescimento"] = tabela["sigla_uf"].map(crescimento_map)
+    tabela["Crescimento"] = crescimento_entre_anos(
+        df, "uf", ano_ini, ano, entidades=tabela["entidade"].tolist()
+    ).set_axis(tabela.index)
     tabela["Crescimento"] = tabela["Crescimento"].apply(lambda x: f"{x:.1f}%" if pd.notna(x) else "N/A")
     tabela["Agropecuária (%)"] = tabela["Agropecuária (%)"].round(1)
     tabela["Indústria (%)"] = tabela["Indústria (%)"].round(1)
@@ -765,8 +2159,41 @@ def tabela_ufs_completa(df, ano, ano_ini, regiao=None):
     tabela["População"] = tabela["População"].apply(lambda x: f"{int(x):,}".replace(",", "."))
     
     tabela = tabela.rename(columns={
-        "sigla_uf": "UF",
+        "entidade": "UF",
         "Crescimento": f"Crescimento {ano_ini}–{ano}"
     })
     
-    return tabela.sort_values("PIB Total (R$ bi)", ascending=False)
\ No newline at end of file
+    return tabela.sort_values("PIB Total (R$ bi)", ascending=False)
+
+
+# ===============================
+# BACKEND
+# ===============================
+
+# Com PIB_BACKEND=duckdb ou polars, as funções de acesso aos dados passam a consultar o parquet
+if BACKEND == "duckdb":
+    import backend_duckdb
+    backend_duckdb.instalar(globals())
+elif BACKEND == "polars":
+    import backend_polars
+    backend_polars.instalar(globals())
+elif BACKEND != "pandas":
+    raise ValueError(f"PIB_BACKEND inválido: {BACKEND!r} (use 'pandas', 'duckdb' ou 'polars')")
+
+
+# ===============================
+# INSTRUMENTAÇÃO
+# ===============================
+
+# Chamadas, tempo e tamanho do resultado de cada função pública (PIB_INSTRUMENTACAO=0 desativa)
+instrumentar_modulo(globals())
+
+if __name__ == "__main__":
+    # Relatório de memória do esquema compacto: python data.py
+    base_original = pd.read_parquet(ARQUIVO_DADOS)
+    pd.set_option("display.width", 140)
+    pd.set_option("display.max_columns", None)
+    print("Esquema compacto:")
+    print(relatorio_memoria(base_original, compactar_base(base_original)).round(2))
+    print("\nEsquema compacto com float32:")
+    print(relatorio_memoria(base_original, compactar_base(base_original, float32=True)).round(2))
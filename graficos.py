@@ -0,0 +1,503 @@
+import plotly.express as px
+
+from data import (
+    COLUNAS_VAB, filtrar_dados, dados_uf_ano, cubo_agregado, catalogo_geografico,
+    dados_evolucao_pib, dados_evolucao_valor_adicionado,
+    ranking_municipios_pib, ranking_municipios_per_capita, ranking_ufs, ranking_ufs_per_capita,
+    composicao_setorial, composicao_setorial_uf, composicao_setorial_agregado,
+    scatter_ufs_pib_vs_per_capita, tabela_municipios_completa, tabela_ufs_completa
+)
+from instrumentacao import instrumentar_modulo
+
+
+# Cores padronizadas para os setores econômicos (mais vibrantes para funcionar em ambos os temas)
+CORES_SETORES = {
+    "Agropecuária": "#4CAF50",        # Verde vibrante
+    "Indústria": "#2196F3",           # Azul vibrante
+    "Serviços": "#FF9800",            # Laranja vibrante
+    "Administração Pública": "#F44336"  # Vermelho vibrante
+}
+
+# Paleta para gráficos de linha/comparação (cores saturadas)
+PALETA_COMPARACAO = [
+    "#2196F3",  # Azul vibrante
+    "#FF9800",  # Laranja vibrante
+    "#4CAF50",  # Verde vibrante
+    "#F44336",  # Vermelho vibrante
+    "#9C27B0",  # Roxo vibrante
+    "#795548",  # Marrom vibrante
+    "#E91E63",  # Rosa vibrante
+    "#607D8B",  # Cinza-azulado
+    "#CDDC39",  # Lima
+    "#00BCD4"   # Ciano vibrante
+]
+
+# Cores para destaque (alto contraste)
+COR_REFERENCIA = "#FF5252"    # Vermelho vibrante (destaque)
+COR_SECUNDARIA = "#64B5F6"    # Azul claro (neutro)
+
+# Setores do valor adicionado nos gráficos de área
+SETORES_AREA = ["Agropecuária", "Indústria", "Serviços", "Administração Pública"]
+
+
+# ===============================
+# CONTEÚDO DAS SEÇÕES
+# ===============================
+# Figuras e tabelas das seções do painel, sem chamadas ao Streamlit: o app
+# as exibe e prerender.py as grava em disco para as visões mais acessadas.
+# Um valor None indica dados indisponíveis (o app mostra um aviso).
+
+def _soma_vab_por_ano(df_temp):
+    """Soma o VAB por ano e renomeia as colunas para os nomes dos setores."""
+    df_area = df_temp.groupby("ano").agg({
+        "vab_agropecuaria": "sum",
+        "vab_industria": "sum",
+        "vab_servicos": "sum",
+        "vab_adm_defesa_educacao_saude": "sum"
+    }).reset_index()
+    return df_area.rename(columns={
+        "vab_agropecuaria": "Agropecuária",
+        "vab_industria": "Indústria",
+        "vab_servicos": "Serviços",
+        "vab_adm_defesa_educacao_saude": "Administração Pública"
+    })
+
+
+def conteudo_evolucao(df, modo, ano_intervalo, regiao, uf, cod_municipio_sel, uf_municipio, municipios_sel, ufs_sel, regioes_sel):
+    """
+    Gráficos de evolução do PIB e da estrutura do valor adicionado.
+
+    Args:
+        df: DataFrame base
+        modo: Modo de visualização selecionado na sidebar
+        ano_intervalo: Tupla (ano inicial, ano final)
+        regiao: Região selecionada ("Brasil" para todas)
+        uf: UF selecionada ("Todas" para nenhuma)
+        cod_municipio_sel: Código IBGE do município (modo "Município específico")
+        uf_municipio: UF do município selecionado
+        municipios_sel: Códigos IBGE dos municípios comparados
+        ufs_sel: UFs comparadas
+        regioes_sel: Regiões comparadas
+
+    Returns:
+        Dict com as figuras "pib" e "valor_adicionado"
+    """
+    if modo == "Comparar Regiões":
+        if regioes_sel and len(regioes_sel) > 0:
+            # Dados agregados por região
+            df_line = cubo_agregado(df, "regiao", regioes_sel, ano_intervalo[0], ano_intervalo[1])
+
+            if not df_line.empty:
+                df_line["PIB (R$ bi)"] = df_line["pib_total"] / 1_000_000
+
+                fig_line = px.line(
+                    df_line,
+                    x="ano",
+                    y="PIB (R$ bi)",
+                    color="entidade",
+                    markers=True,
+                    color_discrete_sequence=PALETA_COMPARACAO
+                )
+                fig_line.update_layout(xaxis_title="Ano", yaxis_title="PIB (R$ bi)", legend_title="Região")
+            else:
+                fig_line = px.line(title="Dados não disponíveis")
+        else:
+            fig_line = px.line(title="Selecione regiões para comparar")
+
+    elif modo == "Comparar Estados":
+        if ufs_sel and len(ufs_sel) > 0:
+            # Dados agregados por UF
+            df_line = cubo_agregado(df, "uf", ufs_sel, ano_intervalo[0], ano_intervalo[1])
+
+            if not df_line.empty:
+                df_line["PIB (R$ bi)"] = df_line["pib_total"] / 1_000_000
+
+                fig_line = px.line(
+                    df_line,
+                    x="ano",
+                    y="PIB (R$ bi)",
+                    color="entidade",
+                    markers=True,
+                    color_discrete_sequence=PALETA_COMPARACAO
+                )
+                fig_line.update_layout(xaxis_title="Ano", yaxis_title="PIB (R$ bi)", legend_title="UF")
+            else:
+                fig_line = px.line(title="Dados não disponíveis")
+        else:
+            fig_line = px.line(title="Selecione estados para comparar")
+
+    elif modo == "Município específico":
+        df_line = dados_evolucao_pib(
+            df,
+            uf=uf_municipio,
+            municipios=[cod_municipio_sel],
+            ano_ini=ano_intervalo[0],
+            ano_fim=ano_intervalo[1]
+        )
+
+        if not df_line.empty:
+            # Converter para milhões/bilhões
+            df_line["PIB (R$ mi)"] = df_line["pib_total"] / 1000
+
+            fig_line = px.line(
+                df_line,
+                x="ano",
+                y="PIB (R$ mi)",
+                markers=True
+            )
+            fig_line.update_layout(xaxis_title="Ano", yaxis_title="PIB (R$ mi)")
+        else:
+            fig_line = px.line(title="Dados não disponíveis")
+
+    elif modo == "Comparar municípios":
+        if municipios_sel and len(municipios_sel) > 0:
+            # Filtrar municípios com base na região/UF selecionada
+            if uf != "Todas":
+                df_line = dados_evolucao_pib(
+                    df,
+                    uf=uf,
+                    municipios=municipios_sel,
+                    ano_ini=ano_intervalo[0],
+                    ano_fim=ano_intervalo[1]
+                )
+            else:
+                # Região ou Brasil inteiro: agrupar pelo código IBGE e rotular "Nome (UF)",
+                # para que municípios homônimos de UFs diferentes não virem uma linha só
+                df_filtrado = filtrar_dados(
+                    df,
+                    regiao=regiao,
+                    municipios=municipios_sel,
+                    ano_ini=ano_intervalo[0],
+                    ano_fim=ano_intervalo[1],
+                    colunas=["ano", "cod_municipio", "pib_total"]
+                )
+                df_line = df_filtrado.groupby(["ano", "cod_municipio"], observed=True).agg(
+                    pib_total=("pib_total", "sum")
+                ).reset_index()
+                df_line["nome_municipio"] = df_line["cod_municipio"].map(catalogo_geografico(df).rotulo_por_codigo)
+
+            if not df_line.empty:
+                df_line["PIB (R$ mi)"] = df_line["pib_total"] / 1000
+
+                fig_line = px.line(
+                    df_line,
+                    x="ano",
+                    y="PIB (R$ mi)",
+                    color="nome_municipio",
+                    markers=True,
+                    color_discrete_sequence=PALETA_COMPARACAO
+                )
+                fig_line.update_layout(xaxis_title="Ano", yaxis_title="PIB (R$ mi)", legend_title="Município")
+            else:
+                fig_line = px.line(title="Dados não disponíveis")
+        else:
+            fig_line = px.line(title="Selecione municípios para comparar")
+
+    elif modo == "Todos os municípios":
+        # Top 5 municípios da UF
+        df_line = dados_evolucao_pib(
+            df,
+            uf=uf,
+            ano_ini=ano_intervalo[0],
+            ano_fim=ano_intervalo[1]
+        )
+
+        if not df_line.empty:
+            df_line["PIB (R$ mi)"] = df_line["pib_total"] / 1000
+
+            fig_line = px.line(
+                df_line,
+                x="ano",
+                y="PIB (R$ mi)",
+                color="nome_municipio",
+                markers=True,
+                title=None,
+                color_discrete_sequence=PALETA_COMPARACAO
+            )
+            fig_line.update_layout(xaxis_title="Ano", yaxis_title="PIB (R$ mi)", legend_title="Município")
+        else:
+            fig_line = px.line(title="Dados não disponíveis")
+
+    else:  # Modo Agregado
+        # Comparação entre UFs ou regiões
+        df_line = dados_evolucao_pib(
+            df,
+            regiao=regiao if uf == "Todas" else None,
+            ano_ini=ano_intervalo[0],
+            ano_fim=ano_intervalo[1]
+        )
+
+        if not df_line.empty:
+            df_line["PIB (R$ bi)"] = df_line["pib_total"] / 1_000_000
+
+            fig_line = px.line(
+                df_line,
+                x="ano",
+                y="PIB (R$ bi)",
+                color="sigla_uf",
+                markers=True,
+                title="Top 5 UFs por PIB" if regiao == "Brasil" else f"UFs na região {regiao}",
+                color_discrete_sequence=PALETA_COMPARACAO
+            )
+            fig_line.update_layout(xaxis_title="Ano", yaxis_title="PIB (R$ bi)", legend_title="UF")
+        else:
+            fig_line = px.line(title="Dados não disponíveis")
+
+    # Ajustar ano_fim para limite de dados de VAB (2021)
+    ano_fim_vab = min(ano_intervalo[1], 2021)
+
+    if modo == "Comparar Regiões" and regioes_sel and len(regioes_sel) > 0:
+        # Filtrar pelas regiões selecionadas E pelo intervalo de anos
+        df_area = _soma_vab_por_ano(cubo_agregado(df, "regiao", regioes_sel, ano_intervalo[0], ano_fim_vab))
+    elif modo == "Comparar Estados" and ufs_sel and len(ufs_sel) > 0:
+        # Filtrar pelos estados selecionados E pelo intervalo de anos
+        df_area = _soma_vab_por_ano(cubo_agregado(df, "uf", ufs_sel, ano_intervalo[0], ano_fim_vab))
+    elif modo == "Município específico":
+        df_area = dados_evolucao_valor_adicionado(
+            df,
+            municipio=cod_municipio_sel,
+            uf=uf_municipio,
+            ano_ini=ano_intervalo[0],
+            ano_fim=ano_intervalo[1]
+        )
+    elif modo == "Comparar municípios" and municipios_sel and len(municipios_sel) > 0:
+        # Filtrar pelos municípios selecionados E pelo intervalo de anos
+        # (região e UF, quando selecionadas, restringem os municípios)
+        df_area = _soma_vab_por_ano(filtrar_dados(
+            df,
+            regiao=regiao,
+            uf=uf,
+            municipios=municipios_sel,
+            ano_ini=ano_intervalo[0],
+            ano_fim=ano_fim_vab,
+            colunas=["ano", *COLUNAS_VAB]
+        ))
+    elif modo == "Todos os municípios":
+        df_area = dados_evolucao_valor_adicionado(
+            df,
+            uf=uf,
+            ano_ini=ano_intervalo[0],
+            ano_fim=ano_intervalo[1]
+        )
+    else:  # Agregado
+        df_area = dados_evolucao_valor_adicionado(
+            df,
+            regiao=regiao if uf == "Todas" else None,
+            uf=uf if uf != "Todas" else None,
+            ano_ini=ano_intervalo[0],
+            ano_fim=ano_intervalo[1]
+        )
+
+    if df_area is not None and not df_area.empty:
+        # Converter para bilhões para visualização
+        for col in SETORES_AREA:
+            if col in df_area.columns:
+                df_area[col] = df_area[col] / 1000  # Milhares -> Milhões
+
+        fig_area = px.area(
+            df_area,
+            x="ano",
+            y=SETORES_AREA,
+            color_discrete_map=CORES_SETORES
+        )
+        fig_area.update_layout(xaxis_title="Ano", yaxis_title="Valor Adicionado (R$ mi)", legend_title="Setor")
+    else:
+        fig_area = px.area(title="Dados não disponíveis")
+
+    return {"pib": fig_line, "valor_adicionado": fig_area}
+
+
+def conteudo_rankings_municipios(df, uf, ano_ref):
+    """
+    Rankings dos 10 maiores municípios da UF por PIB total e por PIB per capita.
+
+    Args:
+        df: DataFrame base
+        uf: Sigla da UF
+        ano_ref: Ano de referência
+
+    Returns:
+        Dict com as figuras "pib" e "per_capita" (None sem dados)
+    """
+    conteudo = {"pib": None, "per_capita": None}
+
+    df_ranking_mun = ranking_municipios_pib(df, uf, ano_ref, top_n=10)
+    if df_ranking_mun is not None and not df_ranking_mun.empty:
+        # Preparar para visualização horizontal (inverter para mostrar maior no topo)
+        df_ranking_mun_sorted = df_ranking_mun.sort_values("PIB Total (R$ mi)", ascending=True)
+
+        conteudo["pib"] = px.bar(
+            df_ranking_mun_sorted,
+            y="Município",
+            x="PIB Total (R$ mi)",
+            orientation='h',
+            text_auto='.1f'
+        )
+
+    df_ranking_pc = ranking_municipios_per_capita(df, uf, ano_ref, top_n=10)
+    if df_ranking_pc is not None and not df_ranking_pc.empty:
+        df_ranking_pc_sorted = df_ranking_pc.sort_values("PIB per capita (R$)", ascending=True)
+
+        conteudo["per_capita"] = px.bar(
+            df_ranking_pc_sorted,
+            y="Município",
+            x="PIB per capita (R$)",
+            orientation='h',
+            text_auto='.0f',
+            color="PIB per capita (R$)",
+            color_continuous_scale="RdYlGn"  # Vermelho-Amarelo-Verde
+        )
+
+    return conteudo
+
+
+def conteudo_distribuicao_municipios(df, uf, ano_ref, ano_ini):
+    """
+    Composição setorial da UF, histograma do PIB per capita e tabela detalhada dos municípios.
+
+    Args:
+        df: DataFrame base
+        uf: Sigla da UF
+        ano_ref: Ano de referência (limitado a 2021, último ano com VAB)
+        ano_ini: Ano inicial do crescimento na tabela
+
+    Returns:
+        Dict com as figuras "setores" e "histograma" e a tabela "tabela" (None sem dados)
+    """
+    conteudo = {"setores": None, "histograma": None, "tabela": None}
+    ano_ref = min(ano_ref, 2021)
+
+    df_setores_uf = composicao_setorial_uf(df, uf, ano_ref)
+    if df_setores_uf is not None and not df_setores_uf.empty:
+        conteudo["setores"] = px.pie(
+            df_setores_uf,
+            names="Setor",
+            values="Participação (%)",
+            hole=0.5,
+            color="Setor",
+            color_discrete_map=CORES_SETORES
+        )
+
+    # Obter dados de PIB per capita de todos os municípios da UF
+    dados_uf = dados_uf_ano(df, uf, ano_ref)
+    if not dados_uf.empty:
+        fig_hist = px.histogram(
+            dados_uf,
+            x="pib_per_capita",
+            nbins=20,
+            title="Frequência",
+            labels={"pib_per_capita": "PIB per capita (R$)"}
+        )
+        fig_hist.update_layout(yaxis_title="Número de municípios")
+        conteudo["histograma"] = fig_hist
+
+    df_table_todos = tabela_municipios_completa(df, uf, ano_ref, ano_ini)
+    if df_table_todos is not None and not df_table_todos.empty:
+        conteudo["tabela"] = df_table_todos
+
+    return conteudo
+
+
+def conteudo_agregado(df, regiao, uf, ano_ref, ano_ini):
+    """
+    Rankings, dispersão, tabela consolidada e composição setorial das UFs.
+
+    Args:
+        df: DataFrame base
+        regiao: Região selecionada ("Brasil" para todas)
+        uf: UF selecionada ("Todas" para nenhuma)
+        ano_ref: Ano de referência (a tabela e a composição usam no máximo 2021)
+        ano_ini: Ano inicial do crescimento na tabela
+
+    Returns:
+        Dict com as figuras "ranking", "per_capita", "scatter", "setores" e
+        "setores_ufs" e a tabela "tabela" (None sem dados)
+    """
+    conteudo = dict.fromkeys(["ranking", "per_capita", "scatter", "tabela", "setores", "setores_ufs"])
+    regiao_filtro = regiao if uf == "Todas" else None
+
+    df_ranking = ranking_ufs(df, ano_ref, regiao_filtro)
+    if df_ranking is not None and not df_ranking.empty:
+        df_ranking_sorted = df_ranking.sort_values("PIB Total (R$ bi)", ascending=True)
+
+        conteudo["ranking"] = px.bar(
+            df_ranking_sorted,
+            y="UF",
+            x="PIB Total (R$ bi)",
+            orientation='h',
+            text_auto='.1f',
+            color="PIB Total (R$ bi)",
+            color_continuous_scale="Blues"
+        )
+
+    df_per_capita = ranking_ufs_per_capita(df, ano_ref, regiao_filtro)
+    if df_per_capita is not None and not df_per_capita.empty:
+        df_per_capita_sorted = df_per_capita.sort_values("PIB per capita (R$)", ascending=True)
+
+        conteudo["per_capita"] = px.bar(
+            df_per_capita_sorted,
+            y="UF",
+            x="PIB per capita (R$)",
+            orientation='h',
+            text_auto='.0f',
+            color="PIB per capita (R$)",
+            color_continuous_scale="Blues"
+        )
+
+    df_scatter_ufs = scatter_ufs_pib_vs_per_capita(df, ano_ref, regiao_filtro)
+    if df_scatter_ufs is not None and not df_scatter_ufs.empty:
+        fig_scatter_ufs = px.scatter(
+            df_scatter_ufs,
+            x="PIB Total (R$ bi)",
+            y="PIB per capita (R$)",
+            size="Nº Municípios",
+            hover_data=["UF"],
+            text="UF",
+            size_max=50,
+            color="PIB per capita (R$)",
+            color_continuous_scale="Viridis"
+        )
+        fig_scatter_ufs.update_traces(textposition='top center')
+        conteudo["scatter"] = fig_scatter_ufs
+
+    # Tabela e composição setorial: ano no máximo 2021
+    ano_ref = min(ano_ref, 2021)
+
+    df_table_ufs = tabela_ufs_completa(df, ano_ref, ano_ini, regiao_filtro)
+    if df_table_ufs is not None and not df_table_ufs.empty:
+        conteudo["tabela"] = df_table_ufs
+
+    df_setores_agg = composicao_setorial_agregado(df, regiao, ano_ref)
+    if df_setores_agg is not None and not df_setores_agg.empty:
+        conteudo["setores"] = px.pie(
+            df_setores_agg,
+            names="Setor",
+            values="Participação (%)",
+            hole=0.5,
+            color="Setor",
+            color_discrete_map=CORES_SETORES
+        )
+
+    # Obter composição setorial de cada UF
+    if regiao == "Brasil":
+        pib_por_uf = cubo_agregado(df, "uf", ano_ini=ano_ref).sort_values("pib_total", ascending=False)
+        ufs_para_mostrar = pib_por_uf["entidade"].head(10).tolist()
+    else:
+        ufs_para_mostrar = cubo_agregado(df, "uf", ano_ini=ano_ref, regiao=regiao)["entidade"].tolist()
+
+    df_stacked = composicao_setorial(df, "uf", ufs_para_mostrar, ano_ref).rename(columns={"entidade": "UF"})
+    if not df_stacked.empty:
+        conteudo["setores_ufs"] = px.bar(
+            df_stacked,
+            x="UF",
+            y="Participação (%)",
+            color="Setor",
+            text_auto='.1f',
+            color_discrete_map=CORES_SETORES
+        )
+
+    return conteudo
+
+
+# Chamadas, tempo e tamanho do resultado de cada construtor (PIB_INSTRUMENTACAO=0 desativa)
+instrumentar_modulo(globals())
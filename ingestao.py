@@ -0,0 +1,652 @@
+"""
+Ingestão da planilha do IBGE (PIB dos Municípios) para o parquet usado pelo app.
+
+Substitui a etapa manual do analise.ipynb: a planilha é lida linha a linha
+(openpyxl em modo read_only), apenas as colunas usadas são mantidas e o
+resultado é gravado já tipado e ordenado por ano e código IBGE, com um grupo
+de linhas por ano.
+
+A base inteira não passa pela memória: os lotes lidos são separados por ano
+em parquets temporários e cada ano é ordenado e gravado por vez (o pico de
+memória é o de um lote mais um ano da base). A exceção é --atualizar, que
+compara e grava a tabela dos anos da origem montada na memória.
+
+Cada base gravada leva um manifesto com a versão, o hash do conteúdo de cada
+partição (ano/UF) e o histórico de alterações. A versão só muda quando o
+conteúdo muda; o app a usa para recarregar a base e para reaproveitar, dos
+anos que não mudaram, o cubo de agregados e as tabelas de ranking.
+
+Com --atualizar, só os anos/UFs novos ou revisados da planilha são gravados
+na base existente (no diretório particionado, só as partições alteradas são
+reescritas).
+
+Uso:
+    python ingestao.py raw/dados_brutos.xlsx --saida pib_municipios.parquet
+    python ingestao.py pib_municipios.parquet --particionado pib_municipios/
+    python ingestao.py raw/pib_2022.xlsx --atualizar pib_municipios.parquet
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import datetime
+
+import numpy as np
+import openpyxl
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+
+# Não importa data.py (que carrega o Streamlit): a ingestão roda fora do app
+ARQUIVO_DADOS = "pib_municipios.parquet"
+ABA_PADRAO = "PIB dos Municípios"
+
+# Mesma ordem física de data.ORDEM_BASE
+ORDEM_BASE = ["ano", "cod_grande_regiao", "cod_uf", "cod_municipio"]
+
+# Mapa de renomeação das colunas da planilha do IBGE (mesmo do analise.ipynb)
+RENOMEAR_COLUNAS = {
+    'Ano': 'ano',
+    'Código da Grande Região': 'cod_grande_regiao',
+    'Nome da Grande Região': 'nome_grande_regiao',
+    'Código da Unidade da Federação': 'cod_uf',
+    'Sigla da Unidade da Federação': 'sigla_uf',
+    'Nome da Unidade da Federação': 'nome_uf',
+    'Código do Município': 'cod_municipio',
+    'Nome do Município': 'nome_municipio',
+    'Valor adicionado bruto da Agropecuária, \na preços correntes\n(R$ 1.000)': 'vab_agropecuaria',
+    'Valor adicionado bruto da Indústria,\na preços correntes\n(R$ 1.000)': 'vab_industria',
+    'Valor adicionado bruto dos Serviços,\na preços correntes \n- exceto Administração, defesa, educação e saúde públicas e seguridade social\n(R$ 1.000)': 'vab_servicos',
+    'Valor adicionado bruto da Administração, defesa, educação e saúde públicas e seguridade social, \na preços correntes\n(R$ 1.000)': 'vab_adm_defesa_educacao_saude',
+    'Valor adicionado bruto total, \na preços correntes\n(R$ 1.000)': 'vab_total',
+    'Impostos, líquidos de subsídios, sobre produtos, \na preços correntes\n(R$ 1.000)': 'impostos_liquidos_subsidios',
+    'Produto Interno Bruto, \na preços correntes\n(R$ 1.000)': 'pib_total',
+    'Produto Interno Bruto per capita, \na preços correntes\n(R$ 1,00)': 'pib_per_capita',
+    'Atividade com maior valor adicionado bruto': 'atividade_maior_vab',
+    'Atividade com segundo maior valor adicionado bruto': 'atividade_segundo_maior_vab',
+    'Atividade com terceiro maior valor adicionado bruto': 'atividade_terceiro_maior_vab'
+}
+
+# Esquema do parquet: inteiros curtos, rótulos dicionarizados (lidos como categorias)
+ROTULO = pa.dictionary(pa.int32(), pa.string())
+ESQUEMA = pa.schema([
+    ("ano", pa.int16()),
+    ("cod_grande_regiao", pa.int32()),
+    ("nome_grande_regiao", ROTULO),
+    ("cod_uf", pa.int32()),
+    ("sigla_uf", ROTULO),
+    ("nome_uf", ROTULO),
+    ("cod_municipio", pa.int32()),
+    ("nome_municipio", ROTULO),
+    ("vab_agropecuaria", pa.float64()),
+    ("vab_industria", pa.float64()),
+    ("vab_servicos", pa.float64()),
+    ("vab_adm_defesa_educacao_saude", pa.float64()),
+    ("vab_total", pa.float64()),
+    ("impostos_liquidos_subsidios", pa.float64()),
+    ("pib_total", pa.float64()),
+    ("pib_per_capita", pa.float64()),
+    ("atividade_maior_vab", ROTULO),
+    ("atividade_segundo_maior_vab", ROTULO),
+    ("atividade_terceiro_maior_vab", ROTULO)
+])
+
+# Partições da base particionada (ver gravar_particionado e data.ler_particoes)
+ESQUEMA_PARTICOES = pa.schema([("ano", pa.int16()), ("sigla_uf", pa.string())])
+
+LINHAS_POR_LOTE = 50_000
+LINHAS_POR_GRUPO = 64 * 1024
+
+# Manifesto de versão: arquivo no diretório particionado (o prefixo "_" o deixa
+# fora do dataset) ou metadado do parquet único (mesmos nomes em data.py)
+ARQUIVO_MANIFESTO = "_versao.json"
+CHAVE_MANIFESTO = b"pib_manifesto"
+
+# Número em texto com ponto como separador de milhar (ex: "1.234", "-12.345.678")
+MILHAR_PT_BR = re.compile(r"[+-]?\d{1,3}(\.\d{3})+")
+
+
+def _normalizar_cabecalho(nome):
+    """Ignora diferenças de espaços e quebras de linha nos cabeçalhos do IBGE."""
+    return " ".join(str(nome).split()) if nome is not None else None
+
+
+def _numero(valor):
+    """
+    Converte uma célula em float (células vazias ou marcadores como '...' viram None).
+
+    Texto no formato brasileiro é normalizado antes da conversão: "1.234"
+    vira 1234.0 e "1.234,5" vira 1234.5.
+    """
+    if valor is None or isinstance(valor, (int, float)):
+        return valor
+    texto = str(valor).strip()
+    if "," in texto:
+        texto = texto.replace(".", "").replace(",", ".")
+    elif MILHAR_PT_BR.fullmatch(texto):
+        texto = texto.replace(".", "")
+    try:
+        return float(texto)
+    except ValueError:
+        return None
+
+
+def _inteiro(valor):
+    """Converte uma célula em int (códigos e anos podem vir como texto)."""
+    if valor is None or isinstance(valor, int):
+        return valor
+    return int(float(valor))
+
+
+def _e_ano(valor):
+    """Indica se a célula da coluna Ano contém um ano (e não rodapé ou célula vazia)."""
+    return isinstance(valor, (int, float)) or (isinstance(valor, str) and valor.strip().isdigit())
+
+
+def _texto(valor):
+    """Converte uma célula em texto sem espaços nas pontas (vazia vira None)."""
+    if valor is None:
+        return None
+    texto = str(valor).strip()
+    return texto or None
+
+
+def _conversor(tipo):
+    if pa.types.is_integer(tipo):
+        return _inteiro
+    if pa.types.is_floating(tipo):
+        return _numero
+    return _texto
+
+
+def _lote_para_tabela(colunas):
+    """Converte as listas de valores de um lote em uma tabela Arrow tipada."""
+    arrays = []
+    for campo in ESQUEMA:
+        if pa.types.is_dictionary(campo.type):
+            arrays.append(pa.array(colunas[campo.name], type=pa.string()).dictionary_encode())
+        else:
+            arrays.append(pa.array(colunas[campo.name], type=campo.type))
+    return pa.Table.from_arrays(arrays, schema=ESQUEMA)
+
+
+def ler_planilha(caminho, aba=ABA_PADRAO, linhas_por_lote=LINHAS_POR_LOTE):
+    """
+    Lê a planilha do IBGE em lotes, mantendo apenas as colunas renomeadas.
+
+    Args:
+        caminho: Arquivo .xlsx do IBGE
+        aba: Nome da aba com os dados
+        linhas_por_lote: Linhas acumuladas antes de converter para Arrow
+
+    Yields:
+        Tabelas Arrow tipadas com as colunas de ESQUEMA
+    """
+    livro = openpyxl.load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        linhas = livro[aba].iter_rows(values_only=True)
+        cabecalho = [_normalizar_cabecalho(nome) for nome in next(linhas)]
+
+        renomear = {_normalizar_cabecalho(nome): destino for nome, destino in RENOMEAR_COLUNAS.items()}
+        posicoes = {renomear[nome]: i for i, nome in enumerate(cabecalho) if nome in renomear}
+        faltantes = [campo.name for campo in ESQUEMA if campo.name not in posicoes]
+        if faltantes:
+            raise ValueError(f"Colunas ausentes na planilha: {', '.join(faltantes)}")
+
+        campos = [(campo.name, posicoes[campo.name], _conversor(campo.type)) for campo in ESQUEMA]
+        posicao_ano = posicoes["ano"]
+        colunas = {nome: [] for nome, _, _ in campos}
+        for linha in linhas:
+            # Linhas em branco e de rodapé (fonte, notas) não têm ano numérico
+            if posicao_ano >= len(linha) or not _e_ano(linha[posicao_ano]):
+                continue
+            # O modo read_only omite as células vazias no fim da linha
+            if len(linha) < len(cabecalho):
+                linha = linha + (None,) * (len(cabecalho) - len(linha))
+            for nome, posicao, converter in campos:
+                colunas[nome].append(converter(linha[posicao]))
+            if len(colunas["ano"]) >= linhas_por_lote:
+                yield _lote_para_tabela(colunas)
+                colunas = {nome: [] for nome, _, _ in campos}
+
+        if colunas["ano"]:
+            yield _lote_para_tabela(colunas)
+    finally:
+        livro.close()
+
+
+def montar_tabela(lotes):
+    """
+    Junta os lotes lidos em uma tabela ordenada por ano e código IBGE.
+
+    A tabela inteira fica na memória; para gravar a base a partir da planilha,
+    separar_por_ano e ler_anos ordenam um ano por vez.
+
+    Args:
+        lotes: Iterável de tabelas Arrow (ver ler_planilha)
+
+    Returns:
+        Tabela Arrow com o ESQUEMA
+    """
+    tabela = pa.concat_tables(list(lotes)).unify_dictionaries()
+    return tabela.sort_by([(col, "ascending") for col in ORDEM_BASE])
+
+
+def _no_esquema(tabela):
+    """Converte uma tabela lida de parquet para o ESQUEMA (rótulos como dicionário)."""
+    colunas = [
+        tabela.column(campo.name).cast(pa.string()).dictionary_encode()
+        if pa.types.is_dictionary(campo.type) else tabela.column(campo.name).cast(campo.type)
+        for campo in ESQUEMA
+    ]
+    return pa.Table.from_arrays(colunas, schema=ESQUEMA)
+
+
+def ler_parquet(caminho):
+    """Lê um parquet já gerado (ex: versão anterior) no ESQUEMA, ordenado."""
+    return montar_tabela([_no_esquema(pq.read_table(caminho))])
+
+
+def ler_parquet_em_lotes(caminho, linhas_por_lote=LINHAS_POR_LOTE):
+    """
+    Lê um parquet já gerado em lotes, como ler_planilha.
+
+    Yields:
+        Tabelas Arrow com o ESQUEMA
+    """
+    arquivo = pq.ParquetFile(caminho)
+    for lote in arquivo.iter_batches(batch_size=linhas_por_lote, columns=ESQUEMA.names):
+        yield _no_esquema(pa.Table.from_batches([lote]))
+
+
+def separar_por_ano(lotes, pasta):
+    """
+    Grava os lotes lidos em um parquet temporário por ano, na ordem em que chegam.
+
+    Args:
+        lotes: Iterável de tabelas Arrow (ver ler_planilha)
+        pasta: Diretório dos arquivos temporários
+
+    Returns:
+        Lista dos arquivos, em ordem de ano
+    """
+    escritores = {}
+    try:
+        for lote in lotes:
+            for ano in pc.unique(lote.column("ano")).to_pylist():
+                if ano not in escritores:
+                    escritores[ano] = pq.ParquetWriter(os.path.join(pasta, f"ano={ano}.parquet"), ESQUEMA)
+                escritores[ano].write_table(lote.filter(pc.equal(lote.column("ano"), ano)))
+    finally:
+        for escritor in escritores.values():
+            escritor.close()
+    return [os.path.join(pasta, f"ano={ano}.parquet") for ano in sorted(escritores)]
+
+
+def ler_anos(arquivos):
+    """
+    Lê os arquivos de separar_por_ano, um ano por vez.
+
+    Yields:
+        Tabela Arrow de cada ano, ordenada por código IBGE (ver montar_tabela)
+    """
+    for arquivo in arquivos:
+        yield montar_tabela([pq.read_table(arquivo, schema=ESQUEMA)])
+
+
+def hashes_particoes(tabela):
+    """
+    Hash do conteúdo de cada partição (ano/UF) da tabela.
+
+    Args:
+        tabela: Tabela Arrow ordenada (ver montar_tabela)
+
+    Returns:
+        Dict "ano/UF" -> hash hexadecimal das linhas da partição
+    """
+    df = tabela.to_pandas()
+    # Rótulos entram pelo texto, não pelo código do dicionário
+    linhas = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    chaves = df["ano"].to_numpy().astype(np.int64) * 100 + df["cod_uf"].to_numpy()
+    inicios = np.flatnonzero(np.r_[True, chaves[1:] != chaves[:-1]])
+    limites = [*inicios.tolist(), len(df)]
+    return {
+        f"{df['ano'].iat[inicio]}/{df['sigla_uf'].iat[inicio]}": hashlib.sha1(linhas[inicio:fim].tobytes()).hexdigest()
+        for inicio, fim in zip(limites, limites[1:])
+    }
+
+
+def ler_manifesto(destino):
+    """Manifesto de versão da base em `destino` (None se a base não existir ou não tiver manifesto)."""
+    if os.path.isdir(destino):
+        caminho = os.path.join(destino, ARQUIVO_MANIFESTO)
+        if not os.path.exists(caminho):
+            return None
+        with open(caminho, encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+    if not os.path.exists(destino):
+        return None
+    texto = (pq.read_metadata(destino).metadata or {}).get(CHAVE_MANIFESTO)
+    return json.loads(texto) if texto else None
+
+
+def nova_versao(anterior, hashes, parcial=False):
+    """
+    Manifesto da base com as partições de `hashes`, comparado com o manifesto anterior.
+
+    Args:
+        anterior: Manifesto da versão gravada (None para base nova)
+        hashes: Hash das partições gravadas (ver hashes_particoes)
+        parcial: Se True, as partições ausentes de `hashes` continuam na base
+                 (atualização); senão a base passa a ter só as de `hashes`
+
+    Returns:
+        (manifesto, lista de partições "ano/UF" alteradas). Sem alterações, o
+        manifesto anterior volta como está, sem mudar de versão
+    """
+    particoes_anteriores = anterior["particoes"] if anterior else {}
+    alteradas = sorted(chave for chave, valor in hashes.items() if particoes_anteriores.get(chave) != valor)
+    if not parcial:
+        alteradas += sorted(set(particoes_anteriores) - set(hashes))
+    if anterior and not alteradas:
+        return anterior, []
+
+    agora = datetime.now().isoformat(timespec="seconds")
+    versao = anterior["versao"] + 1 if anterior else 1
+    particoes = {**particoes_anteriores, **hashes} if parcial else hashes
+    manifesto = {
+        "id": anterior["id"] if anterior else uuid.uuid4().hex[:12],
+        "versao": versao,
+        "atualizado_em": agora,
+        "particoes": dict(sorted(particoes.items())),
+        "historico": [
+            *(anterior["historico"] if anterior else []),
+            {
+                "versao": versao,
+                "data": agora,
+                "anos": sorted({int(chave.split("/")[0]) for chave in alteradas}),
+                "particoes": len(alteradas)
+            }
+        ]
+    }
+    return manifesto, alteradas
+
+
+def _gravar_manifesto(destino, manifesto):
+    """Grava o manifesto no diretório particionado (troca atômica do arquivo)."""
+    caminho = os.path.join(destino, ARQUIVO_MANIFESTO)
+    with open(f"{caminho}.tmp", "w", encoding="utf-8") as arquivo:
+        json.dump(manifesto, arquivo, ensure_ascii=False, indent=1)
+    os.replace(f"{caminho}.tmp", caminho)
+
+
+def gravar_parquet(tabela, saida, manifesto=None):
+    """
+    Grava a tabela ordenada em um único parquet, com um grupo de linhas por ano.
+
+    O manifesto de versão vai nos metadados do arquivo.
+
+    Args:
+        tabela: Tabela Arrow ordenada (ver montar_tabela)
+        saida: Caminho do parquet de saída
+        manifesto: Manifesto a gravar (padrão: versão seguinte à do arquivo
+                   existente, se o conteúdo mudou)
+
+    Returns:
+        Número de linhas gravadas
+    """
+    _, inicios = np.unique(tabela.column("ano").to_numpy(), return_index=True)
+    limites = [*inicios.tolist(), tabela.num_rows]
+    anos = (tabela.slice(inicio, fim - inicio) for inicio, fim in zip(limites, limites[1:]))
+    return gravar_parquet_por_ano(anos, saida, manifesto, tabela.schema)
+
+
+def gravar_parquet_por_ano(anos, saida, manifesto=None, esquema=ESQUEMA):
+    """
+    Grava um único parquet a partir das tabelas de cada ano, um grupo de linhas por ano.
+
+    Só um ano fica na memória por vez: o hash das partições é calculado ano a
+    ano e o manifesto vai nos metadados do arquivo depois do último ano.
+
+    Args:
+        anos: Iterável de tabelas Arrow ordenadas, uma por ano, em ordem de ano (ver ler_anos)
+        saida: Caminho do parquet de saída
+        manifesto: Manifesto a gravar (padrão: versão seguinte à do arquivo
+                   existente, se o conteúdo mudou)
+        esquema: Esquema das tabelas
+
+    Returns:
+        Número de linhas gravadas
+    """
+    hashes = {}
+    linhas = 0
+
+    # Grava em arquivo temporário e troca no final, para não deixar parquet pela metade
+    temporario = f"{saida}.tmp"
+    with pq.ParquetWriter(temporario, esquema) as escritor:
+        for tabela_ano in anos:
+            if manifesto is None:
+                hashes.update(hashes_particoes(tabela_ano))
+            escritor.write_table(tabela_ano)
+            linhas += tabela_ano.num_rows
+        if manifesto is None:
+            manifesto, _ = nova_versao(ler_manifesto(saida), hashes)
+        escritor.add_key_value_metadata({CHAVE_MANIFESTO: json.dumps(manifesto, ensure_ascii=False)})
+    os.replace(temporario, saida)
+    return linhas
+
+
+def _rotulos_como_texto(tabela):
+    """
+    Rótulos de volta a texto, para gravar partições: o dicionário Arrow da tabela
+    inteira seria repetido em cada arquivo, e o parquet já codifica por
+    dicionário dentro de cada partição.
+    """
+    return pa.Table.from_arrays(
+        [coluna.cast(pa.string()) if pa.types.is_dictionary(coluna.type) else coluna for coluna in tabela.columns],
+        names=tabela.column_names
+    )
+
+
+def gravar_particionado(tabela, destino, linhas_por_grupo=LINHAS_POR_GRUPO):
+    """
+    Grava a tabela como dataset parquet particionado por ano e UF (ano=2021/sigla_uf=SP/).
+
+    Dentro de cada partição as linhas seguem ordenadas por código do município,
+    e as estatísticas de cada grupo de linhas permitem descartar grupos na leitura.
+    O manifesto de versão vai em _versao.json, na raiz do diretório.
+
+    Args:
+        tabela: Tabela Arrow ordenada (ver montar_tabela)
+        destino: Diretório do dataset (substituído por completo)
+        linhas_por_grupo: Máximo de linhas por grupo de linhas
+
+    Returns:
+        Número de arquivos gravados
+    """
+    return gravar_particionado_por_ano([tabela], destino, linhas_por_grupo)
+
+
+def gravar_particionado_por_ano(anos, destino, linhas_por_grupo=LINHAS_POR_GRUPO):
+    """
+    Grava o dataset particionado (ver gravar_particionado) a partir das tabelas
+    de cada ano, com só um ano na memória por vez.
+
+    Args:
+        anos: Iterável de tabelas Arrow ordenadas, uma por ano, em ordem de ano (ver ler_anos)
+        destino: Diretório do dataset (substituído por completo)
+        linhas_por_grupo: Máximo de linhas por grupo de linhas
+
+    Returns:
+        Número de arquivos gravados
+    """
+    hashes = {}
+
+    def lotes():
+        for tabela_ano in anos:
+            hashes.update(hashes_particoes(tabela_ano))
+            yield from _rotulos_como_texto(tabela_ano).to_batches()
+
+    temporario = f"{destino}.tmp"
+    shutil.rmtree(temporario, ignore_errors=True)
+    arquivos = []
+    ds.write_dataset(
+        lotes(),
+        temporario,
+        schema=_rotulos_como_texto(ESQUEMA.empty_table()).schema,
+        format="parquet",
+        partitioning=ds.partitioning(ESQUEMA_PARTICOES, flavor="hive"),
+        basename_template="parte-{i}.parquet",
+        max_rows_per_group=linhas_por_grupo,
+        min_rows_per_group=min(linhas_por_grupo, 1024),
+        preserve_order=True,
+        file_visitor=lambda arquivo: arquivos.append(arquivo.path)
+    )
+    manifesto, _ = nova_versao(ler_manifesto(destino), hashes)
+    _gravar_manifesto(temporario, manifesto)
+
+    # Troca o diretório inteiro no final, para não misturar versões
+    if os.path.isdir(destino):
+        shutil.rmtree(destino)
+    os.replace(temporario, destino)
+    return len(arquivos)
+
+
+def _chaves_particao(tabela):
+    """Partição "ano/UF" de cada linha da tabela."""
+    return pc.binary_join_element_wise(
+        tabela.column("ano").cast(pa.string()), tabela.column("sigla_uf").cast(pa.string()), "/"
+    )
+
+
+def _gravar_particao(tabela, destino, chave, linhas_por_grupo):
+    """Regrava o arquivo de uma partição "ano/UF" do diretório particionado com as linhas da tabela."""
+    ano, uf = chave.split("/")
+    particao = tabela.filter(pc.equal(_chaves_particao(tabela), chave))
+    particao = _rotulos_como_texto(particao.drop_columns(ESQUEMA_PARTICOES.names))
+
+    pasta = os.path.join(destino, f"ano={ano}", f"sigla_uf={uf}")
+    os.makedirs(pasta, exist_ok=True)
+    # O prefixo "_" deixa o arquivo temporário fora do dataset enquanto é gravado
+    temporario = os.path.join(pasta, "_parte-0.parquet.tmp")
+    pq.write_table(particao, temporario, row_group_size=linhas_por_grupo)
+    os.replace(temporario, os.path.join(pasta, "parte-0.parquet"))
+    for nome in os.listdir(pasta):
+        if nome.endswith(".parquet") and nome != "parte-0.parquet":
+            os.remove(os.path.join(pasta, nome))
+
+
+def atualizar_base(tabela, destino, linhas_por_grupo=LINHAS_POR_GRUPO):
+    """
+    Grava na base existente só as partições (ano/UF) novas ou revisadas da tabela.
+
+    As partições da base que não aparecem na tabela ficam como estão. No
+    diretório particionado só os arquivos das partições alteradas são
+    reescritos e o manifesto é gravado por último: se a atualização for
+    interrompida, a versão não muda e a próxima execução regrava o que faltar.
+
+    Args:
+        tabela: Tabela Arrow ordenada com os anos novos ou revisados (ver montar_tabela)
+        destino: Parquet único ou diretório particionado existente
+        linhas_por_grupo: Máximo de linhas por grupo de linhas (diretório particionado)
+
+    Returns:
+        (manifesto da base, lista de partições "ano/UF" alteradas)
+    """
+    if not os.path.exists(destino):
+        raise FileNotFoundError(f"Base não encontrada: {destino} (use --saida ou --particionado para criá-la)")
+
+    base = None
+    anterior = ler_manifesto(destino)
+    if anterior is None:
+        # Base gravada antes do manifesto: a versão 1 descreve o conteúdo atual
+        base = ler_parquet(destino)
+        anterior, _ = nova_versao(None, hashes_particoes(base))
+    manifesto, alteradas = nova_versao(anterior, hashes_particoes(tabela), parcial=True)
+    if not alteradas:
+        return manifesto, []
+
+    if os.path.isdir(destino):
+        for chave in alteradas:
+            _gravar_particao(tabela, destino, chave, linhas_por_grupo)
+        _gravar_manifesto(destino, manifesto)
+    else:
+        base = ler_parquet(destino) if base is None else base
+        revisadas = pa.array(alteradas, type=pa.string())
+        mantidas = base.filter(pc.invert(pc.is_in(_chaves_particao(base), value_set=revisadas)))
+        novas = tabela.filter(pc.is_in(_chaves_particao(tabela), value_set=revisadas))
+        gravar_parquet(montar_tabela([mantidas, novas]), destino, manifesto)
+    return manifesto, alteradas
+
+
+def _pico_memoria_mib():
+    """Pico de memória residente do processo (MiB), quando disponível."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Converte a planilha do IBGE no parquet do app")
+    parser.add_argument("origem", help="Planilha .xlsx do IBGE (ex: raw/dados_brutos.xlsx) ou parquet já gerado")
+    parser.add_argument("--saida", default=None, help=f"Parquet de saída (padrão para planilhas: {ARQUIVO_DADOS})")
+    parser.add_argument("--particionado", default=None, help="Diretório da base particionada por ano/sigla_uf")
+    parser.add_argument("--atualizar", default=None,
+                        help="Parquet ou diretório particionado existente: grava só os anos/UFs novos ou revisados")
+    parser.add_argument("--aba", default=ABA_PADRAO, help="Aba da planilha com os dados")
+    parser.add_argument("--linhas-por-lote", type=int, default=LINHAS_POR_LOTE)
+    parser.add_argument("--linhas-por-grupo", type=int, default=LINHAS_POR_GRUPO)
+    args = parser.parse_args()
+
+    saida = args.saida
+    if saida is None and args.particionado is None and args.atualizar is None and not args.origem.endswith(".parquet"):
+        saida = ARQUIVO_DADOS
+
+    inicio = time.perf_counter()
+    if args.origem.endswith(".parquet"):
+        lotes = ler_parquet_em_lotes(args.origem, args.linhas_por_lote)
+    else:
+        lotes = ler_planilha(args.origem, args.aba, args.linhas_por_lote)
+
+    # Lotes separados por ano em disco: cada gravação relê e ordena um ano por vez
+    with tempfile.TemporaryDirectory(prefix="ingestao-") as pasta:
+        arquivos_anos = separar_por_ano(lotes, pasta)
+
+        if saida:
+            linhas = gravar_parquet_por_ano(ler_anos(arquivos_anos), saida)
+            print(f"{linhas:,} linhas gravadas em {saida} (versão {ler_manifesto(saida)['versao']})")
+        if args.particionado:
+            arquivos = gravar_particionado_por_ano(ler_anos(arquivos_anos), args.particionado, args.linhas_por_grupo)
+            linhas = sum(pq.ParquetFile(arquivo).metadata.num_rows for arquivo in arquivos_anos)
+            print(f"{linhas:,} linhas gravadas em {arquivos} partições em {args.particionado} "
+                  f"(versão {ler_manifesto(args.particionado)['versao']})")
+        if args.atualizar:
+            tabela = montar_tabela(ler_anos(arquivos_anos))
+            manifesto, alteradas = atualizar_base(tabela, args.atualizar, args.linhas_por_grupo)
+            if alteradas:
+                anos = ", ".join(str(ano) for ano in manifesto["historico"][-1]["anos"])
+                print(f"{len(alteradas)} partições alteradas em {args.atualizar} (anos: {anos}); "
+                      f"versão {manifesto['versao']}")
+            else:
+                print(f"nenhuma partição alterada em {args.atualizar}; versão {manifesto['versao']} mantida")
+    duracao = time.perf_counter() - inicio
+
+    print(f"tempo: {duracao:.1f} s")
+    pico = _pico_memoria_mib()
+    if pico is not None:
+        print(f"pico de memória do processo: {pico:.0f} MiB "
+              f"(Arrow: {pa.default_memory_pool().max_memory() / 2**20:.0f} MiB)")
+
+
+if __name__ == "__main__":
+    main()
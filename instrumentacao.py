@@ -0,0 +1,203 @@
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+# Cronometragem das funções públicas de data.py (PIB_INSTRUMENTACAO=0 desativa)
+ATIVA = os.environ.get("PIB_INSTRUMENTACAO", "1").lower() not in ("0", "false", "nao", "não")
+
+# Colunas das tabelas e da exportação em CSV
+CAMPOS = ["nome", "tipo", "chamadas", "total_ms", "medio_ms", "maximo_ms", "ultimo_ms", "tamanho_ultimo", "tamanho_medio"]
+
+
+class RegistroTempos:
+    """
+    Acumula, por nome (função, seção ou bloco), o número de chamadas, o tempo
+    de parede e o tamanho do resultado.
+
+    O tempo de uma função inclui o das funções que ela chama; o tamanho é o
+    número de linhas (DataFrame/Series) ou de itens (listas, dicts, arrays).
+    """
+
+    def __init__(self):
+        self._medidas = {}
+        self._trava = threading.Lock()
+        self.iniciado_em = datetime.now()
+
+    def registrar(self, nome, segundos, tamanho=None, tipo="função"):
+        """Soma uma chamada de `nome` que durou `segundos` e devolveu `tamanho` itens."""
+        with self._trava:
+            medida = self._medidas.get(nome)
+            if medida is None:
+                medida = self._medidas[nome] = {
+                    "tipo": tipo, "chamadas": 0, "total": 0.0, "maximo": 0.0, "ultimo": 0.0,
+                    "tamanho_ultimo": None, "tamanho_total": 0, "com_tamanho": 0
+                }
+            medida["chamadas"] += 1
+            medida["total"] += segundos
+            medida["maximo"] = max(medida["maximo"], segundos)
+            medida["ultimo"] = segundos
+            medida["tamanho_ultimo"] = tamanho
+            if tamanho is not None:
+                medida["tamanho_total"] += tamanho
+                medida["com_tamanho"] += 1
+
+    def limpar(self):
+        """Remove todas as medidas e reinicia o relógio do registro."""
+        with self._trava:
+            self._medidas.clear()
+            self.iniciado_em = datetime.now()
+
+    def medidas(self):
+        """
+        Retorna as medidas como lista de dicts (campos de CAMPOS), da maior
+        para a menor soma de tempo.
+        """
+        with self._trava:
+            copia = {nome: dict(medida) for nome, medida in self._medidas.items()}
+        linhas = [
+            {
+                "nome": nome,
+                "tipo": medida["tipo"],
+                "chamadas": medida["chamadas"],
+                "total_ms": medida["total"] * 1000,
+                "medio_ms": medida["total"] * 1000 / medida["chamadas"],
+                "maximo_ms": medida["maximo"] * 1000,
+                "ultimo_ms": medida["ultimo"] * 1000,
+                "tamanho_ultimo": medida["tamanho_ultimo"],
+                "tamanho_medio": medida["tamanho_total"] / medida["com_tamanho"] if medida["com_tamanho"] else None
+            }
+            for nome, medida in copia.items()
+        ]
+        return sorted(linhas, key=lambda linha: linha["total_ms"], reverse=True)
+
+    def tabela(self):
+        """Medidas em um DataFrame com as colunas de CAMPOS."""
+        return pd.DataFrame(self.medidas(), columns=CAMPOS)
+
+    def para_json(self, **extras):
+        """
+        Serializa as medidas em JSON.
+
+        Args:
+            **extras: Campos adicionais do relatório (ex: escopo, estatísticas do cache)
+
+        Returns:
+            Texto JSON com início do registro, momento da exportação, extras e medidas
+        """
+        relatorio = {
+            "iniciado_em": self.iniciado_em.isoformat(timespec="seconds"),
+            "exportado_em": datetime.now().isoformat(timespec="seconds"),
+            **extras,
+            "medidas": self.medidas()
+        }
+        return json.dumps(relatorio, ensure_ascii=False, indent=2, default=str)
+
+    def para_csv(self):
+        """Serializa as medidas em CSV (uma linha por nome)."""
+        return self.tabela().to_csv(index=False)
+
+
+# Registro de todas as sessões do processo
+_PROCESSO = RegistroTempos()
+
+# Registros que recebem as medidas no contexto atual (no app: execução e sessão)
+_ATIVOS = contextvars.ContextVar("registros_ativos", default=())
+
+
+def registro_processo():
+    """Retorna o registro que acumula as medidas de todas as sessões do processo."""
+    return _PROCESSO
+
+
+def usar_registros(*registros):
+    """
+    Define os registros que recebem as medidas na thread atual, além do registro do processo.
+
+    Args:
+        *registros: Instâncias de RegistroTempos (ex: da execução e da sessão)
+    """
+    _ATIVOS.set(registros)
+
+
+def tamanho_resultado(valor):
+    """Número de linhas ou itens de um resultado; None para escalares."""
+    if isinstance(valor, (pd.DataFrame, pd.Series, list, tuple, dict)):
+        return len(valor)
+    if isinstance(valor, np.ndarray):
+        return len(valor) if valor.ndim else None
+    return None
+
+
+def registrar(nome, segundos, tamanho=None, tipo="bloco"):
+    """Registra uma medida no registro do processo e nos registros ativos."""
+    for registro in (_PROCESSO, *_ATIVOS.get()):
+        registro.registrar(nome, segundos, tamanho, tipo)
+
+
+@contextmanager
+def medir(nome, tipo="bloco"):
+    """
+    Gerenciador de contexto que cronometra um bloco de código.
+
+    Args:
+        nome: Nome do bloco nas tabelas
+        tipo: Categoria da medida (ex: "bloco", "seção")
+    """
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        registrar(nome, time.perf_counter() - inicio, tipo=tipo)
+
+
+def cronometrar(funcao):
+    """
+    Decorador que registra tempo e tamanho do resultado de cada chamada.
+
+    Chamadas que levantam exceção também são registradas, sem tamanho.
+    """
+    if getattr(funcao, "cronometrada", False):
+        return funcao
+
+    @functools.wraps(funcao)
+    def envoltorio(*args, **kwargs):
+        inicio = time.perf_counter()
+        tamanho = None
+        try:
+            resultado = funcao(*args, **kwargs)
+            tamanho = tamanho_resultado(resultado)
+            return resultado
+        finally:
+            registrar(funcao.__name__, time.perf_counter() - inicio, tamanho, tipo="função")
+
+    envoltorio.cronometrada = True
+    return envoltorio
+
+
+def instrumentar_modulo(namespace):
+    """
+    Aplica `cronometrar` a todas as funções públicas definidas no módulo.
+
+    Chamado ao final do módulo com globals(): as chamadas internas entre
+    funções públicas também passam a ser medidas. Não faz nada com
+    PIB_INSTRUMENTACAO=0.
+
+    Args:
+        namespace: Dicionário global do módulo
+    """
+    if not ATIVA:
+        return
+    modulo = namespace["__name__"]
+    for nome, objeto in list(namespace.items()):
+        if not nome.startswith("_") and inspect.isfunction(objeto) and objeto.__module__ == modulo:
+            namespace[nome] = cronometrar(objeto)
@@ -0,0 +1,286 @@
+"""
+Pré-renderização das visões mais acessadas do painel: Brasil agregado e
+"Todos os municípios" de cada UF, no período completo e no último ano.
+
+As figuras e tabelas de graficos.py são gravadas em disco, um arquivo por
+seção e combinação de filtros. O app as exibe diretamente quando os filtros
+coincidem e calcula ao vivo nos demais casos. O diretório de cada geração
+leva a versão da base e do código que monta o conteúdo (graficos.py, as
+consultas de data.py e o backend em uso): uma base nova ou uma mudança nos
+gráficos ou nas consultas invalida os arquivos antigos.
+
+Uso:
+    python prerender.py
+    python prerender.py --dados pib_municipios/ --saida prerender/
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import plotly.graph_objects as go
+
+import data
+import graficos
+from data import ARQUIVO_DADOS, load_data, catalogo_geografico
+
+
+# Diretório dos arquivos pré-renderizados
+DIRETORIO_PRERENDER = os.environ.get("PIB_PRERENDER", "prerender")
+
+# Construtores de conteúdo por seção (mesmos argumentos usados no app)
+CONSTRUTORES = {
+    "evolucao": graficos.conteudo_evolucao,
+    "rankings_municipios": graficos.conteudo_rankings_municipios,
+    "distribuicao_municipios": graficos.conteudo_distribuicao_municipios,
+    "agregado": graficos.conteudo_agregado
+}
+
+# Módulos de que o conteúdo das seções depende: os gráficos, as consultas e,
+# com PIB_BACKEND, o backend que substitui parte das consultas
+MODULOS_CONTEUDO = [graficos, data, *([sys.modules[f"backend_{data.BACKEND}"]] if data.BACKEND != "pandas" else [])]
+
+# Versão do código do conteúdo: muda quando qualquer um desses módulos muda
+VERSAO_CODIGO = hashlib.sha1(b"".join(Path(modulo.__file__).read_bytes() for modulo in MODULOS_CONTEUDO)).hexdigest()[:12]
+
+
+def visoes_populares(df):
+    """
+    Lista as seções e argumentos das visões pré-renderizadas, com os filtros padrão da sidebar.
+
+    Args:
+        df: DataFrame base
+
+    Returns:
+        Lista de tuplas (nome da seção, tupla de argumentos sem o df)
+    """
+    catalogo = catalogo_geografico(df)
+    ano_ini, ano_fim = int(df["ano"].min()), int(df["ano"].max())
+    ano_intervalo = (ano_ini, ano_fim)
+
+    visoes = [
+        ("evolucao", ("Agregado", ano_intervalo, "Brasil", "Todas", None, None, [], [], [])),
+        ("agregado", ("Brasil", "Todas", ano_fim, ano_ini))
+    ]
+    for regiao in catalogo.regioes:
+        for uf in catalogo.ufs_por_regiao[regiao]:
+            # A UF pode ser escolhida com a região "Brasil" ou com a própria região na sidebar
+            for regiao_sidebar in ("Brasil", regiao):
+                visoes.append(("evolucao", ("Todos os municípios", ano_intervalo, regiao_sidebar, uf, None, None, [], [], [])))
+            visoes.append(("rankings_municipios", (uf, ano_fim)))
+            visoes.append(("distribuicao_municipios", (uf, ano_fim, ano_ini)))
+    return visoes
+
+
+# ===============================
+# ARQUIVOS
+# ===============================
+
+def _normalizar(valor):
+    """Converte argumentos em tipos JSON estáveis (tuplas viram listas, escalares NumPy viram Python)."""
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if isinstance(valor, (list, tuple)):
+        return [_normalizar(item) for item in valor]
+    return valor
+
+
+def _chave(nome, argumentos):
+    """Nome do arquivo de uma seção e combinação de argumentos."""
+    texto = json.dumps([nome, _normalizar(argumentos)], ensure_ascii=False)
+    return hashlib.sha1(texto.encode()).hexdigest()[:20] + ".pkl"
+
+
+def _diretorio(df, raiz):
+    """Diretório da geração correspondente à versão da base e do código (VERSAO_CODIGO)."""
+    return Path(raiz) / f"{df.attrs.get('versao_base')}-{VERSAO_CODIGO}"
+
+
+def _serializar(conteudo):
+    """Figuras viram dicts (to_dict); tabelas e None são gravados como estão."""
+    return {
+        nome: ("figura", valor.to_dict()) if isinstance(valor, go.Figure) else ("valor", valor)
+        for nome, valor in conteudo.items()
+    }
+
+
+def _desserializar(payload):
+    """Reconstrói as figuras sem nova validação (já validadas ao serem geradas)."""
+    return {
+        nome: go.Figure(valor, _validate=False) if tipo == "figura" else valor
+        for nome, (tipo, valor) in payload.items()
+    }
+
+
+def gerar(df, raiz=DIRETORIO_PRERENDER):
+    """
+    Calcula e grava o conteúdo das visões populares, removendo gerações anteriores.
+
+    Args:
+        df: DataFrame base (com df.attrs["versao_base"])
+        raiz: Diretório dos arquivos pré-renderizados
+
+    Returns:
+        Lista de dicts (seção, arquivo, bytes, tempo em ms), uma por visão
+    """
+    diretorio = _diretorio(df, raiz)
+    if Path(raiz).is_dir():
+        for antigo in Path(raiz).iterdir():
+            if antigo.is_dir() and antigo != diretorio:
+                shutil.rmtree(antigo)
+    diretorio.mkdir(parents=True, exist_ok=True)
+
+    resultados = []
+    for nome, argumentos in visoes_populares(df):
+        inicio = time.perf_counter()
+        payload = pickle.dumps(_serializar(CONSTRUTORES[nome](df, *argumentos)), protocol=pickle.HIGHEST_PROTOCOL)
+        arquivo = diretorio / _chave(nome, argumentos)
+
+        # Escrita atômica: o app nunca lê um arquivo pela metade
+        temporario = arquivo.with_suffix(".tmp")
+        temporario.write_bytes(payload)
+        os.replace(temporario, arquivo)
+        resultados.append({
+            "secao": nome,
+            "arquivo": arquivo.name,
+            "bytes": len(payload),
+            "tempo_ms": (time.perf_counter() - inicio) * 1000
+        })
+    return resultados
+
+
+# ===============================
+# LEITURA NO APP
+# ===============================
+
+class ArmazemPreRender:
+    """
+    Leitura dos arquivos pré-renderizados, com os arquivos de cada geração
+    listados uma vez (relistados se o diretório mudar) e os já lidos em memória;
+    só a geração atual fica em memória.
+    """
+
+    def __init__(self, raiz=DIRETORIO_PRERENDER):
+        self.raiz = raiz
+        self._arquivos = {}
+        self._payloads = {}
+        self._trava = threading.Lock()
+        self._contadores = {"servidos": 0, "calculados": 0}
+
+    def _disponiveis(self, diretorio):
+        """Nomes dos arquivos da geração (vazio se o diretório não existir)."""
+        try:
+            modificado = diretorio.stat().st_mtime_ns
+        except FileNotFoundError:
+            return frozenset()
+        listados = self._arquivos.get(diretorio)
+        if listados is None or listados[0] != modificado:
+            listados = (modificado, frozenset(arquivo.name for arquivo in diretorio.glob("*.pkl")))
+            self._arquivos[diretorio] = listados
+        return listados[1]
+
+    def _descartar_outras_geracoes(self, diretorio):
+        """Libera os arquivos listados e lidos de gerações anteriores (outra versão da base ou do código)."""
+        if any(chave != diretorio for chave in self._arquivos):
+            self._arquivos = {chave: valor for chave, valor in self._arquivos.items() if chave == diretorio}
+            self._payloads = {chave: valor for chave, valor in self._payloads.items() if chave[0] == diretorio}
+
+    def obter(self, nome, df, *argumentos):
+        """
+        Retorna o conteúdo pré-renderizado da seção ou None se não houver.
+
+        Args:
+            nome: Seção (chave de CONSTRUTORES)
+            df: DataFrame base
+            *argumentos: Argumentos do construtor, sem o df
+        """
+        diretorio = _diretorio(df, self.raiz)
+        arquivo = _chave(nome, argumentos)
+        with self._trava:
+            self._descartar_outras_geracoes(diretorio)
+            if arquivo not in self._disponiveis(diretorio):
+                return None
+            payload = self._payloads.get((diretorio, arquivo))
+            if payload is None:
+                payload = pickle.loads((diretorio / arquivo).read_bytes())
+                self._payloads[(diretorio, arquivo)] = payload
+        return _desserializar(payload)
+
+    def conteudo(self, nome, df, *argumentos):
+        """Conteúdo pré-renderizado da seção ou, se não houver, calculado ao vivo."""
+        conteudo = self.obter(nome, df, *argumentos)
+        evento = "servidos"
+        if conteudo is None:
+            conteudo = CONSTRUTORES[nome](df, *argumentos)
+            evento = "calculados"
+        with self._trava:
+            self._contadores[evento] += 1
+        return conteudo
+
+    def estatisticas(self):
+        """Conteúdos servidos do disco e calculados ao vivo desde o início do processo."""
+        with self._trava:
+            return dict(self._contadores)
+
+
+_ARMAZEM = ArmazemPreRender()
+
+
+def pre_renderizado(nome, df, *argumentos):
+    """
+    Conteúdo de uma seção do painel: pré-renderizado quando os filtros
+    coincidem com uma visão gerada por este script, calculado ao vivo nos demais casos.
+
+    Args:
+        nome: Seção (chave de CONSTRUTORES)
+        df: DataFrame base
+        *argumentos: Argumentos do construtor, sem o df
+
+    Returns:
+        Dict de figuras e tabelas da seção (ver graficos.py)
+    """
+    return _ARMAZEM.conteudo(nome, df, *argumentos)
+
+
+def estatisticas_prerender():
+    """Retorna quantos conteúdos foram servidos do disco e quantos foram calculados ao vivo."""
+    return _ARMAZEM.estatisticas()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pré-renderiza as visões mais acessadas do painel")
+    parser.add_argument("--dados", default=ARQUIVO_DADOS, help="Parquet ou diretório particionado da base")
+    parser.add_argument("--saida", default=DIRETORIO_PRERENDER, help="Diretório dos arquivos pré-renderizados")
+    args = parser.parse_args()
+
+    # Fora do `streamlit run`, o cache do Streamlit avisa a cada chamada que não há runtime
+    for nome in list(logging.root.manager.loggerDict):
+        if nome.startswith("streamlit"):
+            logging.getLogger(nome).setLevel(logging.ERROR)
+
+    inicio = time.perf_counter()
+    df = load_data(arquivo=args.dados)
+    resultados = gerar(df, args.saida)
+
+    por_secao = {}
+    for resultado in resultados:
+        soma = por_secao.setdefault(resultado["secao"], {"visoes": 0, "bytes": 0, "tempo_ms": 0.0})
+        soma["visoes"] += 1
+        soma["bytes"] += resultado["bytes"]
+        soma["tempo_ms"] += resultado["tempo_ms"]
+    print(f"{'seção':26s} {'visões':>7s} {'KiB':>9s} {'tempo':>10s}")
+    for secao, soma in por_secao.items():
+        print(f"{secao:26s} {soma['visoes']:7d} {soma['bytes'] / 1024:9.1f} {soma['tempo_ms']:8.0f}ms")
+    print(f"{len(resultados)} visões em {_diretorio(df, args.saida)} ({time.perf_counter() - inicio:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()